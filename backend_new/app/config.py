@@ -1,5 +1,5 @@
 """Application configuration and environment variables."""
-from typing import Optional, List
+from typing import Optional, List, Dict
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -14,11 +14,82 @@ class Settings(BaseSettings):
     
     # API Keys
     gemini_api_key: Optional[str] = None
+    ai_sdk_warmup: bool = False  # Import the Gemini SDK right after startup instead of on first generation
+    gemini_api_endpoint: Optional[str] = None  # Override the API host (REST transport), e.g. a local stand-in
     clerk_secret_key: Optional[str] = None
     
     # Database
     database_url: str = "sqlite:///./readme_ai.db"
+    db_auto_migrate: bool = True  # Run Alembic migrations at startup
+
+    # Generated README storage
+    content_compression: str = "zlib"  # zlib/zstd/none (zstd needs the zstandard package)
+    content_compression_level: int = 6
+
+    # SQLite connection tuning (applied on every new connection)
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size_bytes: int = 256 * 1024 * 1024
+    sqlite_cache_size_kib: int = 64 * 1024
+    sqlite_auto_vacuum: str = "INCREMENTAL"  # Takes effect on new files or after one full VACUUM
+
+    # Maintenance: retention policies and SQLite compaction
+    maintenance_interval_seconds: float = 6 * 3600.0  # 0 disables the in-process scheduler
+    maintenance_idle_retry_seconds: float = 60.0  # Re-check interval while the API is busy
+    maintenance_max_deferral_seconds: float = 3600.0  # Run anyway after waiting this long for idle
+    maintenance_allow_full_vacuum: bool = False  # Permit one VACUUM to switch a file to incremental
+    maintenance_lock_path: str = "./maintenance.lock"  # Only the worker holding this lock runs maintenance
+    retention_keep_per_repo: int = 50  # Finished generations kept per repository (0 keeps all)
+    retention_failed_days: float = 7.0  # Failed generations older than this are dropped (0 keeps them)
+
+    # Connection pool (server databases such as PostgreSQL)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_recycle_seconds: int = 1800
+    db_pool_timeout_seconds: float = 30.0
     
+    # Production server (serve.py)
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    server_workers: int = 0  # 0 = one worker per CPU
+    server_graceful_timeout_seconds: int = 30  # Keep above generation_drain_seconds
+    generation_drain_seconds: float = 20.0  # On SIGTERM, wait this long for in-flight generations
+
+    # Prometheus metrics (GET /metrics)
+    metrics_enabled: bool = True
+    metrics_bearer_token: Optional[str] = None  # When set, scrapes must send "Authorization: Bearer <token>"
+
+    # Distributed tracing (OpenTelemetry SDK, W3C traceparent propagation)
+    tracing_enabled: bool = False
+    tracing_exporter: str = "file"  # file/otlp
+    tracing_file: str = "./traces.jsonl"  # One JSON span per line
+    tracing_otlp_endpoint: str = "http://localhost:4318/v1/traces"  # OTLP/HTTP collector
+    tracing_sample_rate: float = 1.0  # Share of new traces kept; requests with a traceparent follow its flag
+    tracing_service_name: str = "vibedocs-backend"
+    tracing_max_queue_size: int = 2048  # Spans waiting for export; more are dropped while the sink lags
+
+    # On-demand sampling profiler (switched on at runtime via /api/admin/profiling)
+    profiling_enabled: bool = True  # False removes the hook entirely
+    profiling_dir: str = "./profiles"  # Shared settings file and saved profiles (*.collapsed)
+
+    # HTTP responses
+    json_renderer: str = "orjson"  # orjson/json (falls back to json when orjson is missing)
+    response_compression: List[str] = ["br", "gzip"]  # Server preference; [] disables (br needs brotli)
+    response_compression_min_bytes: int = 1024
+    response_gzip_level: int = 6
+    response_brotli_quality: int = 4
+
+    # Rate limiting (token buckets; 0 disables a budget)
+    rate_limit_enabled: bool = True
+    rate_limit_per_minute: int = 60  # Per user, regular API routes
+    rate_limit_expensive_per_minute: int = 5  # Per user, README generation and commits
+    rate_limit_poll_per_minute: int = 120  # Per user, conditional polls of GET /api/generate/{id}
+    rate_limit_ip_per_minute: int = 300  # Per client IP, every request before authentication
+    rate_limit_store: str = "memory"  # memory/sqlite (sqlite shares buckets between worker processes)
+    rate_limit_sqlite_path: str = "./rate_limit.db"
+    rate_limit_trust_forwarded_for: bool = False  # Use X-Forwarded-For behind a trusted proxy
+
     # CORS
     cors_origins: List[str] = ["http://localhost:5173", "http://localhost:5174", "http://localhost:3000"]
     
@@ -26,6 +97,41 @@ class Settings(BaseSettings):
     github_api_base: str = "https://api.github.com"
     github_token: Optional[str] = None
 
+    # Repository catalog (GET /api/repos/ is served from a local mirror)
+    catalog_refresh_interval_seconds: float = 300.0  # Older catalogs are refreshed in the background
+    catalog_full_sync_interval_seconds: float = 24 * 3600.0  # Full syncs also drop deleted/lost repos
+
+    # Clerk
+    clerk_api_base: str = "https://api.clerk.com/v1"
+    clerk_token_cache_ttl_seconds: float = 300.0
+    clerk_token_cache_negative_ttl_seconds: float = 30.0
+    clerk_token_cache_max_entries: int = 10000
+
+    # Clerk session JWT verification
+    clerk_verify_jwt: bool = True
+    clerk_jwks_url: Optional[str] = None  # Defaults to {clerk_api_base}/jwks
+    clerk_jwks_refresh_interval_seconds: float = 3600.0
+    clerk_jwks_min_refresh_interval_seconds: float = 30.0
+    clerk_jwt_issuer: Optional[str] = None
+    clerk_authorized_parties: List[str] = []
+    clerk_jwt_leeway_seconds: int = 5
+    clerk_jwt_cache_max_entries: int = 10000
+
+    # Admin endpoints (/api/admin/*): Clerk user IDs allowed to call them
+    admin_user_ids: List[str] = []
+
+    # User row cache (clerk_user_id -> User)
+    user_cache_ttl_seconds: float = 60.0
+    user_cache_max_entries: int = 10000
+
+    # Logging
+    debug: bool = False
+    log_level: str = "INFO"
+    log_levels: Dict[str, str] = {"httpx": "WARNING"}  # Per-module overrides
+    log_format: str = "json"  # json/text
+    log_file: Optional[str] = None
+    log_debug_sample_rate: float = 0.1
+
 
 # Create settings instance
 # Note: anthropic_api_key validation will happen when AIGeneratorService is instantiated
@@ -1,16 +1,119 @@
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from pathlib import Path
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from app.config import settings
+from app.metrics import instrument_engine
 
-# Create SQLite engine
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False},
-    echo=False
-) 
 
-# Create session factory
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def _sync_url(url: str) -> str:
+    """Pin a PostgreSQL DATABASE_URL's sync driver to psycopg (SQLAlchemy's default is psycopg2)."""
+    if url.startswith("postgres://"):
+        return "postgresql+psycopg://" + url[len("postgres://"):]
+    if url.startswith("postgresql://"):
+        return "postgresql+psycopg://" + url[len("postgresql://"):]
+    return url
+
+
+def _async_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its async driver (aiosqlite/asyncpg)."""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    if url.startswith("postgres://"):
+        return "postgresql+asyncpg://" + url[len("postgres://"):]
+    if url.startswith("postgresql://"):
+        return "postgresql+asyncpg://" + url[len("postgresql://"):]
+    return url
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune every new SQLite connection for concurrent readers and one writer."""
+    cursor = dbapi_connection.cursor()
+    try:
+        # Only honoured before the first table exists (or by the next VACUUM)
+        cursor.execute(f"PRAGMA auto_vacuum={settings.sqlite_auto_vacuum}")
+        # WAL lets API readers proceed while the background writer commits
+        cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size_bytes)}")
+        # Negative cache_size is in KiB rather than pages
+        cursor.execute(f"PRAGMA cache_size={-int(settings.sqlite_cache_size_kib)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        # SQLite ignores REFERENCES clauses unless asked; e.g. a generation must
+        # not commit pointing at a blob maintenance just deleted
+        cursor.execute("PRAGMA foreign_keys=ON")
+    finally:
+        cursor.close()
+
+
+def _engine_options(url: str) -> dict:
+    """Connection and pool options for the given DATABASE_URL."""
+    if _is_sqlite(url):
+        return {
+            "connect_args": {
+                "check_same_thread": False,
+                "timeout": settings.sqlite_busy_timeout_ms / 1000
+            }
+        }
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_pre_ping": True,
+    }
+
+
+def insert_for_dialect(dialect_name: str):
+    """Dialect ``insert()`` construct supporting ON CONFLICT upserts."""
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise NotImplementedError(f"Upserts are not supported on {dialect_name}")
+    return insert
+
+
+def make_engine(url: str):
+    """Create a tuned sync engine for ``url`` (PostgreSQL URLs use psycopg)."""
+    sync_engine = create_engine(_sync_url(url), echo=False, **_engine_options(url))
+    if _is_sqlite(url):
+        event.listen(sync_engine, "connect", _set_sqlite_pragmas)
+    return sync_engine
+
+
+def make_async_engine(url: str) -> AsyncEngine:
+    """Create a tuned async engine for ``url`` (a sync URL is mapped to its async driver)."""
+    options = _engine_options(url)
+    if _is_sqlite(url):
+        # aiosqlite runs each connection on its own thread already
+        options["connect_args"].pop("check_same_thread")
+    new_engine = create_async_engine(_async_url(url), echo=False, **options)
+    if _is_sqlite(url):
+        event.listen(new_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return new_engine
+
+
+# Create sync engine (startup schema management, CLI tools)
+engine = make_engine(settings.database_url)
+
+# Create async engine (request handlers and background jobs)
+async_engine = make_async_engine(settings.database_url)
+
+if settings.metrics_enabled:
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 # Base class for models (SQLAlchemy 2.0 style)
 class Base(DeclarativeBase):
@@ -23,5 +126,53 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Revision matching the schema init_db() used to build with create_all()
+BASELINE_REVISION = "0001"
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+@contextmanager
+def migration_connection():
+    """
+    A connection in a transaction for running migrations.
+
+    On SQLite, foreign keys are not enforced while it is open. Batch
+    migrations rebuild a table by copying it and dropping the original, and
+    with enforcement on, the DROP would cascade into the child tables. The
+    pragma has no effect inside a transaction, so it is set before BEGIN.
+    """
+    with engine.connect() as connection:
+        sqlite = connection.dialect.name == "sqlite"
+        if sqlite:
+            connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            connection.commit()
+        try:
+            with connection.begin():
+                yield connection
+        finally:
+            if sqlite:
+                connection.exec_driver_sql("PRAGMA foreign_keys=ON")
+                connection.commit()
+
+def upgrade_db(revision: str = "head"):
+    """Apply Alembic migrations up to ``revision``."""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    with migration_connection() as connection:
+        config.attributes["connection"] = connection
+        tables = set(inspect(connection).get_table_names())
+        if "alembic_version" not in tables and "users" in tables:
+            # Database predates migrations: adopt it at the baseline revision
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, revision)
+
 def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    """Bring the schema up to date at startup (disable with DB_AUTO_MIGRATE=false)."""
+    if settings.db_auto_migrate:
+        upgrade_db()
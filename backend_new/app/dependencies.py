@@ -0,0 +1,160 @@
+"""Shared FastAPI dependencies for authenticating requests and resolving the user."""
+import logging
+from typing import Optional, Tuple
+
+import httpx
+import jwt
+from fastapi import Depends, Header, HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import TTLCache
+from app.config import settings
+from app.database import get_async_db
+from app.models.user import User
+from app.services.clerk import get_github_token, verify_session_token
+
+logger = logging.getLogger(__name__)
+
+
+# clerk_user_id -> detached User row. Reads are served from here and every
+# write in this module goes through it, so the cache never lags our own updates.
+_user_cache = TTLCache(
+    maxsize=settings.user_cache_max_entries,
+    ttl=settings.user_cache_ttl_seconds,
+    negative_ttl=0
+)
+
+
+async def verify_clerk_token(authorization: Optional[str] = Header(None)) -> dict:
+    """Verify Clerk JWT token and extract user information."""
+    if not authorization:
+        logger.info("No authorization header")
+        raise HTTPException(status_code=401, detail="Authorization header missing")
+    
+    if not authorization.startswith("Bearer "):
+        logger.info("Invalid authorization format")
+        raise HTTPException(status_code=401, detail="Invalid authorization format")
+    
+    token = authorization.split(" ")[1]
+    
+    # Verify JWT signature against Clerk's cached JWKS
+    try:
+        decoded = await verify_session_token(token)
+    except jwt.PyJWTError as e:
+        logger.info(f"JWT verification error: {e}")
+        raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
+    except (httpx.HTTPError, RuntimeError) as e:
+        logger.error(f"Unable to load Clerk signing keys: {e}")
+        raise HTTPException(status_code=503, detail="Unable to verify token at this time")
+
+    clerk_user_id = decoded.get("sub") or decoded.get("user_id")
+    logger.debug(f"Decoded user ID: {clerk_user_id}")
+    
+    if not clerk_user_id:
+        raise HTTPException(status_code=401, detail="Invalid token: no user ID")
+    
+    # Try to get GitHub token from Clerk API
+    github_token = None
+    if settings.clerk_secret_key:
+        github_token = await get_github_token(clerk_user_id)
+        logger.debug(f"GitHub token received: {'Yes' if github_token else 'No'}")
+    
+    return {
+        "clerk_user_id": clerk_user_id,
+        "github_token": github_token
+    }
+
+
+async def require_admin(user_info: dict = Depends(verify_clerk_token)) -> dict:
+    """Allow only the Clerk users listed in ADMIN_USER_IDS."""
+    if user_info["clerk_user_id"] not in settings.admin_user_ids:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user_info
+
+
+async def _cache_user(db: AsyncSession, user: User) -> User:
+    """Load all columns, detach the row from the session and cache it."""
+    await db.refresh(user)
+    db.expunge(user)
+    _user_cache.set(user.clerk_user_id, user)
+    return user
+
+
+def invalidate_user(clerk_user_id: str) -> None:
+    """Drop a cached User row, e.g. after it was changed outside this module."""
+    _user_cache.invalidate(clerk_user_id)
+
+
+async def _load_or_create_user(db: AsyncSession, clerk_user_id: str, github_token: Optional[str]) -> User:
+    user = await db.scalar(select(User).where(User.clerk_user_id == clerk_user_id))
+
+    if not user:
+        # Auto-create user if they have a GitHub token
+        if not github_token:
+            raise HTTPException(
+                status_code=400,
+                detail="GitHub access token not found. Please connect your GitHub account."
+            )
+        user = User(
+            clerk_user_id=clerk_user_id,
+            github_access_token=github_token
+        )
+        db.add(user)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # A concurrent request created the user first
+            await db.rollback()
+            user = (await db.scalars(select(User).where(User.clerk_user_id == clerk_user_id))).one()
+    elif github_token and user.github_access_token != github_token:
+        user.github_access_token = github_token
+        await db.commit()
+
+    return await _cache_user(db, user)
+
+
+async def get_current_user(
+    user_info: dict = Depends(verify_clerk_token),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """
+    Resolve the authenticated user's row, creating it on first sign-in.
+
+    FastAPI caches dependency results per request, so every dependant in a
+    request shares one resolution; across requests rows come from the cache.
+    """
+    clerk_user_id = user_info["clerk_user_id"]
+    github_token = user_info.get("github_token")
+
+    user = _user_cache.get(clerk_user_id)
+    if user is None:
+        return await _load_or_create_user(db, clerk_user_id, github_token)
+
+    if github_token and user.github_access_token != github_token:
+        # Clerk rotated the OAuth token: write through to the DB and the cache
+        await db.execute(
+            update(User).where(User.id == user.id).values(github_access_token=github_token)
+        )
+        await db.commit()
+        user.github_access_token = github_token
+
+    return user
+
+
+async def get_user_with_token(
+    user_info: dict = Depends(verify_clerk_token),
+    user: User = Depends(get_current_user)
+) -> Tuple[User, str]:
+    """Get user and their GitHub access token."""
+    # Prefer the live Clerk token, then the stored one, then the system token
+    github_token = user_info.get("github_token") or user.github_access_token or settings.github_token
+
+    if not github_token:
+        raise HTTPException(
+            status_code=400,
+            detail="GitHub access token not found. Please connect your GitHub account."
+        )
+
+    return user, github_token
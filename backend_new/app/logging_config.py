@@ -0,0 +1,148 @@
+"""
+Structured, non-blocking logging.
+
+Records are pushed onto an in-memory queue by a ``QueueHandler`` and written
+by a ``QueueListener`` thread, so request handlers never block on file or
+terminal I/O. Each record carries the current request and generation IDs
+from context variables and is rendered as one JSON object per line.
+"""
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from app import tracing
+from app.config import settings
+
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+generation_id_var: ContextVar[Optional[str]] = ContextVar("generation_id", default=None)
+
+# Attributes present on every LogRecord; anything else came from ``extra=``
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+
+
+class ContextFilter(logging.Filter):
+    """Attach request/generation/trace IDs to the record in the emitting context."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.generation_id = generation_id_var.get()
+        record.trace_id, record.span_id = tracing.current_ids()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of DEBUG records.
+
+    Pass ``extra={"sample": False}`` to always keep a particular record.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        if getattr(record, "sample", True) is False:
+            return True
+        return random.random() < self.rate
+
+
+class StructuredQueueHandler(QueueHandler):
+    """QueueHandler that keeps ``extra`` fields and tracebacks separate from the message."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JSONFormatter(logging.Formatter):
+    """Render records as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and key not in ("sample", "exc_text") and value is not None:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+def _build_formatter() -> logging.Formatter:
+    if settings.log_format == "text":
+        return logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+        )
+    return JSONFormatter()
+
+
+def setup_logging() -> None:
+    """Route all logging through a background writer thread. Safe to call twice."""
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = _build_formatter()
+    sinks = [logging.StreamHandler(sys.stdout)]
+    if settings.log_file:
+        sinks.append(logging.FileHandler(settings.log_file))
+    for sink in sinks:
+        sink.setFormatter(formatter)
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(DebugSamplingFilter(settings.log_debug_sample_rate))
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel("DEBUG" if settings.debug else settings.log_level.upper())
+
+    for name, level in settings.log_levels.items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _listener = QueueListener(log_queue, *sinks, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def restart_logging() -> None:
+    """Start a new writer thread in a forked worker; the parent's does not survive fork."""
+    global _listener
+    _listener = None
+    setup_logging()
@@ -1,22 +1,82 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import uuid
+
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.database import init_db
-from app.routers import auth, repos, generate
+from app.logging_config import setup_logging, shutdown_logging, request_id_var
+from app.database import init_db, async_engine
+from app import metrics, profiling, tracing
+from app.responses import CompressionMiddleware, default_response_class
+from app.rate_limit import RateLimitMiddleware, enforce_user_rate_limit
+from app.routers import admin, auth, repos, generate
+from app.services import ai_generator, clerk, maintenance
+from app.services.generation_jobs import jobs
 
-# Initialize database
-init_db()
+# Route logging through the background writer before anything logs
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # Create FastAPI app
 app = FastAPI(
     title = "GitHub README AI API",
     description = "Backend API for AI-powered GitHub Readme generation",
-    version = "1.0.0"
+    version = "1.0.0",
+    default_response_class = default_response_class()
 )
 
 @app.on_event("startup")
 async def startup_event():
-    print("BACKEND RESTARTED - READY FOR REQUESTS", flush=True)
+    # Migrate here rather than at import so tools can import the app cheaply
+    init_db()
+    if settings.ai_sdk_warmup:
+        # Off the critical path: the server is already accepting requests
+        asyncio.get_running_loop().run_in_executor(None, ai_generator.warm_up)
+    if settings.clerk_verify_jwt:
+        clerk.jwks_cache.start()
+    maintenance.scheduler.start()
+    jobs.start()
+    await generate.resume_checkpointed_generations()
+    logger.info("Backend started - ready for requests")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Already done when shutdown came through SIGTERM; otherwise drain now
+    await jobs.drain()
+    await maintenance.scheduler.stop()
+    await clerk.jwks_cache.stop()
+    await clerk.close_client()
+    await async_engine.dispose()
+    tracing.shutdown()
+    shutdown_logging()
+
+# Middleware: each add_middleware() call wraps everything registered before it,
+# so requests pass through them in the reverse of this file's order:
+# tracing -> metrics -> compression -> CORS -> rate limit -> request ID -> profiling -> app
+
+# Innermost, so samples taken while a request is profiled come from its own task
+if settings.profiling_enabled:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """Tag every log record emitted while handling the request with its ID."""
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    try:
+        # In-flight requests defer scheduled maintenance
+        with maintenance.scheduler.track_request():
+            response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+# Per-IP budget, checked before authentication (inside CORS so 429s stay readable)
+if settings.rate_limit_enabled:
+    app.add_middleware(RateLimitMiddleware, per_minute=settings.rate_limit_ip_per_minute)
 
 #Configure CORS
 app.add_middleware(
@@ -25,12 +85,36 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "ETag", "X-Request-ID", "Retry-After",
+        "RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset", "RateLimit-Policy",
+    ],
 )
 
-# Include Routers
-app.include_router(auth.router)
-app.include_router(repos.router)
-app.include_router(generate.router)
+# Outside CORS and the rate limit: compresses whatever they and the app produced
+app.add_middleware(
+    CompressionMiddleware,
+    encodings=settings.response_compression,
+    minimum_size=settings.response_compression_min_bytes,
+    gzip_level=settings.response_gzip_level,
+    brotli_quality=settings.response_brotli_quality,
+)
+
+# Outside compression, so recorded latency includes compressing the response
+if settings.metrics_enabled:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Outermost (registered last): the server span is the parent of everything a request does
+if settings.tracing_enabled:
+    tracing.setup()
+    app.add_middleware(tracing.TracingMiddleware)
+
+# Include Routers (each charges the caller's per-user rate limit budget)
+rate_limited = [Depends(enforce_user_rate_limit)]
+app.include_router(auth.router, dependencies=rate_limited)
+app.include_router(repos.router, dependencies=rate_limited)
+app.include_router(generate.router, dependencies=rate_limited)
+app.include_router(admin.router, dependencies=rate_limited)
 
 @app.get("/")
 async def root():
@@ -42,4 +126,15 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    if jobs.draining:
+        # Tell the load balancer to stop routing here while generations finish
+        return JSONResponse(status_code=503, content={"status": "draining", "in_flight": jobs.in_flight})
+    return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint(request: Request):
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.metrics_bearer_token and request.headers.get("authorization") != f"Bearer {settings.metrics_bearer_token}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(await metrics.render_latest(), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,176 @@
+"""
+Prometheus metrics (served on ``/metrics``), recorded with ``prometheus_client``.
+
+With several worker processes (``serve.py``) ``PROMETHEUS_MULTIPROC_DIR``
+must be set before this module is first imported: every process then keeps
+its values in memory-mapped files there and a scrape, whichever worker it
+reaches, reads them all. Counters and histograms are summed over every
+process that ever ran; the gunicorn ``child_exit`` hook drops a dead
+worker's live gauges with ``mark_process_dead()``.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, List
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+MULTIPROCESS_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+_scrape_collectors: List[Callable[[], Awaitable[None]]] = []
+
+
+def on_scrape(collector: Callable[[], Awaitable[None]]) -> None:
+    """Run ``collector`` before each scrape, e.g. to set a gauge from a DB count."""
+    _scrape_collectors.append(collector)
+
+
+def _render() -> bytes:
+    if not os.environ.get(MULTIPROCESS_DIR_ENV):
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+async def render_latest() -> bytes:
+    """Exposition for ``/metrics``: run scrape collectors, then read every process's values."""
+    for collector in _scrape_collectors:
+        try:
+            await collector()
+        except Exception as e:
+            logger.warning(f"Metrics collector failed: {e}")
+    return await asyncio.to_thread(_render)
+
+
+def mark_process_dead(pid: int) -> None:
+    """Forget the live gauges of worker ``pid`` once it has exited."""
+    if os.environ.get(MULTIPROCESS_DIR_ENV):
+        multiprocess.mark_process_dead(pid)
+
+
+# ---------------------------------------------------------------------------
+# Application metrics
+# ---------------------------------------------------------------------------
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled",
+    multiprocess_mode="livesum",
+)
+GITHUB_REQUEST_DURATION = Histogram(
+    "github_request_duration_seconds",
+    "GitHub API call latency by endpoint and response status",
+    ("method", "endpoint", "status"),
+)
+LLM_REQUEST_DURATION = Histogram(
+    "llm_request_duration_seconds",
+    "Gemini call latency by model and outcome",
+    ("model", "outcome"),
+    buckets=(0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0),
+)
+LLM_TOKENS = Counter(
+    "llm_tokens",
+    "Tokens consumed by Gemini calls",
+    ("model", "kind"),
+)
+LLM_RETRIES = Counter(
+    "llm_retries",
+    "Gemini calls retried on the same model, by reason",
+    ("model", "reason"),
+)
+LLM_FALLBACKS = Counter(
+    "llm_fallbacks",
+    "Times generation moved on from a model to the next one",
+    ("model",),
+)
+GENERATION_DURATION = Histogram(
+    "generation_duration_seconds",
+    "End-to-end background README generation time by final status",
+    ("status",),
+    buckets=(1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0),
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Database statement execution time by statement type",
+    ("operation",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+
+# ---------------------------------------------------------------------------
+# Instrumentation hooks
+# ---------------------------------------------------------------------------
+
+class MetricsMiddleware:
+    """Record every HTTP request's latency under its route template."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = "500"
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        start = time.perf_counter()
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners cannot explode cardinality
+            template = route.path if route is not None else "<unmatched>"
+            HTTP_REQUEST_DURATION.labels(scope["method"], template, status).observe(time.perf_counter() - start)
+
+
+_STATEMENT_TYPES = ("select", "insert", "update", "delete")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    keyword = statement.lstrip()[:6].lower()
+    DB_QUERY_DURATION.labels(keyword if keyword in _STATEMENT_TYPES else "other").observe(elapsed)
+
+
+def _handle_error(context) -> None:
+    # A failed statement never reaches after_cursor_execute
+    if context.connection is not None:
+        starts = context.connection.info.get("query_start")
+        if starts:
+            starts.pop()
+
+
+def instrument_engine(sync_engine) -> None:
+    """Time every statement executed through ``sync_engine`` (or an async engine's ``.sync_engine``)."""
+    from sqlalchemy import event
+
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
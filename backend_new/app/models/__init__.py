@@ -2,5 +2,7 @@
 from app.models.user import User
 from app.models.repository import Repository
 from app.models.generation import Generation
+from app.models.content_blob import ContentBlob
+from app.models.catalog import CatalogRepository, CatalogSyncState
 
-__all__ = ["User", "Repository", "Generation"]
+__all__ = ["User", "Repository", "Generation", "ContentBlob", "CatalogRepository", "CatalogSyncState"]
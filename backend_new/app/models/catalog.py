@@ -0,0 +1,43 @@
+"""Locally mirrored GitHub repository catalog for database."""
+from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+import uuid
+from app.database import Base
+
+
+class CatalogRepository(Base):
+    """One GitHub repository visible to a user, mirrored from GET /user/repos."""
+
+    __tablename__ = "repository_catalog"
+    __table_args__ = (
+        # Upsert target during sync
+        Index("uq_repository_catalog_user_github_repo", "user_id", "github_repo_id", unique=True),
+        # Default dashboard order: most recently updated first
+        Index("ix_repository_catalog_user_updated_at", "user_id", "updated_at"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    github_repo_id = Column(Integer, nullable=False)
+    name = Column(String, nullable=False)
+    full_name = Column(String, nullable=False)  # owner/repo format
+    description = Column(Text, nullable=True)
+    language = Column(String, nullable=True)
+    stargazers_count = Column(Integer, nullable=False, default=0)
+    forks_count = Column(Integer, nullable=False, default=0)
+    visibility = Column(String, nullable=False, default="public")
+    default_branch = Column(String, nullable=False, default="main")
+    updated_at = Column(DateTime(timezone=True), nullable=False)  # GitHub's updated_at
+    synced_at = Column(DateTime(timezone=True), nullable=False)  # Last sync that saw this repo
+
+
+class CatalogSyncState(Base):
+    """Per-user bookkeeping for incremental catalog syncs."""
+
+    __tablename__ = "repository_catalog_sync"
+
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    etag = Column(String, nullable=True)  # ETag of the last first-page response, for If-None-Match
+    last_synced_at = Column(DateTime(timezone=True), nullable=True)
+    last_full_sync_at = Column(DateTime(timezone=True), nullable=True)  # Full syncs also drop vanished repos
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,17 @@
+"""Content-addressed blob model for generated README bodies."""
+from sqlalchemy import Column, String, Integer, Text, DateTime, LargeBinary
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class ContentBlob(Base):
+    """Compressed README body keyed by the SHA-256 of its text, shared by identical generations."""
+    
+    __tablename__ = "content_blobs"
+    
+    sha256 = Column(String(64), primary_key=True)  # hex digest of the UTF-8 text
+    encoding = Column(String, nullable=False)  # zlib/zstd/identity
+    data = Column(LargeBinary, nullable=False)  # compressed bytes
+    size = Column(Integer, nullable=False)  # uncompressed UTF-8 bytes
+    preview = Column(Text, nullable=True)  # leading characters, served by /history without decompressing
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,22 +1,45 @@
 """README generation model for database."""
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey
+from typing import Optional
+from sqlalchemy import JSON, Column, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
+from datetime import datetime, timezone
 from app.database import Base
+from app.services.content_store import decompress_content
 
 
 class Generation(Base):
     """Generation model storing AI-generated README content."""
     
     __tablename__ = "readme_generations"
+    __table_args__ = (
+        # History listing: filter by repo, newest first, keyset on (created_at, id)
+        Index("ix_readme_generations_repo_id_created_at_id", "repo_id", "created_at", "id"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     repo_id = Column(String, ForeignKey("repositories.id", ondelete="CASCADE"), nullable=False)
     template_type = Column(String, default="professional")  # minimalist/professional/portfolio
-    content = Column(Text, nullable=True)  # Generated Markdown
-    status = Column(String, default="pending")  # pending/completed/failed
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    content_hash = Column(String(64), ForeignKey("content_blobs.sha256"), nullable=True)  # Generated Markdown (ContentBlob)
+    status = Column(String, default="pending")  # pending/pending_retry/completed/failed
+    # Stage durations and counts recorded by the background job (see services/stage_timings.py)
+    timings = Column(JSON(none_as_null=True), nullable=True)
+    # Python-side default keeps one storage format on SQLite (see migration 0003)
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        server_default=func.now()
+    )
     
     # Relationships
     repository = relationship("Repository", back_populates="generations")
+    # Never lazy-load: callers opt in (selectinload) only where the body is served
+    blob = relationship("ContentBlob", lazy="raise")
+    
+    @property
+    def content(self) -> Optional[str]:
+        """Decompressed README markdown (None if missing); requires ``blob`` to be loaded."""
+        if self.content_hash is None or self.blob is None:
+            return None
+        return decompress_content(self.blob)
@@ -1,5 +1,5 @@
 """Repository model for database."""
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -10,6 +10,10 @@ class Repository(Base):
     """Repository model storing GitHub repository metadata."""
     
     __tablename__ = "repositories"
+    __table_args__ = (
+        # One row per imported GitHub repo per user; also serves the lookup by both columns
+        Index("uq_repositories_user_github_repo", "user_id", "github_repo_id", unique=True),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
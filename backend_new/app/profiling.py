@@ -0,0 +1,296 @@
+"""
+On-demand sampling profiler for live requests and generation jobs.
+
+An admin turns profiling on at runtime (``PUT /api/admin/profiling``) for a
+share of requests (optionally under a path prefix) and/or of generations, or
+for one generation by ID.
+The setting is a small JSON file in ``PROFILING_DIR`` that every worker
+re-reads at most once a second, so it reaches all processes and expires on
+its own.
+
+Each profiled request or job runs inside a marker coroutine. While any is in
+flight a background thread samples the event loop thread's stack every
+``interval_ms`` and credits the sample to the profile whose marker frame is
+on the stack, so concurrent requests do not mix. Work handed to threads
+(the Gemini call, SQLite I/O) appears only as the await waiting for it.
+Finished profiles are saved as collapsed stacks (``*.collapsed``, one
+``frame;frame;frame count`` line per stack), which flamegraph.pl and
+speedscope read directly; ``to_speedscope()`` converts them for download.
+
+With profiling off the per-request cost is a clock read and a comparison.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Awaitable, Dict, List, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_CONFIG_FILE = "config.json"
+_CONFIG_REFRESH_SECONDS = 1.0
+_BACKEND_DIR = str(Path(__file__).resolve().parent.parent) + os.sep
+_STDLIB_DIR = sysconfig.get_paths()["stdlib"] + os.sep
+PROFILE_NAME = re.compile(r"^[\w.-]+\.collapsed$")
+
+
+@lru_cache(maxsize=8192)
+def _frame_label(code) -> str:
+    path = code.co_filename
+    if path.startswith(_BACKEND_DIR):
+        path = path[len(_BACKEND_DIR):]
+    elif "site-packages" + os.sep in path:
+        path = path.split("site-packages" + os.sep, 1)[1]
+    elif path.startswith(_STDLIB_DIR):
+        path = path[len(_STDLIB_DIR):]
+    return f"{code.co_qualname} ({path}:{code.co_firstlineno})".replace(";", ":")
+
+
+class ProfileSession:
+    """Samples collected for one profiled request or generation."""
+
+    def __init__(self, kind: str, label: str):
+        self.kind = kind
+        self.label = label
+        self.thread_id = threading.get_ident()
+        self.started = time.time()
+        self.stacks: Counter = Counter()  # Code objects, innermost first -> samples
+
+    def to_collapsed(self) -> str:
+        root = self.label.replace(";", ":")
+        lines = [
+            ";".join([root] + [_frame_label(code) for code in reversed(stack)]) + f" {count}"
+            for stack, count in self.stacks.most_common()
+        ]
+        return "\n".join(lines) + "\n"
+
+
+class Profiler:
+    """Runtime-toggled sampling profiler (one per process)."""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._config: Optional[Dict[str, Any]] = None
+        self._config_mtime: Optional[float] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._sessions: Dict[Any, ProfileSession] = {}  # Marker frame -> session
+        self._thread: Optional[threading.Thread] = None
+        self._saved = 0
+
+    # Configuration (shared between worker processes through a file)
+
+    def configure(self, config: Optional[Dict[str, Any]]) -> None:
+        """Turn profiling on with ``config`` (see ``ProfilingConfig``) or off with None."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / _CONFIG_FILE
+        if config is None:
+            path.unlink(missing_ok=True)
+        else:
+            config = dict(config, expires_at=time.time() + config["duration_seconds"])
+            temporary = path.with_suffix(f".{os.getpid()}.tmp")
+            temporary.write_text(json.dumps(config))
+            os.replace(temporary, path)
+        self._next_check = 0.0
+        self._saved = 0
+
+    def config(self) -> Optional[Dict[str, Any]]:
+        """The active configuration, or None while profiling is off or expired."""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + _CONFIG_REFRESH_SECONDS
+            self._reload()
+        config = self._config
+        if config is not None and time.time() >= config["expires_at"]:
+            return None
+        return config
+
+    def _reload(self) -> None:
+        path = self.directory / _CONFIG_FILE
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            self._config = self._config_mtime = None
+            return
+        if mtime != self._config_mtime:
+            try:
+                self._config = json.loads(path.read_text())
+                self._config_mtime = mtime
+                self._saved = 0
+            except (OSError, ValueError):
+                self._config = None
+
+    def _has_budget(self, config: Dict[str, Any]) -> bool:
+        return self._saved + len(self._sessions) < config["max_profiles"]
+
+    def wants_request(self, path: str) -> bool:
+        config = self.config()
+        if config is None or not config["request_rate"]:
+            return False
+        prefix = config.get("path_prefix")
+        if prefix and not path.startswith(prefix):
+            return False
+        return random.random() < config["request_rate"] and self._has_budget(config)
+
+    def wants_generation(self, generation_id: str) -> bool:
+        config = self.config()
+        if config is None:
+            return False
+        selected = config.get("generation_id") == generation_id or random.random() < config["generation_rate"]
+        return selected and self._has_budget(config)
+
+    # Sampling
+
+    async def profile(self, session: ProfileSession, awaitable: Awaitable) -> Any:
+        """Await ``awaitable`` while sampling it into ``session``; saved when it finishes."""
+        try:
+            return await self._profiled(session, awaitable)
+        finally:
+            if session.stacks:
+                self._saved += 1
+                asyncio.get_running_loop().run_in_executor(None, self._save, session)
+
+    async def _profiled(self, session: ProfileSession, awaitable: Awaitable) -> Any:
+        # This frame marks the profiled work on the loop thread's stack
+        marker = sys._getframe()
+        interval = (self.config() or {}).get("interval_ms", 5.0) / 1000
+        with self._lock:
+            self._sessions[marker] = session
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample, args=(interval,), name="profiler", daemon=True)
+                self._thread.start()
+        try:
+            return await awaitable
+        finally:
+            with self._lock:
+                del self._sessions[marker]
+
+    def _sample(self, interval: float) -> None:
+        while True:
+            with self._lock:
+                if not self._sessions:
+                    self._thread = None
+                    return
+                sessions = dict(self._sessions)
+            frames = sys._current_frames()
+            for thread_id in {session.thread_id for session in sessions.values()}:
+                frame = frames.get(thread_id)
+                stack: List[Any] = []
+                while frame is not None:
+                    session = sessions.get(frame)
+                    if session is not None:
+                        session.stacks[tuple(stack)] += 1
+                        break
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+            del frames, frame
+            time.sleep(interval)
+
+    def _save(self, session: ProfileSession) -> None:
+        stamp = datetime.fromtimestamp(session.started, tz=timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        slug = re.sub(r"[^\w.-]+", "_", session.label).strip("_")[:80]
+        path = self.directory / f"{stamp}-{session.kind}-{slug}-{os.getpid()}.collapsed"
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path.write_text(session.to_collapsed())
+        except OSError as e:
+            logger.warning(f"Could not save profile {path.name}: {e}")
+            return
+        logger.info(f"Saved profile {path.name} ({sum(session.stacks.values())} samples)")
+
+    # Saved profiles
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        if not self.directory.is_dir():
+            return []
+        profiles = []
+        for path in sorted(self.directory.glob("*.collapsed"), reverse=True):
+            stat = path.stat()
+            profiles.append({
+                "name": path.name,
+                "size_bytes": stat.st_size,
+                "created_at": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+            })
+        return profiles
+
+    def read_profile(self, name: str) -> Optional[str]:
+        if not PROFILE_NAME.match(name):
+            return None
+        path = self.directory / name
+        return path.read_text() if path.is_file() else None
+
+
+def to_speedscope(name: str, collapsed: str) -> Dict[str, Any]:
+    """Convert collapsed stacks to a speedscope "sampled" profile."""
+    frames: List[Dict[str, str]] = []
+    index: Dict[str, int] = {}
+    samples: List[List[int]] = []
+    weights: List[int] = []
+    for line in collapsed.splitlines():
+        stack, _, count = line.rpartition(" ")
+        if not stack or not count.isdigit():
+            continue
+        sample = []
+        for label in stack.split(";"):
+            if label not in index:
+                index[label] = len(frames)
+                frames.append({"name": label})
+            sample.append(index[label])
+        samples.append(sample)
+        weights.append(int(count))
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "vibedocs-backend",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "none",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }],
+    }
+
+
+class ProfilingMiddleware:
+    """Profile the requests selected by the active profiling configuration."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not profiler.wants_request(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        session = ProfileSession("request", f"{scope['method']} {scope['path']}")
+
+        async def run() -> None:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                # Label by route template once routing has matched
+                route = scope.get("route")
+                if route is not None:
+                    session.label = f"{scope['method']} {route.path}"
+
+        await profiler.profile(session, run())
+
+
+profiler = Profiler(settings.profiling_dir)
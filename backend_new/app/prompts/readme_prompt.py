@@ -1,24 +1,33 @@
 """System prompts for README generation with different template styles."""
-from typing import List
-from app.schemas.schemas import FileTreeItem
+from app.services.file_tree import FileTree
 
+_IMPORTANT_KEYWORDS = (
+    "package.json", "requirements.txt", "pom.xml", "cargo.toml",
+    "go.mod", "composer.json", "gemfile", "pubspec.yaml",
+    "readme.md", "readme", "license", ".gitignore",
+    "dockerfile", "docker-compose", "makefile"
+)
 
-def get_readme_prompt(file_tree: List[FileTreeItem], template_type: str = "professional") -> str:
+
+def _is_important(path: str) -> bool:
+    path = path.lower()
+    return any(keyword in path for keyword in _IMPORTANT_KEYWORDS)
+
+
+def get_readme_prompt(file_tree: FileTree, template_type: str = "professional") -> str:
     """Generate system prompt for README generation based on template type."""
     
-    # Filter important files
+    # Filter important files (keywords never contain "/", so a path matches
+    # when its directory or its name does; each directory is checked once)
+    important_dirs = [_is_important(directory) for directory in file_tree.dirs]
     important_files = [
-        item.path for item in file_tree
-        if any(keyword in item.path.lower() for keyword in [
-            "package.json", "requirements.txt", "pom.xml", "cargo.toml",
-            "go.mod", "composer.json", "gemfile", "pubspec.yaml",
-            "readme.md", "readme", "license", ".gitignore",
-            "dockerfile", "docker-compose", "makefile"
-        ])
+        file_tree.path(i)
+        for i, (dir_id, name) in enumerate(zip(file_tree.dir_of, file_tree.names))
+        if important_dirs[dir_id] or _is_important(name)
     ]
     
     # Get file tree structure (limit to first 100 files for context)
-    tree_structure = "\n".join([item.path for item in file_tree[:100]])
+    tree_structure = "\n".join(file_tree.paths(100))
     
     base_context = f"""You are an expert technical writer specializing in creating GitHub README files.
 
@@ -0,0 +1,233 @@
+"""
+Token-bucket rate limiting per client IP and per user.
+
+Every request first draws from its client IP's bucket (``RateLimitMiddleware``,
+before authentication). Authenticated API routes then draw from the user's
+bucket for the route's budget (``enforce_user_rate_limit``): expensive
+routes that call Gemini or write to GitHub have their own, much smaller
+budget, and conditional polls of a generation (``If-None-Match``, answered
+with a cheap 304 while nothing changed) have their own, larger one. Buckets live in process memory by default; ``RATE_LIMIT_STORE=sqlite``
+shares them between worker processes through a small SQLite file.
+
+Responses carry ``RateLimit-Limit``/``RateLimit-Remaining``/``RateLimit-Reset``
+and ``RateLimit-Policy`` (IETF draft), and 429s add ``Retry-After``.
+"""
+import asyncio
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import settings
+from app.dependencies import verify_clerk_token
+
+# (method, route path) pairs served from the "expensive" budget
+EXPENSIVE_ROUTES = {
+    ("POST", "/api/generate/"),
+    ("POST", "/api/generate/commit"),
+}
+
+# (method, route path) pairs whose conditional requests use the "poll" budget
+POLL_ROUTES = {
+    ("GET", "/api/generate/{generation_id}"),
+}
+
+# Paths never limited per IP (load balancer probes, metrics scrapes)
+EXEMPT_PATHS = {"/health", "/metrics"}
+
+
+class Budget(NamedTuple):
+    """Bucket size and refill rate: ``per_minute`` tokens, refilled continuously."""
+    name: str
+    per_minute: int
+
+    @property
+    def rate(self) -> float:
+        return self.per_minute / 60.0
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: int  # Seconds until the bucket is full again
+    retry_after: int  # Seconds until one token is available (0 when allowed)
+
+    def headers(self, budget: Budget) -> Dict[str, str]:
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(self.reset),
+            "RateLimit-Policy": f"{budget.per_minute};w=60;name=\"{budget.name}\"",
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(self.retry_after)
+        return headers
+
+
+def _refill(tokens: float, updated: float, now: float, budget: Budget) -> float:
+    return min(float(budget.per_minute), tokens + (now - updated) * budget.rate)
+
+
+def _decide(tokens: float, budget: Budget, cost: float) -> Tuple[float, Decision]:
+    """Take ``cost`` tokens if available; return the new level and the decision."""
+    allowed = tokens >= cost
+    if allowed:
+        tokens -= cost
+    reset = math.ceil((budget.per_minute - tokens) / budget.rate)
+    retry_after = 0 if allowed else math.ceil((cost - tokens) / budget.rate)
+    return tokens, Decision(allowed, budget.per_minute, int(tokens), reset, retry_after)
+
+
+class MemoryStore:
+    """Buckets in a bounded dict; idle buckets are evicted first."""
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, budget: Budget, cost: float = 1.0) -> Decision:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (float(budget.per_minute), now))
+        tokens, decision = _decide(_refill(tokens, updated, now, budget), budget, cost)
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_entries:
+            self._buckets.popitem(last=False)
+        return decision
+
+
+class SQLiteStore:
+    """
+    Buckets in a SQLite file shared by every worker process on the host.
+
+    Each take is one short ``BEGIN IMMEDIATE`` transaction run on a worker
+    thread, so the event loop never waits on the file lock.
+    """
+
+    # Buckets untouched this long are full again and can be forgotten
+    IDLE_SECONDS = 3600
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets "
+            "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._takes = 0
+
+    def _take(self, key: str, budget: Budget, cost: float) -> Decision:
+        # Wall-clock time: monotonic clocks are not comparable across processes
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens = float(budget.per_minute) if row is None else _refill(row[0], row[1], now, budget)
+                tokens, decision = _decide(tokens, budget, cost)
+                self._conn.execute(
+                    "INSERT INTO rate_limit_buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                    (key, tokens, now)
+                )
+                self._takes += 1
+                if self._takes % self.PRUNE_EVERY == 0:
+                    self._conn.execute(
+                        "DELETE FROM rate_limit_buckets WHERE updated < ?", (now - self.IDLE_SECONDS,)
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return decision
+
+    async def take(self, key: str, budget: Budget, cost: float = 1.0) -> Decision:
+        return await asyncio.to_thread(self._take, key, budget, cost)
+
+
+_store = None
+
+
+def get_store():
+    """The configured bucket store (created on first use)."""
+    global _store
+    if _store is None:
+        if settings.rate_limit_store == "sqlite":
+            _store = SQLiteStore(settings.rate_limit_sqlite_path)
+        else:
+            _store = MemoryStore()
+    return _store
+
+
+def client_ip(scope: Scope) -> str:
+    """Client address, or the first X-Forwarded-For hop behind a trusted proxy."""
+    if settings.rate_limit_trust_forwarded_for:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    """Per-IP token bucket applied to every request before authentication."""
+
+    def __init__(self, app: ASGIApp, per_minute: int):
+        self.app = app
+        self.budget = Budget("ip", per_minute)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.budget.per_minute <= 0 or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        decision = await get_store().take(f"ip:{client_ip(scope)}", self.budget)
+        if decision.allowed:
+            await self.app(scope, receive, send)
+            return
+        response = Response(
+            content='{"detail":"Too many requests"}',
+            status_code=429,
+            media_type="application/json",
+            headers=decision.headers(self.budget)
+        )
+        await response(scope, receive, send)
+
+
+def _user_budget(request: Request) -> Budget:
+    route = request.scope.get("route")
+    if route is not None and (request.method, route.path) in EXPENSIVE_ROUTES:
+        return Budget("expensive", settings.rate_limit_expensive_per_minute)
+    if route is not None and (request.method, route.path) in POLL_ROUTES and "if-none-match" in request.headers:
+        # Status polls must not drain the bucket the rest of the dashboard uses
+        return Budget("poll", settings.rate_limit_poll_per_minute)
+    return Budget("default", settings.rate_limit_per_minute)
+
+
+async def enforce_user_rate_limit(
+    request: Request,
+    response: Response,
+    user_info: dict = Depends(verify_clerk_token)
+) -> None:
+    """Router dependency: charge the authenticated user's bucket for this route."""
+    budget = _user_budget(request)
+    if not settings.rate_limit_enabled or budget.per_minute <= 0:
+        return
+    decision = await get_store().take(f"user:{user_info['clerk_user_id']}:{budget.name}", budget)
+    if not decision.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded; retry in {decision.retry_after}s",
+            headers=decision.headers(budget)
+        )
+    response.headers.update(decision.headers(budget))
@@ -0,0 +1,242 @@
+"""
+Response rendering, conditional requests and compression.
+
+``default_response_class()`` picks the JSON renderer for the app (orjson when
+installed), the ETag helpers let read endpoints answer ``If-None-Match``
+with a 304 before building a body, and ``CompressionMiddleware`` negotiates
+brotli/gzip from ``Accept-Encoding`` for responses above a size threshold.
+"""
+import hashlib
+import zlib
+from typing import Any, Iterable, List, Optional, Type
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+# Media types worth compressing; images, archives etc. already are
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "text/",
+    "image/svg+xml",
+)
+
+
+def default_response_class() -> Type[JSONResponse]:
+    """JSONResponse subclass selected by ``settings.json_renderer``."""
+    if settings.json_renderer == "orjson":
+        try:
+            import orjson  # noqa: F401
+        except ImportError:
+            return JSONResponse
+        from fastapi.responses import ORJSONResponse
+        return ORJSONResponse
+    return JSONResponse
+
+
+# Clients may keep the response but must revalidate it (cheap with ETags)
+REVALIDATE = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag derived from the values that determine a representation."""
+    raw = "\x1f".join("" if part is None else str(part) for part in parts)
+    return '"' + hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match lists ``etag`` (weak comparison, per RFC 9110)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response for a matching ``If-None-Match``."""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": REVALIDATE})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    """Attach ``etag`` and the revalidation policy to a 200 response."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = REVALIDATE
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def parse_accept_encoding(header: str) -> dict:
+    """Map each coding in an Accept-Encoding header to its q-value."""
+    accepted = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(header: str, supported: Iterable[str]) -> Optional[str]:
+    """First server-preferred coding the client accepts (q > 0), or None."""
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    for coding in supported:
+        if accepted.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+
+class _Compressor:
+    """Streaming gzip or brotli encoder with a common compress/flush interface."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._brotli = _brotli().Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            # wbits=31 selects the gzip container
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def finish(self) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+class CompressionMiddleware:
+    """
+    Compress response bodies with the best coding the client accepts.
+
+    Bodies are buffered until ``minimum_size`` bytes have been seen: smaller
+    responses are sent as-is, larger ones are compressed (streamed when the
+    app sends more chunks). Responses that already carry a Content-Encoding
+    or are not a compressible media type pass through untouched.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        encodings: List[str],
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4
+    ):
+        self.app = app
+        # Brotli is optional; drop it when the package is missing
+        self.encodings = [e for e in encodings if e == "gzip" or (e == "br" and _brotli() is not None)]
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start_message: Optional[Message] = None
+        self.buffer = bytearray()
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            if "content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                self.passthrough = True
+                await self._send(message)
+                return
+            self.start_message = message
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is not None:
+            chunk = self.compressor.compress(body)
+            if not more_body:
+                chunk += self.compressor.finish()
+            if chunk or not more_body:
+                await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            return
+
+        self.buffer += body
+        if len(self.buffer) < self.middleware.minimum_size:
+            if more_body:
+                return
+            # Whole body is below the threshold: not worth the CPU
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            await self._send(self.start_message)
+            await self._send({"type": "http.response.body", "body": bytes(self.buffer), "more_body": False})
+            return
+
+        self.compressor = _Compressor(
+            self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality
+        )
+        chunk = self.compressor.compress(bytes(self.buffer))
+        self.buffer.clear()
+        if not more_body:
+            chunk += self.compressor.finish()
+
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        # The encoded bytes differ from the identity body a strong ETag describes
+        etag = headers.get("ETag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = "W/" + etag
+        if more_body:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(len(chunk))
+        await self._send(self.start_message)
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -0,0 +1,94 @@
+"""Operator-only endpoints (callers must be listed in ADMIN_USER_IDS)."""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import get_async_db
+from app.dependencies import require_admin
+from app.models.generation import Generation
+from app.profiling import profiler, to_speedscope
+from app.schemas.schemas import GenerationTimingsSummary, ProfilingConfig, ProfilingState
+from app.services.stage_timings import summarize
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/generations/timings", response_model=GenerationTimingsSummary)
+async def generation_timings(
+    hours: float = Query(24.0, gt=0, le=24 * 90, description="Look-back window"),
+    status: Optional[str] = Query(None, description="Only generations with this status"),
+    limit: int = Query(10000, ge=1, le=100000, description="Most recent generations considered"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Percentiles of per-stage durations and counts over recent generations."""
+    since = datetime.now(timezone.utc) - timedelta(hours=hours)
+    query = select(Generation.timings).where(
+        Generation.created_at >= since,
+        Generation.timings.is_not(None)
+    )
+    if status:
+        query = query.where(Generation.status == status)
+    records = (await db.scalars(query.order_by(Generation.created_at.desc()).limit(limit))).all()
+    return GenerationTimingsSummary(window_hours=hours, status=status, **summarize(records))
+
+
+def _profiling_state() -> ProfilingState:
+    config = profiler.config()
+    return ProfilingState(
+        enabled=config is not None,
+        config=ProfilingConfig(**config) if config else None,
+        expires_at=datetime.fromtimestamp(config["expires_at"], tz=timezone.utc) if config else None,
+        profiles=profiler.list_profiles()
+    )
+
+
+@router.get("/profiling", response_model=ProfilingState)
+async def profiling_state():
+    """Whether the sampling profiler is on, and the profiles saved so far."""
+    return _profiling_state()
+
+
+@router.put("/profiling", response_model=ProfilingState)
+async def start_profiling(config: ProfilingConfig):
+    """Profile a share of requests and/or generations, on every worker, for ``duration_seconds``."""
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=409, detail="Profiling is disabled on this server (PROFILING_ENABLED)")
+    if not (config.request_rate or config.generation_rate or config.generation_id):
+        raise HTTPException(status_code=422, detail="Set request_rate, generation_rate or generation_id")
+    profiler.configure(config.model_dump())
+    logger.info(f"Profiling started: {config.model_dump()}")
+    return _profiling_state()
+
+
+@router.delete("/profiling", response_model=ProfilingState)
+async def stop_profiling():
+    """Stop selecting new work for profiling (profiles in progress still finish)."""
+    profiler.configure(None)
+    logger.info("Profiling stopped")
+    return _profiling_state()
+
+
+@router.get("/profiling/profiles/{name}")
+async def download_profile(
+    name: str,
+    format: str = Query("collapsed", pattern="^(collapsed|speedscope)$",
+                        description="collapsed (flamegraph.pl, speedscope) or speedscope JSON")
+):
+    """A saved profile, as collapsed stacks or a speedscope document."""
+    collapsed = profiler.read_profile(name)
+    if collapsed is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "speedscope":
+        return JSONResponse(
+            to_speedscope(name, collapsed),
+            headers={"Content-Disposition": f'attachment; filename="{name[:-len(".collapsed")]}.speedscope.json"'}
+        )
+    return PlainTextResponse(collapsed, headers={"Content-Disposition": f'attachment; filename="{name}"'})
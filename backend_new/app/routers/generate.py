@@ -1,170 +1,185 @@
 """README generation router."""
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
-from sqlalchemy.orm import Session
+import asyncio
+import base64
+import json
+import logging
+import time
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Request, Response
+from opentelemetry.trace import SpanKind
+from sqlalchemy import select, literal, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager, selectinload
 from typing import List, Tuple, Optional
-from app.database import get_db
+from app.database import get_async_db, AsyncSessionLocal
 from app.models.user import User
 from app.models.repository import Repository
 from app.models.generation import Generation
+from app.models.content_blob import ContentBlob
 from app.schemas.schemas import (
     GenerateRequest,
     GenerateResponse,
     GenerationResponse,
+    GenerationHistoryPage,
+    GenerationSummary,
     CommitRequest
 )
-from app.config import settings
 from app.services.github import GitHubService
 from app.services.ai_generator import AIGeneratorService
-from app.routers.auth import verify_clerk_token
-
-router = APIRouter(prefix="/api/generate", tags=["generate"])
-
-import os
-from datetime import datetime
-
-def log_trace(msg):
-    try:
-        with open("generation_trace.log", "a") as f:
-            f.write(f"{datetime.now()}: {msg}\n")
-    except:
-        pass
-
+from app.services.content_store import decompress_content, store_content
+from app.services.generation_jobs import PENDING_RETRY, jobs
+from app.services.stage_timings import StageTimings
+from app import tracing
+from app.metrics import GENERATION_DURATION
+from app.responses import etag_matches, make_etag, not_modified, set_etag
+from app.dependencies import get_user_with_token
+from app.logging_config import generation_id_var
 
+logger = logging.getLogger(__name__)
 
-def get_user_with_token(
-    user_info: dict = Depends(verify_clerk_token),
-    db: Session = Depends(get_db)
-) -> Tuple[User, str]:
-    """Get user and their GitHub access token."""
-    clerk_user_id = user_info["clerk_user_id"]
-    user = db.query(User).filter(User.clerk_user_id == clerk_user_id).first()
-    
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    github_token = user_info.get("github_token") or user.github_access_token
-    
-    # Fallback to system token from env
-    if not github_token:
-        github_token = settings.github_token
-    
-    if not github_token:
-        raise HTTPException(
-            status_code=400,
-            detail="GitHub access token not found. Please connect your GitHub account."
-        )
-    
-    return user, github_token
+router = APIRouter(prefix="/api/generate", tags=["generate"])
 
 
 async def generate_readme_background(
     generation_id: str,
     repo_id: str,
     template_type: str,
-    github_token: str
+    github_token: str,
+    trace_parent: Optional[str] = None,
+    queued_at: Optional[float] = None
 ):
-    """Background task to generate README."""
-    log_trace(f"Background task started for generation_id: {generation_id}")
-    from app.database import SessionLocal
+    """
+    Background task to generate README.
+
+    ``trace_parent`` (W3C traceparent of the request that queued it) makes
+    the job's spans part of that request's trace; resumed jobs start a new one.
+    ``queued_at`` (``time.time()`` when the job was handed over: queued by
+    the request, or claimed on resume) is the start of the "queue" stage.
+    """
+    generation_id_var.set(generation_id)
+    logger.info("Background generation started")
+    started = time.perf_counter()
+    final_status = "failed"
+    timings = StageTimings()
     
-    db = SessionLocal()
-    try:
-        # Get repository
-        repo = db.query(Repository).filter(Repository.id == repo_id).first()
-        if not repo:
-            log_trace(f"Repo not found in DB: {repo_id}")
-            return
+    with tracing.tracer.start_as_current_span("generation", kind=SpanKind.CONSUMER, attributes={
+        "generation.id": generation_id,
+        "generation.template": template_type,
+        "repository.id": repo_id,
+    }, context=tracing.parse_traceparent(trace_parent)) as span:
+        db = AsyncSessionLocal()
+        try:
+            # Time spent waiting to start, since queued by the request or claimed on resume
+            if queued_at is not None:
+                timings.add_stage("queue", max(0.0, (time.time() - queued_at) * 1000))
         
-        # Parse owner/repo
-        owner, repo_name = repo.full_name.split("/", 1)
-        log_trace(f"Generating for {owner}/{repo_name} on branch {repo.default_branch}")
+            # Get repository
+            repo = await db.get(Repository, repo_id)
+            if not repo:
+                logger.warning(f"Repo not found in DB: {repo_id}")
+                return
         
-        # Initialize services
-        github_service = GitHubService(github_token)
-        ai_service = AIGeneratorService()
+            # Parse owner/repo
+            owner, repo_name = repo.full_name.split("/", 1)
+            logger.info(f"Generating for {owner}/{repo_name} on branch {repo.default_branch}")
         
-        # Generate README
-        log_trace("Calling AI service...")
-        content = await ai_service.generate_readme(
-            github_service,
-            owner,
-            repo_name,
-            repo.default_branch,
-            template_type
-        )
-        log_trace(f"Content generated, length: {len(content)}")
+            # End the read transaction so no connection is held during the LLM call
+            await db.commit()
         
-        # Update generation
-        generation = db.query(Generation).filter(Generation.id == generation_id).first()
-        if generation:
-            generation.content = content
-            generation.status = "completed"
-            db.commit()
-            log_trace("Database updated to completed")
-    except Exception as e:
-        # Update generation status to failed
-        log_trace(f"EXCEPTION in background task: {str(e)}")
-        try:
-            generation = db.query(Generation).filter(Generation.id == generation_id).first()
-            if generation:
-                generation.status = "failed"
-                db.commit()
-        except:
-            pass
-            
-        error_msg = f"Error generating README: {str(e)}"
-        print(error_msg)
-        try:
-            import logging
-            # Configure logging to append to file
-            logging.basicConfig(
-                filename='backend_errors.log', 
-                level=logging.ERROR,
-                format='%(asctime)s - %(levelname)s - %(message)s'
+            # Initialize services
+            github_service = GitHubService(github_token)
+            ai_service = AIGeneratorService()
+        
+            # Generate README
+            content = await ai_service.generate_readme(
+                github_service,
+                owner,
+                repo_name,
+                repo.default_branch,
+                template_type,
+                timings=timings
             )
-            logging.error(error_msg)
-        except:
-            print("Failed to write to error log")
-    finally:
-        db.close()
+            logger.info(f"Content generated, length: {len(content)}")
+        
+            # Update generation
+            store_started = time.perf_counter()
+            generation = await db.get(Generation, generation_id)
+            if generation:
+                generation.blob = await store_content(db, content)
+                generation.status = "completed"
+                timings.add_stage("store", (time.perf_counter() - store_started) * 1000)
+                generation.timings = timings.to_dict()
+                try:
+                    await db.commit()
+                except IntegrityError:
+                    # An identical body was stored concurrently (reuse that blob), or
+                    # maintenance pruned the orphaned blob we reused (store it again)
+                    await db.rollback()
+                    generation = await db.get(Generation, generation_id)
+                    generation.blob = await store_content(db, content)
+                    generation.status = "completed"
+                    generation.timings = timings.to_dict()
+                    await db.commit()
+                final_status = "completed"
+                logger.info("Generation completed")
+        except Exception as e:
+            # Update generation status to failed
+            logger.exception(f"Error generating README: {e}")
+            span.record_exception(e)
+            tracing.set_error(span, f"{type(e).__name__}: {str(e)[:200]}")
+            try:
+                await db.rollback()
+                generation = await db.get(Generation, generation_id)
+                if generation:
+                    generation.status = "failed"
+                    # Partial timings show which stage failed and how long it took
+                    generation.timings = timings.to_dict()
+                    await db.commit()
+            except Exception:
+                logger.exception("Failed to mark generation as failed")
+        except asyncio.CancelledError:
+            # Interrupted by shutdown; the row is checkpointed for retry
+            final_status = "interrupted"
+            raise
+        finally:
+            GENERATION_DURATION.labels(final_status).observe(time.perf_counter() - started)
+            span.set_attribute("generation.status", final_status)
+            await db.close()
 
 
 @router.post("/", response_model=GenerateResponse)
 async def generate_readme(
     request: GenerateRequest,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_and_token: Tuple[User, str] = Depends(get_user_with_token)
 ):
     """Generate README with AI."""
-    log_trace(f"Received generation request for repo_id: {request.repo_id}")
     user, github_token = user_and_token
-    log_trace(f"User: {user.id}, Token present: {bool(github_token)}")
+    logger.info(f"Received generation request for repo_id: {request.repo_id}")
     
-    print(f"DEBUG: Handling Generate Request. RepoID: '{request.repo_id}'. User: '{user.id}'", flush=True)
+    if jobs.draining:
+        # Shutting down: let the client retry against another instance
+        raise HTTPException(
+            status_code=503,
+            detail="Server is shutting down; retry shortly",
+            headers={"Retry-After": "5"}
+        )
     
     # Strip whitespace just in case
     request.repo_id = request.repo_id.strip() if request.repo_id else ""
 
     # Verify repository belongs to user
-    repo = db.query(Repository).filter(
+    repo = await db.scalar(select(Repository).where(
         Repository.id == request.repo_id,
         Repository.user_id == user.id
-    ).first()
+    ))
     
     if not repo:
-        print(f"DEBUG: Repo NOT found via standard query.", flush=True)
-        # Check if repo exists at all
-        any_repo = db.query(Repository).filter(Repository.id == request.repo_id).first()
-        if any_repo:
-             print(f"DEBUG: Repo EXISTS but belongs to user: {any_repo.user_id}", flush=True)
-        else:
-             print(f"DEBUG: Repo does NOT exist in DB at all. ID provided: {request.repo_id}", flush=True)
-             
+        logger.info(f"Repository {request.repo_id} not found for user {user.id}")
         raise HTTPException(status_code=404, detail="Repository not found")
     
-    print(f"DEBUG: Repo Found: {repo.full_name}", flush=True)
-    
     # Create generation record
     generation = Generation(
         repo_id=repo.id,
@@ -173,16 +188,21 @@ async def generate_readme(
     )
     
     db.add(generation)
-    db.commit()
-    db.refresh(generation)
+    await db.commit()
+    await db.refresh(generation)
+    logger.info(f"Queued generation {generation.id} for {repo.full_name}")
     
-    # Start background task
+    # Start background task (tracked so shutdown can drain or checkpoint it)
     background_tasks.add_task(
+        jobs.run,
+        str(generation.id),
         generate_readme_background,
         str(generation.id),
         repo.id,
         request.template_type,
-        github_token
+        github_token,
+        tracing.traceparent(),
+        time.time()
     )
     
     return GenerateResponse(
@@ -192,59 +212,198 @@ async def generate_readme(
     )
 
 
-@router.get("/history", response_model=List[GenerationResponse])
+async def resume_checkpointed_generations() -> int:
+    """
+    Restart generations a previous shutdown checkpointed as ``pending_retry``.
+
+    Each row is claimed with a conditional UPDATE, so with several worker
+    processes starting at once every generation is resumed exactly once.
+    Returns the number resumed by this process.
+    """
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(Generation.id, Generation.repo_id, Generation.template_type, User.github_access_token)
+            .join(Repository, Generation.repo_id == Repository.id)
+            .join(User, Repository.user_id == User.id)
+            .where(Generation.status == PENDING_RETRY)
+        )).all()
+        resumed = 0
+        for row in rows:
+            claimed = await db.execute(
+                update(Generation)
+                .where(Generation.id == row.id, Generation.status == PENDING_RETRY)
+                .values(status="pending")
+            )
+            await db.commit()
+            if claimed.rowcount != 1:
+                continue
+            jobs.submit(
+                row.id,
+                generate_readme_background,
+                row.id,
+                row.repo_id,
+                row.template_type or "professional",
+                row.github_access_token,
+                None,
+                time.time()
+            )
+            resumed += 1
+    if resumed:
+        logger.info(f"Resumed {resumed} checkpointed generations")
+    return resumed
+
+
+def _encode_cursor(created_at: datetime, generation_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), generation_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        created_at, generation_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(created_at), generation_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _history_query(
+    user_id: str,
+    repo_id: Optional[str],
+    after: Optional[Tuple[datetime, str]],
+    limit: int
+):
+    """Statement for a page of the user's generations, newest first, after the ``after`` cursor."""
+    # Project only what the dashboard needs; the compressed body is never read
+    query = (
+        select(
+            Generation.id,
+            Generation.repo_id,
+            Generation.template_type,
+            Generation.status,
+            Generation.created_at,
+            Generation.content_hash,
+            ContentBlob.preview,
+            ContentBlob.size.label("content_bytes"),
+        )
+        .join(Repository)
+        .outerjoin(ContentBlob, Generation.content_hash == ContentBlob.sha256)
+        .where(Repository.user_id == user_id)
+    )
+    if repo_id:
+        query = query.where(Generation.repo_id == repo_id)
+    if after:
+        created_at, generation_id = after
+        query = query.where(
+            tuple_(Generation.created_at, Generation.id) < tuple_(
+                literal(created_at, Generation.created_at.type), literal(generation_id)
+            )
+        )
+    return query.order_by(Generation.created_at.desc(), Generation.id.desc()).limit(limit)
+
+
+@router.get("/history", response_model=GenerationHistoryPage)
 async def get_generation_history(
+    request: Request,
+    response: Response,
     repo_id: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
     user_and_token: Tuple[User, str] = Depends(get_user_with_token)
 ):
-    """List past README generations."""
+    """List past README generations, newest first. Fetch full content via GET /{generation_id}."""
     user, _ = user_and_token
     
-    query = db.query(Generation).join(Repository).filter(Repository.user_id == user.id)
+    after = _decode_cursor(cursor) if cursor else None
+    # Fetch one extra row to know whether another page exists
+    rows = (await db.execute(_history_query(user.id, repo_id, after, limit + 1))).all()
     
-    if repo_id:
-        query = query.filter(Generation.repo_id == repo_id)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1].created_at, rows[-1].id)
     
-    generations = query.order_by(Generation.created_at.desc()).limit(50).all()
+    # Pending generations change status/content_hash as they finish
+    etag = make_etag(next_cursor, *(
+        f"{row.id}:{row.status}:{row.content_hash}:{row.template_type}" for row in rows
+    ))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     
-    return generations
+    return GenerationHistoryPage(
+        items=[GenerationSummary.model_validate(row._mapping) for row in rows],
+        next_cursor=next_cursor
+    )
 
 
 @router.get("/{generation_id}", response_model=GenerationResponse)
 async def get_generation(
     generation_id: str,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     user_and_token: Tuple[User, str] = Depends(get_user_with_token)
 ):
-    """Get specific generation."""
+    """Get specific generation. Polling clients should send If-None-Match."""
     user, _ = user_and_token
     
-    generation = db.query(Generation).join(Repository).filter(
-        Generation.id == generation_id,
-        Repository.user_id == user.id
-    ).first()
+    # Row without the body first: an unchanged generation never touches the blob
+    generation = await db.scalar(
+        select(Generation)
+        .join(Repository)
+        .where(
+            Generation.id == generation_id,
+            Repository.user_id == user.id
+        )
+    )
     
     if not generation:
         raise HTTPException(status_code=404, detail="Generation not found")
     
-    return generation
+    etag = make_etag(generation.id, generation.status, generation.content_hash, generation.template_type)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    
+    content = None
+    if generation.content_hash is not None:
+        blob = await db.get(ContentBlob, generation.content_hash)
+        if blob is not None:
+            content = decompress_content(blob)
+        else:
+            # Only possible for rows written before foreign keys were enforced
+            logger.warning(f"Generation {generation.id} references missing content {generation.content_hash}")
+    return GenerationResponse(
+        id=generation.id,
+        repo_id=generation.repo_id,
+        template_type=generation.template_type,
+        status=generation.status,
+        created_at=generation.created_at,
+        content=content,
+        timings=generation.timings
+    )
 
 
 @router.post("/commit")
 async def commit_readme(
     request: CommitRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_and_token: Tuple[User, str] = Depends(get_user_with_token)
 ):
     """Commit generated README to GitHub."""
     user, github_token = user_and_token
     
     # Get generation
-    generation = db.query(Generation).join(Repository).filter(
-        Generation.id == request.generation_id,
-        Repository.user_id == user.id
-    ).first()
+    generation = await db.scalar(
+        select(Generation)
+        .join(Repository)
+        .options(contains_eager(Generation.repository), selectinload(Generation.blob))
+        .where(
+            Generation.id == request.generation_id,
+            Repository.user_id == user.id
+        )
+    )
     
     if not generation:
         raise HTTPException(status_code=404, detail="Generation not found")
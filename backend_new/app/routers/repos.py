@@ -1,82 +1,108 @@
 """Repository router for GitHub operations."""
+import logging
+from datetime import datetime, timezone
+
 import httpx
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Tuple
-from app.database import get_db
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional, Tuple
+from app.database import get_async_db, insert_for_dialect
 from app.models.user import User
 from app.models.repository import Repository
+from app.models.catalog import CatalogSyncState
 from app.schemas.schemas import (
     RepositoryResponse,
     GitHubRepo,
     FileTreeResponse,
     FileTreeItem
 )
+from app.responses import etag_matches, make_etag, not_modified, set_etag
+from app.services import catalog
 from app.services.github import GitHubService
-from app.routers.auth import verify_clerk_token
+from app.dependencies import get_user_with_token
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/repos", tags=["repos"])
 
+# Upper bound on repositories per bulk import request
+MAX_BULK_IMPORT = 5000
 
-def get_user_with_token(
-    user_info: dict = Depends(verify_clerk_token),
-    db: Session = Depends(get_db)
-) -> Tuple[User, str]:
-    """Get user and their GitHub access token. Creates user if not exists."""
-    clerk_user_id = user_info["clerk_user_id"]
-    github_token = user_info.get("github_token")
-    
-    user = db.query(User).filter(User.clerk_user_id == clerk_user_id).first()
-    
-    if not user:
-        # Auto-create user if they have a GitHub token
-        if github_token:
-            user = User(
-                clerk_user_id=clerk_user_id,
-                github_access_token=github_token
-            )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail="GitHub access token not found. Please connect your GitHub account in Clerk."
-            )
-    
-    # Get GitHub token from user or from Clerk JWT
-    token = github_token or user.github_access_token
-    
-    if not token:
-        raise HTTPException(
-            status_code=400,
-            detail="GitHub access token not found. Please connect your GitHub account."
-        )
-    
-    return user, token
+
+def _imported_repository(user_id: str, github_repo_id: int):
+    """Statement selecting the user's import of a GitHub repository (served by its unique index)."""
+    return select(Repository).where(
+        Repository.github_repo_id == github_repo_id,
+        Repository.user_id == user_id
+    )
 
 
 @router.get("/", response_model=List[GitHubRepo])
 async def list_repositories(
     page: int = Query(1, ge=1),
     per_page: int = Query(100, ge=1, le=100),
+    q: Optional[str] = Query(None, description="Search in owner/name and description"),
+    language: Optional[str] = None,
+    visibility: Optional[str] = None,
+    sort: Literal["updated", "stars", "forks", "name"] = "updated",
+    direction: Literal["asc", "desc"] = "desc",
+    refresh: bool = Query(False, description="Sync with GitHub before answering"),
+    db: AsyncSession = Depends(get_async_db),
     user_and_token: Tuple[User, str] = Depends(get_user_with_token)
 ):
-    """List user's GitHub repositories."""
+    """
+    List user's GitHub repositories from the local catalog.
+
+    Only the first load (or ``refresh=true``) waits for GitHub; afterwards a
+    stale catalog is answered as-is and refreshed in the background.
+    """
     user, github_token = user_and_token
-    github_service = GitHubService(github_token)
     
+    state = await db.get(CatalogSyncState, user.id)
+    if state is None or state.last_synced_at is None or refresh:
+        try:
+            await catalog.sync_catalog(db, user.id, github_token)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to fetch repositories: {str(e)}")
+    elif catalog.is_stale(state):
+        catalog.refresh_in_background(user.id, github_token)
+    
+    rows = await db.scalars(catalog.search(
+        user.id,
+        q=q,
+        language=language,
+        visibility=visibility,
+        sort=sort,
+        direction=direction,
+        offset=(page - 1) * per_page,
+        limit=per_page
+    ))
+    return [catalog.to_github_repo(row) for row in rows]
+
+
+@router.post("/sync")
+async def sync_repositories(
+    full: bool = Query(False, description="Walk every page and drop repositories GitHub no longer lists"),
+    db: AsyncSession = Depends(get_async_db),
+    user_and_token: Tuple[User, str] = Depends(get_user_with_token)
+):
+    """Sync the repository catalog with GitHub now and report what changed."""
+    user, github_token = user_and_token
     try:
-        repos = await github_service.get_user_repos(page=page, per_page=per_page)
-        return repos
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch repositories: {str(e)}")
+        return await catalog.sync_catalog(db, user.id, github_token, full=full or None)
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(
+            status_code=e.response.status_code,
+            detail=f"GitHub API error: {e.response.text or str(e)}"
+        )
 
 
 @router.get("/fetch/{identifier}", response_model=RepositoryResponse)
 async def fetch_repository_by_identifier(
     identifier: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_and_token: Tuple[User, str] = Depends(get_user_with_token)
 ):
     """Fetch a repository from GitHub by numeric ID or owner/repo, import to DB, and return it."""
@@ -98,10 +124,7 @@ async def fetch_repository_by_identifier(
                 )
             gh_repo = await github_service.get_repo_by_id(rid)
 
-        existing = db.query(Repository).filter(
-            Repository.github_repo_id == gh_repo.id,
-            Repository.user_id == user.id
-        ).first()
+        existing = await db.scalar(_imported_repository(user.id, gh_repo.id))
         if existing:
             return existing
 
@@ -109,11 +132,17 @@ async def fetch_repository_by_identifier(
             user_id=user.id,
             github_repo_id=gh_repo.id,
             full_name=gh_repo.full_name,
-            default_branch=gh_repo.default_branch or "main"
+            default_branch=gh_repo.default_branch or "main",
+            last_synced_at=datetime.now(timezone.utc)
         )
         db.add(new_repo)
-        db.commit()
-        db.refresh(new_repo)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # A concurrent request imported the same repo first
+            await db.rollback()
+            return await db.scalar(_imported_repository(user.id, gh_repo.id))
+        await db.refresh(new_repo)
         return new_repo
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 404:
@@ -131,20 +160,27 @@ async def fetch_repository_by_identifier(
 @router.get("/{repo_id}", response_model=RepositoryResponse)
 async def get_repository(
     repo_id: str,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     user_and_token: Tuple[User, str] = Depends(get_user_with_token)
 ):
     """Get repository details from database."""
     user, _ = user_and_token
     
-    repo = db.query(Repository).filter(
+    repo = await db.scalar(select(Repository).where(
         Repository.id == repo_id,
         Repository.user_id == user.id
-    ).first()
+    ))
     
     if not repo:
         raise HTTPException(status_code=404, detail="Repository not found")
     
+    etag = make_etag(repo.id, repo.github_repo_id, repo.full_name, repo.default_branch, repo.last_synced_at)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    
     return repo
 
 
@@ -152,17 +188,17 @@ async def get_repository(
 async def get_repository_tree(
     repo_id: str,
     branch: str = Query("main"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_and_token: Tuple[User, str] = Depends(get_user_with_token)
 ):
     """Get repository file tree from GitHub."""
     user, github_token = user_and_token
     
     # Get repo from database
-    repo = db.query(Repository).filter(
+    repo = await db.scalar(select(Repository).where(
         Repository.id == repo_id,
         Repository.user_id == user.id
-    ).first()
+    ))
     
     if not repo:
         raise HTTPException(status_code=404, detail="Repository not found")
@@ -174,7 +210,7 @@ async def get_repository_tree(
     
     try:
         tree = await github_service.get_repo_tree(owner, repo_name, branch or repo.default_branch)
-        return FileTreeResponse(tree=tree)
+        return FileTreeResponse(tree=tree.to_items())
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch file tree: {str(e)}")
 
@@ -182,29 +218,24 @@ async def get_repository_tree(
 @router.post("/import", response_model=RepositoryResponse)
 async def import_repository(
     github_repo: GitHubRepo,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_and_token: Tuple[User, str] = Depends(get_user_with_token)
 ):
     """Import/sync a repository to the database."""
-    import logging
-    logger = logging.getLogger("app.routers.auth") # Use same logger
-    
     user, _ = user_and_token
     logger.info(f"Importing repo: {github_repo.full_name} (ID: {github_repo.id}) for user {user.id}")
+    # Bound rather than func.now(), so every path stores the same representation
+    now = datetime.now(timezone.utc)
     
     # Check if repository already exists
-    existing_repo = db.query(Repository).filter(
-        Repository.github_repo_id == github_repo.id,
-        Repository.user_id == user.id
-    ).first()
+    existing_repo = await db.scalar(_imported_repository(user.id, github_repo.id))
     
     if existing_repo:
         logger.info(f"Repo already exists: {existing_repo.id}")
         # Update last_synced_at
-        from datetime import datetime, timezone
-        existing_repo.last_synced_at = datetime.now(timezone.utc)
-        db.commit()
-        db.refresh(existing_repo)
+        existing_repo.last_synced_at = now
+        await db.commit()
+        await db.refresh(existing_repo)
         return existing_repo
     
     # Create new repository
@@ -212,12 +243,76 @@ async def import_repository(
         user_id=user.id,
         github_repo_id=github_repo.id,
         full_name=github_repo.full_name,
-        default_branch=github_repo.default_branch
+        default_branch=github_repo.default_branch,
+        last_synced_at=now
     )
     
     db.add(new_repo)
-    db.commit()
-    db.refresh(new_repo)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent request imported the same repo first
+        await db.rollback()
+        existing_repo = await db.scalar(_imported_repository(user.id, github_repo.id))
+        logger.info(f"Repo imported concurrently: {existing_repo.id}")
+        return existing_repo
+    await db.refresh(new_repo)
     logger.info(f"Created new repo: {new_repo.id}")
     
     return new_repo
+
+
+def _upsert_repositories(dialect_name: str):
+    """INSERT ... ON CONFLICT (user_id, github_repo_id) DO UPDATE for the given dialect."""
+    try:
+        insert = insert_for_dialect(dialect_name)
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    statement = insert(Repository)
+    return statement.on_conflict_do_update(
+        index_elements=[Repository.user_id, Repository.github_repo_id],
+        set_={
+            "full_name": statement.excluded.full_name,
+            "default_branch": statement.excluded.default_branch,
+            "last_synced_at": statement.excluded.last_synced_at,
+        }
+    )
+
+
+@router.post("/import/bulk", response_model=List[RepositoryResponse])
+async def import_repositories_bulk(
+    github_repos: List[GitHubRepo] = Body(..., max_length=MAX_BULK_IMPORT),
+    db: AsyncSession = Depends(get_async_db),
+    user_and_token: Tuple[User, str] = Depends(get_user_with_token)
+):
+    """
+    Import/sync many repositories in one transaction.
+
+    Uses a single set-based upsert on the (user_id, github_repo_id) unique
+    index: new repositories are inserted, known ones get their name, default
+    branch and last_synced_at refreshed. Results follow the request order.
+    """
+    user, _ = user_and_token
+    # One row per GitHub repo; an upsert may not touch the same row twice
+    unique_repos = {repo.id: repo for repo in github_repos}
+    if not unique_repos:
+        return []
+    logger.info(f"Bulk importing {len(unique_repos)} repos for user {user.id}")
+
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "user_id": user.id,
+            "github_repo_id": repo.id,
+            "full_name": repo.full_name,
+            "default_branch": repo.default_branch,
+            "last_synced_at": now,
+        }
+        for repo in unique_repos.values()
+    ]
+    # RETURNING order is unspecified; asking SQLAlchemy to sort it disables
+    # multi-row batching on SQLite, so restore request order here instead
+    statement = _upsert_repositories(db.bind.dialect.name).returning(Repository)
+    imported = {repo.github_repo_id: repo for repo in await db.scalars(statement, rows)}
+    await db.commit()
+    return [imported[github_repo_id] for github_repo_id in unique_repos]
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 from datetime import datetime
 
 # User Schemas
@@ -55,17 +55,48 @@ class GenerationBase(BaseModel):
 class GenerationCreate(GenerationBase):
     repo_id: str
 
+class GenerationTimings(BaseModel):
+    """Where a generation's time went: per-stage milliseconds plus the counts behind them."""
+    stages_ms: Dict[str, float] = {}  # queue/tree_fetch/file_fetch/prompt_build/llm/store
+    total_ms: Optional[float] = None
+    model: Optional[str] = None
+    tree_items: Optional[int] = None
+    files_fetched: Optional[int] = None
+    files_failed: Optional[int] = None
+    file_bytes: Optional[int] = None
+    prompt_chars: Optional[int] = None
+    prompt_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    llm_attempts: Optional[int] = None
+    llm_retries: Optional[int] = None
+    llm_fallbacks: Optional[int] = None
+
 class GenerationResponse(GenerationBase):
-    """Used for GET /generate/{id} and /history (DB Generation model)."""
+    """Used for GET /generate/{id} (DB Generation model)."""
     id: str
     repo_id: str
     content: Optional[str] = None
     status: str
     created_at: datetime
+    timings: Optional[GenerationTimings] = None
 
     class Config:
         from_attributes = True
 
+class GenerationSummary(GenerationBase):
+    """Used for /history: everything but the README body, plus a short preview."""
+    id: str
+    repo_id: str
+    status: str
+    created_at: datetime
+    preview: Optional[str] = None
+    content_bytes: Optional[int] = None
+
+class GenerationHistoryPage(BaseModel):
+    items: List[GenerationSummary]
+    # Opaque keyset cursor; pass back as ?cursor= to fetch the next page
+    next_cursor: Optional[str] = None
+
 # Generate Request/Response (used by generate router)
 class GenerateRequest(BaseModel):
     repo_id: str
@@ -88,4 +119,43 @@ class FileTreeItem(BaseModel):
     size: Optional[int] = None
 
 class FileTreeResponse(BaseModel):
-    tree: list[FileTreeItem]
\ No newline at end of file
+    tree: list[FileTreeItem]
+
+# Admin: generation timing percentiles
+class Distribution(BaseModel):
+    count: int
+    p50: float
+    p90: float
+    p95: float
+    p99: float
+    max: float
+    mean: float
+
+class GenerationTimingsSummary(BaseModel):
+    window_hours: float
+    status: Optional[str] = None
+    generations: int
+    stages_ms: Dict[str, Distribution]
+    counters: Dict[str, Distribution]
+    models: Dict[str, int]
+
+# Admin: on-demand profiling
+class ProfilingConfig(BaseModel):
+    request_rate: float = Field(0.0, ge=0.0, le=1.0)  # Share of requests profiled
+    path_prefix: Optional[str] = None  # Only requests under this path
+    generation_rate: float = Field(0.0, ge=0.0, le=1.0)  # Share of generations profiled
+    generation_id: Optional[str] = None  # Also this generation (e.g. one being resumed)
+    duration_seconds: float = Field(300.0, gt=0, le=24 * 3600)  # Switches itself off after this
+    interval_ms: float = Field(5.0, ge=1.0, le=1000.0)  # Sampling interval
+    max_profiles: int = Field(20, ge=1, le=1000)  # Per worker process
+
+class ProfileFile(BaseModel):
+    name: str
+    size_bytes: int
+    created_at: datetime
+
+class ProfilingState(BaseModel):
+    enabled: bool
+    config: Optional[ProfilingConfig] = None
+    expires_at: Optional[datetime] = None
+    profiles: List[ProfileFile]
@@ -5,18 +5,82 @@ Uses Google Generative AI SDK for README generation.
 import asyncio
 import time
 import logging
-from typing import List, Optional, Dict, Any
+from typing import TYPE_CHECKING, List, Optional, Dict, Any
 
-import google.generativeai as genai
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from opentelemetry import trace
+from opentelemetry.trace import SpanKind
 
+from app import tracing
 from app.config import settings
+from app.metrics import LLM_FALLBACKS, LLM_REQUEST_DURATION, LLM_RETRIES, LLM_TOKENS
+from app.services.file_tree import FileTree
 from app.services.github import GitHubService
+from app.services.stage_timings import StageTimings
 from app.prompts.readme_prompt import get_readme_prompt
 
+if TYPE_CHECKING:
+    import google.generativeai as genai
+
 logger = logging.getLogger(__name__)
 
 
+def _genai():
+    """
+    The Gemini SDK, imported on first use.
+
+    It takes longer to import than the rest of the app together, and most
+    requests (and worker processes) never generate anything.
+    """
+    import google.generativeai as genai
+    return genai
+
+
+def _record_usage(model_name: str, response: Any, timings: Optional[StageTimings]) -> None:
+    """Count prompt/output tokens reported by a Gemini response."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+    output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+    LLM_TOKENS.labels(model_name, "prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(model_name, "output").inc(output_tokens)
+    trace.get_current_span().set_attributes({
+        "gen_ai.usage.input_tokens": prompt_tokens,
+        "gen_ai.usage.output_tokens": output_tokens,
+    })
+    if timings is not None:
+        timings.set(prompt_tokens=prompt_tokens, output_tokens=output_tokens)
+
+
+# Files whose contents are sent to the model, matched by name anywhere in the tree
+KEY_FILES = (
+    "package.json", "requirements.txt", "pyproject.toml",
+    "pom.xml", "Cargo.toml", "go.mod", "composer.json",
+    "Gemfile", "pubspec.yaml", "Dockerfile", "docker-compose.yml",
+    "README.md", "LICENSE", ".env.example", "Makefile"
+)
+_KEY_FILES_LOWER = tuple(name.lower() for name in KEY_FILES)
+
+
+def select_key_files(file_tree: FileTree, max_size: int = 50000) -> List[str]:
+    """Paths of files in ``file_tree`` whose contents are worth fetching for the prompt."""
+    # GitHub trees call files "blob"
+    file_code = file_tree.type_code("blob")
+    types, sizes = file_tree.types, file_tree.sizes
+    selected = []
+    for i, name in enumerate(file_tree.names):
+        filename = name.lower()
+        if any(key in filename for key in _KEY_FILES_LOWER):
+            if types[i] == file_code and 0 < sizes[i] < max_size:
+                selected.append(file_tree.path(i))
+    return selected
+
+
+def warm_up() -> None:
+    """Import the Gemini SDK ahead of the first generation (AI_SDK_WARMUP)."""
+    _genai()
+
+
 class AIGeneratorService:
     """
     Production-grade AI service for generating README content.
@@ -35,13 +99,17 @@ class AIGeneratorService:
         "gemini-flash-latest",    # Alias for latest
     ]
     
-    # Safety settings - allow all content for code generation
-    SAFETY_SETTINGS = {
-        HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-        HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-        HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-        HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-    }
+    @staticmethod
+    def _safety_settings() -> Dict[Any, Any]:
+        """Safety settings - allow all content for code generation."""
+        from google.generativeai.types import HarmCategory, HarmBlockThreshold
+
+        return {
+            HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+            HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+            HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+            HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+        }
     
     def __init__(self):
         """Initialize the AI service with API key from settings."""
@@ -49,14 +117,21 @@ class AIGeneratorService:
             raise ValueError("GEMINI_API_KEY environment variable is not set")
         
         # Configure the SDK
-        genai.configure(api_key=settings.gemini_api_key)
+        if settings.gemini_api_endpoint:
+            _genai().configure(
+                api_key=settings.gemini_api_key,
+                transport="rest",
+                client_options={"api_endpoint": settings.gemini_api_endpoint}
+            )
+        else:
+            _genai().configure(api_key=settings.gemini_api_key)
         logger.info("AIGeneratorService initialized with Gemini API")
     
-    def _create_model(self, model_name: str) -> genai.GenerativeModel:
+    def _create_model(self, model_name: str) -> "genai.GenerativeModel":
         """Create a GenerativeModel instance with proper configuration."""
-        return genai.GenerativeModel(
+        return _genai().GenerativeModel(
             model_name=model_name,
-            safety_settings=self.SAFETY_SETTINGS,
+            safety_settings=self._safety_settings(),
             generation_config={
                 "temperature": 0.7,
                 "top_p": 0.95,
@@ -65,12 +140,13 @@ class AIGeneratorService:
             }
         )
     
-    def _call_gemini(self, prompt: str) -> str:
+    def _call_gemini(self, prompt: str, timings: Optional[StageTimings] = None) -> str:
         """
         Call Gemini API with retry logic and model fallback.
         
         Args:
             prompt: The prompt to send to Gemini
+            timings: Receives the model used, attempts, retries, fallbacks and token counts
             
         Returns:
             Generated text content
@@ -79,45 +155,77 @@ class AIGeneratorService:
             Exception: If all models fail after retries
         """
         last_error = None
+        if timings is None:
+            timings = StageTimings()
         
-        for model_name in self.MODELS:
+        for index, model_name in enumerate(self.MODELS):
+            if index:
+                LLM_FALLBACKS.labels(self.MODELS[index - 1]).inc()
+                timings.add("llm_fallbacks")
             logger.info(f"Trying model: {model_name}")
+            outcome = "error"  # Why the previous attempt is being retried
             
             for attempt in range(3):
-                try:
-                    model = self._create_model(model_name)
-                    response = model.generate_content(prompt)
-                    
-                    # Check if response has text
-                    if response.text:
-                        logger.info(f"Successfully generated with {model_name}")
-                        return response.text
-                    else:
-                        logger.warning(f"Empty response from {model_name}")
-                        continue
+                if attempt:
+                    LLM_RETRIES.labels(model_name, outcome).inc()
+                    timings.add("llm_retries")
+                timings.add("llm_attempts")
+                timings.set(model=model_name)
+                wait_time = 0
+                start = time.perf_counter()
+                with tracing.tracer.start_as_current_span(f"generate_content {model_name}", kind=SpanKind.CLIENT, attributes={
+                    "gen_ai.system": "gemini",
+                    "gen_ai.operation.name": "generate_content",
+                    "gen_ai.request.model": model_name,
+                    "llm.attempt": attempt + 1,
+                }) as span:
+                    try:
+                        model = self._create_model(model_name)
+                        response = model.generate_content(prompt)
+                        _record_usage(model_name, response, timings)
                         
-                except Exception as e:
-                    error_msg = str(e)
-                    last_error = e
-                    logger.warning(f"Model {model_name} attempt {attempt + 1} failed: {error_msg[:200]}")
-                    
-                    # Handle rate limiting
-                    if "429" in error_msg or "quota" in error_msg.lower() or "rate" in error_msg.lower():
-                        wait_time = min(30, 5 * (2 ** attempt))  # Exponential backoff, max 30s
-                        logger.info(f"Rate limited. Waiting {wait_time}s before retry...")
-                        time.sleep(wait_time)
-                        continue
-                    
-                    # Handle model not found - try next model
-                    elif "404" in error_msg or "not found" in error_msg.lower():
-                        logger.info(f"Model {model_name} not available, trying next...")
-                        break
-                    
-                    # Other errors - retry with backoff
-                    else:
-                        wait_time = 2 * (attempt + 1)
-                        time.sleep(wait_time)
-                        continue
+                        # Check if response has text
+                        if response.text:
+                            LLM_REQUEST_DURATION.labels(model_name, "ok").observe(time.perf_counter() - start)
+                            span.set_attribute("llm.outcome", "ok")
+                            logger.info(f"Successfully generated with {model_name}")
+                            return response.text
+                        else:
+                            outcome = "empty"
+                            LLM_REQUEST_DURATION.labels(model_name, outcome).observe(time.perf_counter() - start)
+                            span.set_attribute("llm.outcome", outcome)
+                            tracing.set_error(span, "Empty response")
+                            logger.warning(f"Empty response from {model_name}")
+                            continue
+                            
+                    except Exception as e:
+                        error_msg = str(e)
+                        last_error = e
+                        span.record_exception(e)
+                        tracing.set_error(span, f"{type(e).__name__}: {error_msg[:200]}")
+                        logger.warning(f"Model {model_name} attempt {attempt + 1} failed: {error_msg[:200]}")
+                        
+                        # Handle rate limiting
+                        if "429" in error_msg or "quota" in error_msg.lower() or "rate" in error_msg.lower():
+                            outcome = "rate_limited"
+                            wait_time = min(30, 5 * (2 ** attempt))  # Exponential backoff, max 30s
+                            logger.info(f"Rate limited. Waiting {wait_time}s before retry...")
+                        
+                        # Handle model not found - try next model
+                        elif "404" in error_msg or "not found" in error_msg.lower():
+                            LLM_REQUEST_DURATION.labels(model_name, "not_found").observe(time.perf_counter() - start)
+                            span.set_attribute("llm.outcome", "not_found")
+                            logger.info(f"Model {model_name} not available, trying next...")
+                            break
+                        
+                        # Other errors - retry with backoff
+                        else:
+                            outcome = "error"
+                            wait_time = 2 * (attempt + 1)
+                        LLM_REQUEST_DURATION.labels(model_name, outcome).observe(time.perf_counter() - start)
+                        span.set_attribute("llm.outcome", outcome)
+                # Back off outside the attempt's span
+                time.sleep(wait_time)
         
         # All models failed
         error_detail = str(last_error) if last_error else "Unknown error"
@@ -129,7 +237,8 @@ class AIGeneratorService:
         owner: str,
         repo: str,
         branch: str,
-        template_type: str = "professional"
+        template_type: str = "professional",
+        timings: Optional[StageTimings] = None
     ) -> str:
         """
         Generate README content for a GitHub repository.
@@ -140,15 +249,20 @@ class AIGeneratorService:
             repo: Repository name
             branch: Branch to analyze
             template_type: README template style
+            timings: Receives per-stage durations and counts, if given
             
         Returns:
             Generated README markdown content
         """
         logger.info(f"Generating README for {owner}/{repo} on branch {branch}")
+        if timings is None:
+            timings = StageTimings()
         
         # Step 1: Get file tree
         try:
-            file_tree = await github_service.get_repo_tree(owner, repo, branch)
+            with timings.stage("tree_fetch"):
+                file_tree = await github_service.get_repo_tree(owner, repo, branch)
+            timings.set(tree_items=len(file_tree))
             logger.info(f"Retrieved file tree with {len(file_tree)} items")
         except Exception as e:
             logger.error(f"Failed to get file tree: {e}")
@@ -156,34 +270,31 @@ class AIGeneratorService:
 
         # Step 2: Get important file contents for context
         important_files: Dict[str, str] = {}
-        important_paths = [
-            "package.json", "requirements.txt", "pyproject.toml",
-            "pom.xml", "Cargo.toml", "go.mod", "composer.json",
-            "Gemfile", "pubspec.yaml", "Dockerfile", "docker-compose.yml",
-            "README.md", "LICENSE", ".env.example", "Makefile"
-        ]
-
-        for item in file_tree:
-            filename = item.path.split("/")[-1].lower()
-            if any(p.lower() in filename for p in important_paths):
-                if item.type == "file" and item.size and item.size < 50000:
-                    try:
-                        content = await github_service.get_file_content(
-                            owner, repo, item.path, branch
-                        )
-                        if content:
-                            # Truncate large files
-                            important_files[item.path] = content[:3000]
-                    except Exception as e:
-                        logger.warning(f"Failed to get {item.path}: {e}")
+
+        timings.set(files_fetched=0, files_failed=0, file_bytes=0)
+        with timings.stage("file_fetch"):
+            for path in select_key_files(file_tree):
+                try:
+                    content = await github_service.get_file_content(
+                        owner, repo, path, branch
+                    )
+                    timings.add("files_fetched")
+                    if content:
+                        timings.add("file_bytes", len(content.encode("utf-8")))
+                        # Truncate large files
+                        important_files[path] = content[:3000]
+                except Exception as e:
+                    timings.add("files_failed")
+                    logger.warning(f"Failed to get {path}: {e}")
 
         logger.info(f"Retrieved {len(important_files)} important files")
 
         # Step 3: Build the prompt
-        context = self._build_context(owner, repo, file_tree, important_files)
-        system_prompt = get_readme_prompt(file_tree, template_type)
-        
-        full_prompt = f"""{system_prompt}
+        with timings.stage("prompt_build"):
+            context = self._build_context(owner, repo, file_tree, important_files)
+            system_prompt = get_readme_prompt(file_tree, template_type)
+            
+            full_prompt = f"""{system_prompt}
 
 {context}
 
@@ -191,10 +302,12 @@ Generate a comprehensive README.md file for this repository.
 Return ONLY the markdown content, no explanations or preamble.
 Start directly with the title (# Project Name).
 """
+        timings.set(prompt_chars=len(full_prompt))
 
         # Step 4: Call AI in a thread to keep async
         logger.info("Calling AI service...")
-        result = await asyncio.to_thread(self._call_gemini, full_prompt)
+        with timings.stage("llm"):
+            result = await asyncio.to_thread(self._call_gemini, full_prompt, timings)
         logger.info(f"Generated README with {len(result)} characters")
         
         return result
@@ -203,7 +316,7 @@ Start directly with the title (# Project Name).
         self,
         owner: str,
         repo: str,
-        file_tree: List[Any],
+        file_tree: FileTree,
         important_files: Dict[str, str]
     ) -> str:
         """Build context string for the AI prompt."""
@@ -211,20 +324,29 @@ Start directly with the title (# Project Name).
         # Repository info
         context = f"# Repository: {owner}/{repo}\n\n"
         
-        # File structure summary
+        # File structure summary (per directory work is done once, not per entry)
+        tree_code = file_tree.type_code("tree")
+        top_level = [directory.split("/")[0] for directory in file_tree.dirs]
+        dotted = ["." in directory for directory in file_tree.dirs]
         dirs = set()
         extensions = {}
-        for item in file_tree:
-            if item.type == "tree":
-                dirs.add(item.path.split("/")[0])
+        for dir_id, name, code in zip(file_tree.dir_of, file_tree.names, file_tree.types):
+            if code == tree_code:
+                dirs.add(top_level[dir_id] if dir_id else name)
+                continue
+            if "." in name:
+                ext = name.rsplit(".", 1)[1]
+            elif dotted[dir_id]:
+                # A dot in a directory name: same result as splitting the full path
+                ext = f"{file_tree.dirs[dir_id]}/{name}".rsplit(".", 1)[1]
             else:
-                ext = item.path.split(".")[-1] if "." in item.path else "no-ext"
-                extensions[ext] = extensions.get(ext, 0) + 1
+                ext = "no-ext"
+            extensions[ext] = extensions.get(ext, 0) + 1
         
         context += "## Project Structure:\n"
         context += f"- Directories: {', '.join(sorted(dirs)[:10])}\n"
         context += f"- File types: {dict(sorted(extensions.items(), key=lambda x: -x[1])[:10])}\n"
-        context += f"- Total files: {len([i for i in file_tree if i.type == 'file'])}\n\n"
+        context += f"- Total files: {file_tree.count('blob')}\n\n"
         
         # Important file contents
         if important_files:
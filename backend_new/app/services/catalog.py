@@ -0,0 +1,248 @@
+"""Per-user mirror of the GitHub repository list, synced in the background."""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal, insert_for_dialect
+from app.models.catalog import CatalogRepository, CatalogSyncState
+from app.schemas.schemas import GitHubRepo
+from app.services.github import GitHubService
+
+logger = logging.getLogger(__name__)
+
+SYNC_PAGE_SIZE = 100
+
+# Sort keys accepted by search(); ties are broken by GitHub repo ID
+SORT_COLUMNS = {
+    "updated": CatalogRepository.updated_at,
+    "stars": CatalogRepository.stargazers_count,
+    "forks": CatalogRepository.forks_count,
+    "name": CatalogRepository.full_name,
+}
+
+# Users with a background refresh in flight, and the tasks themselves
+_refreshing: Set[str] = set()
+_tasks: Set[asyncio.Task] = set()
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands timezone-aware columns back naive (stored as UTC)
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _parse_github_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def to_github_repo(row: CatalogRepository) -> GitHubRepo:
+    """Render a catalog row in the shape GET /user/repos returns."""
+    return GitHubRepo(
+        id=row.github_repo_id,
+        name=row.name,
+        full_name=row.full_name,
+        description=row.description,
+        language=row.language,
+        stargazers_count=row.stargazers_count,
+        forks_count=row.forks_count,
+        visibility=row.visibility,
+        default_branch=row.default_branch,
+        updated_at=_as_utc(row.updated_at).strftime("%Y-%m-%dT%H:%M:%SZ")
+    )
+
+
+def is_stale(state: CatalogSyncState) -> bool:
+    """True when the catalog is due for a refresh."""
+    last = _as_utc(state.last_synced_at)
+    return last is None or datetime.now(timezone.utc) - last >= timedelta(
+        seconds=settings.catalog_refresh_interval_seconds
+    )
+
+
+def search(
+    user_id: str,
+    q: Optional[str] = None,
+    language: Optional[str] = None,
+    visibility: Optional[str] = None,
+    sort: str = "updated",
+    direction: str = "desc",
+    offset: int = 0,
+    limit: int = 100
+):
+    """SELECT for one page of a user's catalog with filters and ordering applied."""
+    query = select(CatalogRepository).where(CatalogRepository.user_id == user_id)
+    if q:
+        pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        query = query.where(or_(
+            CatalogRepository.full_name.ilike(pattern, escape="\\"),
+            CatalogRepository.description.ilike(pattern, escape="\\")
+        ))
+    if language:
+        query = query.where(func.lower(CatalogRepository.language) == language.lower())
+    if visibility:
+        query = query.where(CatalogRepository.visibility == visibility)
+    column = SORT_COLUMNS[sort]
+    tiebreak = CatalogRepository.github_repo_id
+    if direction == "desc":
+        query = query.order_by(column.desc(), tiebreak.desc())
+    else:
+        query = query.order_by(column.asc(), tiebreak.asc())
+    return query.offset(offset).limit(limit)
+
+
+async def _upsert(db: AsyncSession, user_id: str, repos, synced_at: datetime) -> None:
+    insert = insert_for_dialect(db.bind.dialect.name)
+    statement = insert(CatalogRepository)
+    updated_columns = (
+        "name", "full_name", "description", "language", "stargazers_count",
+        "forks_count", "visibility", "default_branch", "updated_at", "synced_at",
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[CatalogRepository.user_id, CatalogRepository.github_repo_id],
+        set_={column: statement.excluded[column] for column in updated_columns}
+    )
+    rows = {
+        repo.id: {
+            "user_id": user_id,
+            "github_repo_id": repo.id,
+            "name": repo.name,
+            "full_name": repo.full_name,
+            "description": repo.description,
+            "language": repo.language,
+            "stargazers_count": repo.stargazers_count,
+            "forks_count": repo.forks_count,
+            "visibility": repo.visibility,
+            "default_branch": repo.default_branch or "main",
+            "updated_at": _parse_github_time(repo.updated_at),
+            "synced_at": synced_at,
+        }
+        for repo in repos
+    }
+    await db.execute(statement, list(rows.values()))
+
+
+async def _sync_state(db: AsyncSession, user_id: str) -> CatalogSyncState:
+    """The user's sync state row, created if missing (safe when two first loads race)."""
+    state = await db.get(CatalogSyncState, user_id)
+    if state is None:
+        insert = insert_for_dialect(db.bind.dialect.name)
+        await db.execute(
+            insert(CatalogSyncState)
+            .values(user_id=user_id)
+            .on_conflict_do_nothing(index_elements=[CatalogSyncState.user_id])
+        )
+        state = await db.get(CatalogSyncState, user_id)
+    return state
+
+
+async def sync_catalog(
+    db: AsyncSession,
+    user_id: str,
+    github_token: str,
+    full: Optional[bool] = None
+) -> Dict[str, Any]:
+    """
+    Bring a user's catalog up to date with GitHub and return a summary.
+
+    Incremental syncs only ask for repositories updated since the newest one
+    already mirrored, and send the stored ETag so an unchanged first page
+    costs a 304. Full syncs (first load, then every
+    ``catalog_full_sync_interval_seconds``) walk every page and drop rows
+    GitHub no longer returns.
+    """
+    now = datetime.now(timezone.utc)
+    state = await _sync_state(db, user_id)
+    if full is None:
+        last_full = _as_utc(state.last_full_sync_at)
+        full = last_full is None or now - last_full >= timedelta(
+            seconds=settings.catalog_full_sync_interval_seconds
+        )
+
+    since, etag = None, None
+    if not full:
+        newest = _as_utc(await db.scalar(
+            select(func.max(CatalogRepository.updated_at)).where(CatalogRepository.user_id == user_id)
+        ))
+        if newest is not None:
+            since = newest.strftime("%Y-%m-%dT%H:%M:%SZ")
+        etag = state.etag
+
+    github_service = GitHubService(github_token)
+    report = {"mode": "full" if full else "incremental", "requests": 0, "upserted": 0, "removed": 0}
+    page_number = 1
+    while True:
+        page = await github_service.get_user_repos_page(
+            page=page_number,
+            per_page=SYNC_PAGE_SIZE,
+            since=since,
+            etag=etag if page_number == 1 else None
+        )
+        report["requests"] += 1
+        if page_number == 1:
+            report["not_modified"] = page.not_modified
+            state.etag = page.etag
+        if page.repos:
+            await _upsert(db, user_id, page.repos, now)
+            report["upserted"] += len(page.repos)
+        if not page.has_next:
+            break
+        page_number += 1
+
+    if full:
+        result = await db.execute(delete(CatalogRepository).where(
+            CatalogRepository.user_id == user_id,
+            CatalogRepository.synced_at < now
+        ))
+        report["removed"] = result.rowcount
+        state.last_full_sync_at = now
+    state.last_synced_at = now
+    await db.commit()
+    logger.info(f"Synced repository catalog for user {user_id}", extra={"catalog_sync": report})
+    return report
+
+
+async def _claim_refresh(db: AsyncSession, user_id: str) -> bool:
+    """
+    Atomically mark a stale catalog as being refreshed.
+
+    Only one worker process wins the UPDATE; the others see a fresh
+    ``last_synced_at`` and skip. A failed sync is retried once the catalog
+    goes stale again.
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=settings.catalog_refresh_interval_seconds)
+    result = await db.execute(
+        update(CatalogSyncState)
+        .where(CatalogSyncState.user_id == user_id, CatalogSyncState.last_synced_at < cutoff)
+        .values(last_synced_at=now)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def _refresh(user_id: str, github_token: str) -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            if not await _claim_refresh(db, user_id):
+                return
+            await sync_catalog(db, user_id, github_token)
+    except Exception as e:
+        logger.warning(f"Background catalog sync failed for user {user_id}: {e}")
+    finally:
+        _refreshing.discard(user_id)
+
+
+def refresh_in_background(user_id: str, github_token: str) -> None:
+    """Schedule a sync for ``user_id`` unless one is already running."""
+    if user_id in _refreshing:
+        return
+    _refreshing.add(user_id)
+    task = asyncio.create_task(_refresh(user_id, github_token))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
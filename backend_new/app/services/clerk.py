@@ -0,0 +1,251 @@
+"""Clerk Backend API client: session JWT verification and GitHub OAuth token lookup."""
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+import jwt
+
+from app import tracing
+from app.cache import TTLCache
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# clerk_user_id -> GitHub OAuth token (None when the user has not connected GitHub)
+_github_token_cache = TTLCache(
+    maxsize=settings.clerk_token_cache_max_entries,
+    ttl=settings.clerk_token_cache_ttl_seconds,
+    negative_ttl=settings.clerk_token_cache_negative_ttl_seconds,
+)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _clerk_route(url: httpx.URL) -> str:
+    # Keeps user IDs out of span names
+    return re.sub(r"/users/[^/]+", "/users/{user_id}", url.path)
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the shared Clerk HTTP client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = tracing.instrument_client(httpx.AsyncClient(
+            base_url=settings.clerk_api_base,
+            headers={
+                "Authorization": f"Bearer {settings.clerk_secret_key}",
+                "Content-Type": "application/json"
+            },
+            timeout=10.0,
+        ), "clerk", _clerk_route)
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared Clerk HTTP client."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def fetch_github_token_from_clerk(clerk_user_id: str) -> Optional[str]:
+    """Fetch GitHub OAuth access token from Clerk API (uncached)."""
+    if not settings.clerk_secret_key:
+        logger.debug("No Clerk secret key configured")
+        return None
+
+    try:
+        # Clerk API endpoint to get OAuth access tokens for a user
+        response = await _get_client().get(f"/users/{clerk_user_id}/oauth_access_tokens/oauth_github")
+        logger.debug(f"Clerk OAuth token lookup for {clerk_user_id}: HTTP {response.status_code}")
+
+        # Clerk outages should be retried, not negatively cached
+        if response.status_code >= 500:
+            response.raise_for_status()
+
+        if response.status_code == 200:
+            data = response.json()
+            # Clerk returns an array of tokens, get the first one
+            if data and len(data) > 0:
+                return data[0].get("token")
+
+        return None
+    except Exception as e:
+        logger.warning(f"Failed to fetch GitHub token from Clerk: {e}")
+        raise
+
+
+async def get_github_token(clerk_user_id: str) -> Optional[str]:
+    """
+    Return the user's GitHub OAuth token, served from a TTL cache.
+
+    Concurrent lookups for the same user share one Clerk request. Users
+    without a connected GitHub account are cached for a shorter period.
+    Transport errors are not cached so the next request retries.
+    """
+    try:
+        return await _github_token_cache.get_or_load(
+            clerk_user_id,
+            lambda: fetch_github_token_from_clerk(clerk_user_id)
+        )
+    except Exception:
+        return None
+
+
+def invalidate_github_token(clerk_user_id: Optional[str] = None, token: Optional[str] = None) -> None:
+    """Evict cached GitHub tokens by Clerk user ID and/or by token value."""
+    if clerk_user_id is not None:
+        _github_token_cache.invalidate(clerk_user_id)
+    if token is not None:
+        _github_token_cache.invalidate_where(lambda _, value: value == token)
+
+
+class JWKSCache:
+    """
+    Locally cached Clerk JSON Web Key Set.
+
+    Keys are refreshed periodically by a background task and on demand when a
+    token references an unknown ``kid`` (rate limited so forged ``kid`` values
+    cannot trigger a fetch per request). ``load()`` installs a key set
+    directly, which also allows verification against locally generated keys.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        refresh_interval: float = 3600.0,
+        min_refresh_interval: float = 30.0
+    ):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self._keys: Dict[str, Any] = {}
+        self._last_refresh = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def load(self, jwks: Dict[str, Any]) -> None:
+        """Replace the cached keys with the given JWKS document."""
+        keys = {}
+        for jwk in jwks.get("keys", []):
+            if jwk.get("use", "sig") != "sig":
+                continue
+            try:
+                keys[jwk.get("kid")] = jwt.PyJWK.from_dict(jwk).key
+            except jwt.exceptions.PyJWKError as e:
+                logger.warning(f"Skipping unusable JWK {jwk.get('kid')}: {e}")
+        self._keys = keys
+        self._last_refresh = time.monotonic()
+
+    async def _fetch(self) -> Dict[str, Any]:
+        if self.url:
+            async with tracing.instrument_client(httpx.AsyncClient(timeout=10.0), "clerk") as client:
+                response = await client.get(self.url)
+        elif settings.clerk_secret_key:
+            response = await _get_client().get("/jwks")
+        else:
+            raise RuntimeError("Neither CLERK_JWKS_URL nor CLERK_SECRET_KEY is configured")
+        response.raise_for_status()
+        return response.json()
+
+    async def refresh(self) -> None:
+        """Fetch the key set from Clerk and replace the cached keys."""
+        async with self._lock:
+            self.load(await self._fetch())
+            logger.info(f"Loaded {len(self._keys)} Clerk signing keys")
+
+    async def get_signing_key(self, kid: Optional[str]) -> Optional[Any]:
+        """Return the public key for ``kid``, refreshing once if it is unknown."""
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        if time.monotonic() - self._last_refresh >= self.min_refresh_interval:
+            # Another request may have refreshed while we waited for the lock
+            last_refresh = self._last_refresh
+            async with self._lock:
+                if self._last_refresh == last_refresh:
+                    self.load(await self._fetch())
+            key = self._keys.get(kid)
+        return key
+
+    async def _refresh_forever(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Failed to refresh Clerk JWKS: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> None:
+        """Start the background refresh task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self) -> None:
+        """Cancel the background refresh task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+jwks_cache = JWKSCache(
+    url=settings.clerk_jwks_url,
+    refresh_interval=settings.clerk_jwks_refresh_interval_seconds,
+    min_refresh_interval=settings.clerk_jwks_min_refresh_interval_seconds,
+)
+
+# sha256(token) -> verified claims, kept until the token's own expiry
+_claims_cache = TTLCache(maxsize=settings.clerk_jwt_cache_max_entries, ttl=0)
+
+
+async def verify_session_token(token: str) -> Dict[str, Any]:
+    """
+    Verify a Clerk session JWT and return its claims.
+
+    Verified claims are cached by token hash until ``exp`` so repeated
+    requests with the same token skip signature verification.
+
+    Raises:
+        jwt.PyJWTError: If the token is malformed, expired or not signed by Clerk
+    """
+    cache_key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    claims = _claims_cache.get(cache_key)
+    if claims is not None:
+        return claims
+
+    if not settings.clerk_verify_jwt:
+        # Local development only: trust the token without checking the signature
+        return jwt.decode(token, options={"verify_signature": False})
+
+    header = jwt.get_unverified_header(token)
+    key = await jwks_cache.get_signing_key(header.get("kid"))
+    if key is None:
+        raise jwt.InvalidTokenError("Token signed with an unknown key")
+
+    claims = jwt.decode(
+        token,
+        key,
+        algorithms=["RS256"],
+        issuer=settings.clerk_jwt_issuer,
+        leeway=settings.clerk_jwt_leeway_seconds,
+        options={"require": ["exp", "sub"], "verify_aud": False}
+    )
+
+    # Clerk's azp claim holds the origin that requested the token
+    authorized_parties = settings.clerk_authorized_parties
+    if authorized_parties and claims.get("azp") not in authorized_parties:
+        raise jwt.InvalidTokenError("Token issued for an unauthorized party")
+
+    _claims_cache.set(cache_key, claims, ttl=claims["exp"] - time.time())
+    return claims
@@ -0,0 +1,82 @@
+"""Compressed, content-addressed storage for generated README bodies."""
+import hashlib
+import zlib
+from typing import Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+
+# Characters of the body kept uncompressed for /history previews
+PREVIEW_CHARS = 200
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 hex digest identifying ``text``."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def compress(raw: bytes) -> Tuple[str, bytes]:
+    """Compress ``raw`` with the configured codec and return ``(encoding, data)``."""
+    codec = settings.content_compression
+    if codec == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            codec = "zlib"
+        else:
+            return "zstd", zstandard.ZstdCompressor(level=settings.content_compression_level).compress(raw)
+    if codec == "zlib":
+        return "zlib", zlib.compress(raw, settings.content_compression_level)
+    return "identity", raw
+
+
+def decompress(encoding: str, data: bytes) -> bytes:
+    """Inverse of :func:`compress`."""
+    if encoding == "zlib":
+        return zlib.decompress(data)
+    if encoding == "zstd":
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    if encoding == "identity":
+        return data
+    raise ValueError(f"Unknown content encoding: {encoding}")
+
+
+def decompress_content(blob) -> str:
+    """Decode a ContentBlob back into markdown text."""
+    return decompress(blob.encoding, blob.data).decode("utf-8")
+
+
+def build_blob(text: str):
+    """Compress ``text`` into a new (unsaved) ContentBlob."""
+    from app.models.content_blob import ContentBlob
+
+    raw = text.encode("utf-8")
+    encoding, data = compress(raw)
+    return ContentBlob(
+        sha256=hashlib.sha256(raw).hexdigest(),
+        encoding=encoding,
+        data=data,
+        size=len(raw),
+        preview=text[:PREVIEW_CHARS]
+    )
+
+
+async def store_content(db: AsyncSession, text: str):
+    """
+    Return the ContentBlob for ``text``, creating it if this body is new.
+
+    Identical bodies (e.g. regenerations of the same repo and template)
+    share one row. The caller commits.
+    """
+    from app.models.content_blob import ContentBlob
+
+    digest = content_hash(text)
+    blob = await db.get(ContentBlob, digest)
+    if blob is not None:
+        return blob
+
+    blob = build_blob(text)
+    db.add(blob)
+    return blob
@@ -0,0 +1,119 @@
+"""
+Compact, column-oriented repository file tree.
+
+A recursive GitHub tree can have hundreds of thousands of entries, and the
+generation pipeline holds it for the whole job. ``FileTree`` keeps one
+entry as a directory index (``array('I')``), a shared file name string, a
+type code (``bytearray``) and a size (``array('q')``, -1 when absent).
+Directory prefixes and repeated names ("index.ts", "__init__.py") are
+stored once, so an entry costs a few dozen bytes instead of a Pydantic
+model and its path string.
+
+The pipeline filters and aggregates over the columns; ``FileTreeItem``
+models are built only at the API boundary (``to_items()``).
+"""
+from array import array
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from app.schemas.schemas import FileTreeItem
+
+
+class FileTreeEntry(NamedTuple):
+    """One tree entry, materialized on demand."""
+    path: str
+    type: str
+    size: Optional[int]
+
+
+class FileTree:
+    """Repository tree entries in GitHub order, stored column-wise."""
+
+    __slots__ = ("dirs", "dir_of", "names", "type_names", "types", "sizes", "_dir_ids", "_name_pool")
+
+    def __init__(self):
+        self.dirs: List[str] = [""]  # Interned directory prefixes; 0 is the root
+        self.dir_of = array("I")  # Entry -> index into ``dirs``
+        self.names: List[str] = []  # Entry -> last path component
+        self.type_names: List[str] = []  # Type code -> "blob"/"tree"/"commit"/...
+        self.types = bytearray()  # Entry -> type code
+        self.sizes = array("q")  # Entry -> size in bytes, -1 if unknown
+        self._dir_ids: Dict[str, int] = {"": 0}
+        self._name_pool: Dict[str, str] = {}
+
+    @classmethod
+    def from_github(cls, entries: Iterable[dict]) -> "FileTree":
+        """Build from the ``tree`` array of a GitHub git/trees response."""
+        tree = cls()
+        append = tree.append
+        for item in entries:
+            append(item["path"], item["type"], item.get("size"))
+        return tree.compact()
+
+    def append(self, path: str, type: str, size: Optional[int] = None) -> None:
+        directory, _, name = path.rpartition("/")
+        dir_id = self._dir_ids.get(directory)
+        if dir_id is None:
+            dir_id = self._dir_ids[directory] = len(self.dirs)
+            self.dirs.append(directory)
+        self.dir_of.append(dir_id)
+        self.names.append(self._name_pool.setdefault(name, name))
+        self.types.append(self.type_code(type, create=True))
+        self.sizes.append(-1 if size is None else size)
+
+    def type_code(self, type: str, create: bool = False) -> int:
+        """Code of ``type`` in ``types``; -1 if no entry has it (unless ``create``)."""
+        try:
+            return self.type_names.index(type)
+        except ValueError:
+            if not create:
+                return -1
+            if len(self.type_names) == 256:
+                raise ValueError("Too many distinct tree entry types")
+            self.type_names.append(type)
+            return len(self.type_names) - 1
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def path(self, index: int) -> str:
+        directory = self.dirs[self.dir_of[index]]
+        return f"{directory}/{self.names[index]}" if directory else self.names[index]
+
+    def paths(self, limit: Optional[int] = None) -> List[str]:
+        """Full paths of the first ``limit`` entries (all by default)."""
+        dirs, names = self.dirs, self.names
+        count = len(names) if limit is None else min(limit, len(names))
+        return [
+            f"{dirs[dir_id]}/{names[i]}" if dir_id else names[i]
+            for i, dir_id in zip(range(count), self.dir_of)
+        ]
+
+    def count(self, type: str) -> int:
+        """Number of entries of ``type``."""
+        code = self.type_code(type)
+        return self.types.count(code) if code >= 0 else 0
+
+    def __iter__(self) -> Iterator[FileTreeEntry]:
+        dirs, names, type_names, types, sizes = self.dirs, self.names, self.type_names, self.types, self.sizes
+        for i, dir_id in enumerate(self.dir_of):
+            name = names[i]
+            size = sizes[i]
+            yield FileTreeEntry(
+                f"{dirs[dir_id]}/{name}" if dir_id else name,
+                type_names[types[i]],
+                None if size < 0 else size
+            )
+
+    def to_items(self) -> List[FileTreeItem]:
+        """Pydantic models for API responses."""
+        return [FileTreeItem(path=path, type=type, size=size) for path, type, size in self]
+
+    def compact(self) -> "FileTree":
+        """
+        Drop the lookup tables that deduplicate directories and names while
+        appending; returns self. Later appends still work but store their
+        strings again.
+        """
+        self._dir_ids = {"": 0}
+        self._name_pool = {}
+        return self
@@ -0,0 +1,185 @@
+"""
+Tracking and graceful draining of background README generations.
+
+Every generation runs through ``jobs.run()`` so shutdown can find it. On
+SIGTERM the process starts draining before the server stops listening:
+``/health`` reports 503 so load balancers stop routing to it, new
+generations are refused, and in-flight ones get ``GENERATION_DRAIN_SECONDS``
+to finish. Whatever is still running after that is cancelled and
+checkpointed as ``pending_retry``; the next process to start claims those
+rows and runs them again.
+"""
+import asyncio
+import logging
+import signal
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from prometheus_client import Gauge
+from sqlalchemy import func, select, update
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.metrics import on_scrape
+from app.models.generation import Generation
+from app.profiling import ProfileSession, profiler
+
+logger = logging.getLogger(__name__)
+
+# Status of a generation interrupted by shutdown, resumed on the next start
+PENDING_RETRY = "pending_retry"
+
+
+JOBS_IN_FLIGHT = Gauge(
+    "generation_jobs_in_flight",
+    "Generations running in this server (the work queue depth)",
+    multiprocess_mode="livesum",
+)
+# Every process sees the same database: report the latest scrape's counts
+GENERATIONS_BY_STATUS = Gauge(
+    "generations_unfinished",
+    "Generations not yet completed or failed, by status (from the database)",
+    ("status",),
+    multiprocess_mode="mostrecent",
+)
+
+
+class GenerationJobs:
+    """In-flight generations of this process, keyed by generation ID."""
+
+    def __init__(self, grace_period: float):
+        self.grace_period = grace_period
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._submitted: Set[asyncio.Task] = set()
+        self._drain_task: Optional[asyncio.Task] = None
+
+    @property
+    def draining(self) -> bool:
+        return self._drain_task is not None
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    async def run(self, generation_id: str, job: Callable[..., Awaitable[None]], *args) -> None:
+        """
+        Run ``job(*args)`` as the tracked task for ``generation_id``.
+
+        The job runs in its own task so draining can cancel it without
+        cancelling the caller (e.g. the request's background-task runner).
+        """
+        coro = job(*args)
+        if settings.profiling_enabled and profiler.wants_generation(generation_id):
+            coro = profiler.profile(ProfileSession("generation", generation_id), coro)
+        task = asyncio.ensure_future(coro)
+        self._tasks[generation_id] = task
+        JOBS_IN_FLIGHT.inc()
+        task.add_done_callback(lambda _: self._finished(generation_id))
+        await asyncio.wait([task])
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Generation job crashed", exc_info=task.exception())
+
+    def _finished(self, generation_id: str) -> None:
+        self._tasks.pop(generation_id, None)
+        JOBS_IN_FLIGHT.dec()
+
+    def submit(self, generation_id: str, job: Callable[..., Awaitable[None]], *args) -> None:
+        """Start a tracked generation outside any request (used when resuming)."""
+        task = asyncio.create_task(self.run(generation_id, job, *args))
+        self._submitted.add(task)
+        task.add_done_callback(self._submitted.discard)
+
+    async def _checkpoint(self, generation_ids: List[str]) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Generation)
+                .where(Generation.id.in_(generation_ids), Generation.status == "pending")
+                .values(status=PENDING_RETRY)
+            )
+            await db.commit()
+
+    async def _drain(self) -> None:
+        if self._tasks:
+            logger.info(
+                f"Draining {len(self._tasks)} in-flight generations (up to {self.grace_period}s)"
+            )
+            await asyncio.wait(list(self._tasks.values()), timeout=self.grace_period)
+        leftover = {generation_id: task for generation_id, task in self._tasks.items() if not task.done()}
+        if not leftover:
+            return
+        for task in leftover.values():
+            task.cancel()
+        await asyncio.wait(list(leftover.values()))
+        try:
+            await self._checkpoint(list(leftover))
+            logger.warning(f"Checkpointed {len(leftover)} unfinished generations as {PENDING_RETRY}")
+        except Exception as e:
+            logger.error(f"Failed to checkpoint unfinished generations: {e}", exc_info=True)
+
+    async def drain(self) -> None:
+        """Refuse new generations, wait out the grace period, checkpoint the rest."""
+        if self._drain_task is None:
+            self._drain_task = asyncio.ensure_future(self._drain())
+        await asyncio.shield(self._drain_task)
+
+    def start(self) -> None:
+        """
+        Accept generations and drain on SIGTERM before handing the signal on.
+
+        The server's own handler (uvicorn's) stops listening immediately, so
+        it only runs once draining is over; a second SIGTERM skips the wait.
+        The handler is skipped where asyncio signal handlers are unavailable
+        (Windows, or a loop outside the main thread such as the test client's).
+        """
+        self._drain_task = None
+        loop = asyncio.get_running_loop()
+        previous = signal.getsignal(signal.SIGTERM)
+        if not callable(previous):
+            return
+
+        handed_over = False
+
+        def _hand_over() -> None:
+            nonlocal handed_over
+            if handed_over:
+                return
+            handed_over = True
+            loop.remove_signal_handler(signal.SIGTERM)
+            signal.signal(signal.SIGTERM, previous)
+            previous(signal.SIGTERM, None)
+
+        async def _drain_then_hand_over() -> None:
+            try:
+                await self.drain()
+            finally:
+                _hand_over()
+
+        def _on_sigterm() -> None:
+            if self.draining:
+                _hand_over()
+                return
+            logger.info("SIGTERM received; draining before shutdown")
+            task = loop.create_task(_drain_then_hand_over())
+            self._submitted.add(task)
+            task.add_done_callback(self._submitted.discard)
+
+        try:
+            loop.add_signal_handler(signal.SIGTERM, _on_sigterm)
+        except (NotImplementedError, RuntimeError, ValueError):
+            pass
+
+
+jobs = GenerationJobs(grace_period=settings.generation_drain_seconds)
+
+
+async def _count_unfinished() -> None:
+    async with AsyncSessionLocal() as db:
+        counts = dict((await db.execute(
+            select(Generation.status, func.count())
+            .where(Generation.status.in_(("pending", PENDING_RETRY)))
+            .group_by(Generation.status)
+        )).all())
+    for status in ("pending", PENDING_RETRY):
+        GENERATIONS_BY_STATUS.labels(status).set(counts.get(status, 0))
+
+
+on_scrape(_count_unfinished)
@@ -1,8 +1,63 @@
 """GitHub API service for repository operations."""
+import re
+import time
 import httpx
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, NamedTuple
+from app import tracing
 from app.config import settings
-from app.schemas.schemas import GitHubRepo, FileTreeItem
+from app.metrics import GITHUB_REQUEST_DURATION
+from app.schemas.schemas import GitHubRepo
+from app.services.file_tree import FileTree
+from app.services.clerk import invalidate_github_token
+
+
+class RepoPage(NamedTuple):
+    """One page of GET /user/repos fetched with a conditional request."""
+    repos: List[GitHubRepo]
+    etag: Optional[str]
+    has_next: bool
+    not_modified: bool
+
+
+# URL path patterns → endpoint labels for metrics (keeps owner/repo/path out of labels)
+ENDPOINTS = [
+    (re.compile(r"^/user/repos$"), "/user/repos"),
+    (re.compile(r"^/user$"), "/user"),
+    (re.compile(r"^/repositories/[^/]+$"), "/repositories/{id}"),
+    (re.compile(r"^/repos/[^/]+/[^/]+/branches/.+$"), "/repos/{owner}/{repo}/branches/{branch}"),
+    (re.compile(r"^/repos/[^/]+/[^/]+/git/trees/[^/]+$"), "/repos/{owner}/{repo}/git/trees/{sha}"),
+    (re.compile(r"^/repos/[^/]+/[^/]+/contents/.*$"), "/repos/{owner}/{repo}/contents/{path}"),
+    (re.compile(r"^/repos/[^/]+/[^/]+$"), "/repos/{owner}/{repo}"),
+]
+
+
+def _endpoint(path: str) -> str:
+    for pattern, label in ENDPOINTS:
+        if pattern.match(path):
+            return label
+    return "other"
+
+
+def _url_endpoint(url: httpx.URL) -> str:
+    path = url.path
+    base_path = httpx.URL(settings.github_api_base).path.rstrip("/")
+    if base_path and path.startswith(base_path):
+        path = path[len(base_path):]
+    return _endpoint(path)
+
+
+async def _start_timer(request: httpx.Request) -> None:
+    request.extensions["metrics_start"] = time.perf_counter()
+
+
+async def _record_call(response: httpx.Response) -> None:
+    request = response.request
+    start = request.extensions.get("metrics_start")
+    if start is None:
+        return
+    GITHUB_REQUEST_DURATION.labels(
+        request.method, _url_endpoint(request.url), str(response.status_code)
+    ).observe(time.perf_counter() - start)
 
 
 class GitHubService:
@@ -19,47 +74,93 @@ class GitHubService:
             "User-Agent": "GitHub-README-AI"
         }
     
+    def _client(self) -> httpx.AsyncClient:
+        """HTTP client whose calls are recorded in the GitHub latency metrics and traces."""
+        return tracing.instrument_client(httpx.AsyncClient(
+            event_hooks={"request": [_start_timer], "response": [_record_call]}
+        ), "github", _url_endpoint)
+
+    def _raise_for_status(self, response: httpx.Response) -> None:
+        """Raise for HTTP errors, evicting the cached OAuth token on 401."""
+        if response.status_code == 401:
+            # Token was revoked or rotated; force a fresh lookup from Clerk
+            invalidate_github_token(token=self.access_token)
+        response.raise_for_status()
+    
     async def get_user_repos(self, page: int = 1, per_page: int = 100) -> List[GitHubRepo]:
         """Fetch user's repositories from GitHub."""
-        async with httpx.AsyncClient() as client:
+        async with self._client() as client:
             response = await client.get(
                 f"{self.base_url}/user/repos",
                 headers=self.headers,
                 params={"page": page, "per_page": per_page, "sort": "updated"}
             )
-            response.raise_for_status()
+            self._raise_for_status(response)
             repos_data = response.json()
             return [GitHubRepo(**repo) for repo in repos_data]
     
+    async def get_user_repos_page(
+        self,
+        page: int = 1,
+        per_page: int = 100,
+        since: Optional[str] = None,
+        etag: Optional[str] = None
+    ) -> RepoPage:
+        """
+        Fetch one page of the user's repositories, most recently updated first.
+
+        ``since`` (ISO 8601) limits the page to repositories updated after
+        that time. With ``etag`` the request is conditional: an unchanged
+        page comes back as ``not_modified`` and does not count against the
+        GitHub rate limit.
+        """
+        params = {"page": page, "per_page": per_page, "sort": "updated", "direction": "desc"}
+        if since:
+            params["since"] = since
+        headers = dict(self.headers)
+        if etag:
+            headers["If-None-Match"] = etag
+        async with self._client() as client:
+            response = await client.get(f"{self.base_url}/user/repos", headers=headers, params=params)
+            if response.status_code == 304:
+                return RepoPage(repos=[], etag=etag, has_next=False, not_modified=True)
+            self._raise_for_status(response)
+            return RepoPage(
+                repos=[GitHubRepo(**repo) for repo in response.json()],
+                etag=response.headers.get("ETag"),
+                has_next="next" in response.links,
+                not_modified=False
+            )
+    
     async def get_repo(self, owner: str, repo: str) -> GitHubRepo:
         """Get a specific repository."""
-        async with httpx.AsyncClient() as client:
+        async with self._client() as client:
             response = await client.get(
                 f"{self.base_url}/repos/{owner}/{repo}",
                 headers=self.headers
             )
-            response.raise_for_status()
+            self._raise_for_status(response)
             return GitHubRepo(**response.json())
 
     async def get_repo_by_id(self, repo_id: int) -> GitHubRepo:
         """Get a repository by its GitHub numeric ID (works for any repo user has access to)."""
-        async with httpx.AsyncClient() as client:
+        async with self._client() as client:
             response = await client.get(
                 f"{self.base_url}/repositories/{repo_id}",
                 headers=self.headers
             )
-            response.raise_for_status()
+            self._raise_for_status(response)
             return GitHubRepo(**response.json())
     
-    async def get_repo_tree(self, owner: str, repo: str, branch: str = "main", recursive: bool = True) -> List[FileTreeItem]:
+    async def get_repo_tree(self, owner: str, repo: str, branch: str = "main", recursive: bool = True) -> FileTree:
         """Get repository file tree."""
-        async with httpx.AsyncClient() as client:
+        async with self._client() as client:
             # First, get the SHA of the branch
             branch_response = await client.get(
                 f"{self.base_url}/repos/{owner}/{repo}/branches/{branch}",
                 headers=self.headers
             )
-            branch_response.raise_for_status()
+            self._raise_for_status(branch_response)
             branch_sha = branch_response.json()["commit"]["sha"]
             
             # Get the tree
@@ -68,28 +169,21 @@ class GitHubService:
                 headers=self.headers,
                 params={"recursive": "1" if recursive else "0"}
             )
-            tree_response.raise_for_status()
+            self._raise_for_status(tree_response)
             tree_data = tree_response.json()
             
-            return [
-                FileTreeItem(
-                    path=item["path"],
-                    type=item["type"],
-                    size=item.get("size")
-                )
-                for item in tree_data.get("tree", [])
-            ]
+            return FileTree.from_github(tree_data.get("tree", []))
     
     async def get_file_content(self, owner: str, repo: str, path: str, branch: str = "main") -> Optional[str]:
         """Get file content from repository."""
-        async with httpx.AsyncClient() as client:
+        async with self._client() as client:
             try:
                 response = await client.get(
                     f"{self.base_url}/repos/{owner}/{repo}/contents/{path}",
                     headers=self.headers,
                     params={"ref": branch}
                 )
-                response.raise_for_status()
+                self._raise_for_status(response)
                 content_data = response.json()
                 
                 # Decode base64 content
@@ -111,7 +205,7 @@ class GitHubService:
         branch: str = "main"
     ) -> bool:
         """Commit a file to the repository."""
-        async with httpx.AsyncClient() as client:
+        async with self._client() as client:
             # Get current file SHA if it exists
             try:
                 current_file = await client.get(
@@ -141,15 +235,15 @@ class GitHubService:
                 headers=self.headers,
                 json=commit_data
             )
-            response.raise_for_status()
+            self._raise_for_status(response)
             return True
     
     async def get_user_info(self) -> Dict[str, Any]:
         """Get authenticated user information."""
-        async with httpx.AsyncClient() as client:
+        async with self._client() as client:
             response = await client.get(
                 f"{self.base_url}/user",
                 headers=self.headers
             )
-            response.raise_for_status()
+            self._raise_for_status(response)
             return response.json()
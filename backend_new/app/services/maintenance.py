@@ -0,0 +1,284 @@
+"""
+Retention and compaction for generations, content blobs and caches.
+
+``run_maintenance()`` applies the retention policies from Settings, deletes
+content blobs no generation references any more, trims expired in-process
+cache entries and, on SQLite, checkpoints the WAL and returns free pages to
+the filesystem. It runs in-process on a schedule (deferred while the API is
+busy) or from the command line:
+
+    python -m app.services.maintenance --dry-run
+    python -m app.services.maintenance --keep-per-repo 20 --failed-days 3
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, exists, func, select
+
+from app.cache import purge_all_expired
+from app.config import settings
+from app.database import AsyncSessionLocal, async_engine
+from app.models.content_blob import ContentBlob
+from app.models.generation import Generation
+
+logger = logging.getLogger(__name__)
+
+# Generations still being written are never pruned
+FINISHED_STATUSES = ("completed", "failed")
+
+
+async def _prune_generations(db, keep_per_repo: int, failed_days: float, dry_run: bool) -> Dict[str, int]:
+    report = {"failed_expired": 0, "over_repo_limit": 0, "blobs_orphaned": 0}
+
+    if failed_days > 0:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=failed_days)
+        condition = (Generation.status == "failed") & (Generation.created_at < cutoff)
+        if dry_run:
+            report["failed_expired"] = await db.scalar(select(func.count()).where(condition))
+        else:
+            report["failed_expired"] = (await db.execute(delete(Generation).where(condition))).rowcount
+
+    if keep_per_repo > 0:
+        ranked = select(
+            Generation.id,
+            func.row_number().over(
+                partition_by=Generation.repo_id,
+                order_by=(Generation.created_at.desc(), Generation.id.desc())
+            ).label("rank")
+        ).where(Generation.status.in_(FINISHED_STATUSES)).subquery()
+        surplus = select(ranked.c.id).where(ranked.c.rank > keep_per_repo)
+        if dry_run:
+            report["over_repo_limit"] = await db.scalar(select(func.count()).select_from(surplus.subquery()))
+        else:
+            report["over_repo_limit"] = (
+                await db.execute(delete(Generation).where(Generation.id.in_(surplus)))
+            ).rowcount
+
+    orphaned = ~exists().where(Generation.content_hash == ContentBlob.sha256)
+    if dry_run:
+        report["blobs_orphaned"] = await db.scalar(select(func.count()).select_from(ContentBlob).where(orphaned))
+    else:
+        report["blobs_orphaned"] = (await db.execute(delete(ContentBlob).where(orphaned))).rowcount
+        await db.commit()
+    return report
+
+
+def _sqlite_files() -> Optional[Dict[str, int]]:
+    path = async_engine.url.database
+    if not path or path == ":memory:":
+        return None
+    sizes = {}
+    for suffix in ("", "-wal"):
+        try:
+            sizes["db" + suffix.replace("-", "_")] = os.path.getsize(path + suffix)
+        except OSError:
+            sizes["db" + suffix.replace("-", "_")] = 0
+    return sizes
+
+
+async def _compact_sqlite(allow_full_vacuum: bool, dry_run: bool) -> Dict[str, Any]:
+    report: Dict[str, Any] = {"files_before": _sqlite_files()}
+    async with async_engine.connect() as conn:
+        # Checkpoints and VACUUM cannot run inside a transaction
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+
+        async def pragma(statement: str):
+            return (await conn.exec_driver_sql(f"PRAGMA {statement}")).first()
+
+        report["page_size"] = (await pragma("page_size"))[0]
+        report["freelist_pages_before"] = (await pragma("freelist_count"))[0]
+        auto_vacuum = (await pragma("auto_vacuum"))[0]  # 0 none, 1 full, 2 incremental
+        if dry_run:
+            report["action"] = "none (dry run)"
+        else:
+            if auto_vacuum == 2:
+                # The sqlite3 module steps a PRAGMA only once (one page);
+                # executescript runs it until the freelist is empty
+                raw = await conn.get_raw_connection()
+                await raw.driver_connection.executescript("PRAGMA incremental_vacuum")
+                report["action"] = "incremental_vacuum"
+            elif allow_full_vacuum:
+                # Rewrites the file once; auto_vacuum=INCREMENTAL sticks from then on
+                await conn.exec_driver_sql(f"PRAGMA auto_vacuum={settings.sqlite_auto_vacuum}")
+                await conn.exec_driver_sql("VACUUM")
+                report["action"] = "vacuum"
+            else:
+                report["action"] = "none (auto_vacuum is off; allow a full vacuum to enable it)"
+            busy, wal_frames, checkpointed = await pragma("wal_checkpoint(TRUNCATE)")
+            report["wal_checkpoint"] = {"busy": bool(busy), "frames": wal_frames, "checkpointed": checkpointed}
+        report["freelist_pages_after"] = (await pragma("freelist_count"))[0]
+
+    report["files_after"] = _sqlite_files()
+    if report["files_before"] and report["files_after"]:
+        report["bytes_reclaimed"] = sum(report["files_before"].values()) - sum(report["files_after"].values())
+    return report
+
+
+async def run_maintenance(
+    keep_per_repo: Optional[int] = None,
+    failed_days: Optional[float] = None,
+    compact: bool = True,
+    allow_full_vacuum: Optional[bool] = None,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Apply retention policies and compact storage; return a report.
+
+    Arguments default to the ``retention_*``/``maintenance_*`` settings.
+    With ``dry_run`` nothing is deleted; the report shows what would be.
+    """
+    keep_per_repo = settings.retention_keep_per_repo if keep_per_repo is None else keep_per_repo
+    failed_days = settings.retention_failed_days if failed_days is None else failed_days
+    if allow_full_vacuum is None:
+        allow_full_vacuum = settings.maintenance_allow_full_vacuum
+
+    started = time.perf_counter()
+    report: Dict[str, Any] = {"dry_run": dry_run}
+    async with AsyncSessionLocal() as db:
+        report["deleted"] = await _prune_generations(db, keep_per_repo, failed_days, dry_run)
+    report["cache_entries_purged"] = 0 if dry_run else purge_all_expired()
+    if compact and async_engine.dialect.name == "sqlite":
+        report["sqlite"] = await _compact_sqlite(allow_full_vacuum, dry_run)
+    report["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return report
+
+
+class MaintenanceScheduler:
+    """
+    Runs ``run_maintenance()`` every ``interval`` seconds during low load.
+
+    A run is deferred while HTTP requests or generations are in flight and
+    retried every ``idle_retry`` seconds, but never postponed longer than
+    ``max_deferral`` so a constantly busy server is still cleaned up.
+
+    With several worker processes only the one holding an exclusive lock on
+    ``lock_path`` runs maintenance; the others keep trying to take the lock
+    over in case that worker exits.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        idle_retry: float = 60.0,
+        max_deferral: float = 3600.0,
+        lock_path: Optional[str] = None
+    ):
+        self.interval = interval
+        self.idle_retry = idle_retry
+        self.max_deferral = max_deferral
+        self.lock_path = lock_path
+        self.inflight_requests = 0
+        self._task: Optional[asyncio.Task] = None
+        self._lock_file = None
+
+    def _hold_lock(self) -> bool:
+        """Take (or keep) the cross-process maintenance lock without blocking."""
+        if self._lock_file is not None or not self.lock_path:
+            return True
+        try:
+            import fcntl
+        except ImportError:
+            # No flock (Windows): single-process deployments only
+            return True
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    @contextmanager
+    def track_request(self):
+        """Count a request as in flight for the duration of the block."""
+        self.inflight_requests += 1
+        try:
+            yield
+        finally:
+            self.inflight_requests -= 1
+
+    async def _is_idle(self) -> bool:
+        if self.inflight_requests:
+            return False
+        async with AsyncSessionLocal() as db:
+            pending = await db.scalar(select(exists().where(Generation.status == "pending")))
+        return not pending
+
+    async def _run_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self._hold_lock():
+                continue
+            waited = 0.0
+            while waited < self.max_deferral and not await self._is_idle():
+                await asyncio.sleep(self.idle_retry)
+                waited += self.idle_retry
+            try:
+                report = await run_maintenance()
+                logger.info("Maintenance finished", extra={"maintenance": report})
+            except Exception as e:
+                logger.error(f"Maintenance failed: {e}", exc_info=True)
+
+    def start(self) -> None:
+        """Start the background schedule (no-op when the interval is 0)."""
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        """Cancel the background schedule."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._lock_file is not None:
+            # Closing the file releases the flock for another worker
+            self._lock_file.close()
+            self._lock_file = None
+
+
+scheduler = MaintenanceScheduler(
+    interval=settings.maintenance_interval_seconds,
+    idle_retry=settings.maintenance_idle_retry_seconds,
+    max_deferral=settings.maintenance_max_deferral_seconds,
+    lock_path=settings.maintenance_lock_path,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Apply retention policies and compact the database.")
+    parser.add_argument("--keep-per-repo", type=int, default=None, help="Finished generations kept per repository")
+    parser.add_argument("--failed-days", type=float, default=None, help="Drop failed generations older than this")
+    parser.add_argument("--no-compact", dest="compact", action="store_false", help="Skip WAL checkpoint and vacuum")
+    parser.add_argument("--full-vacuum", action="store_true", default=None,
+                        help="Allow one VACUUM to switch an existing SQLite file to incremental auto-vacuum")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted without deleting")
+    args = parser.parse_args()
+
+    async def _main() -> Dict[str, Any]:
+        try:
+            return await run_maintenance(
+                keep_per_repo=args.keep_per_repo,
+                failed_days=args.failed_days,
+                compact=args.compact,
+                allow_full_vacuum=args.full_vacuum,
+                dry_run=args.dry_run
+            )
+        finally:
+            await async_engine.dispose()
+
+    print(json.dumps(asyncio.run(_main()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
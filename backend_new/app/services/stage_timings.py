@@ -0,0 +1,115 @@
+"""
+Per-generation stage timings and their aggregation.
+
+``StageTimings`` records wall-clock milliseconds per stage (queue wait,
+tree fetch, key-file fetches, prompt build, Gemini call, storage) and the
+counts that explain them (files fetched, bytes, prompt tokens, model,
+retries). The background job persists ``to_dict()`` on the ``Generation``
+row; ``summarize()`` turns many of those records into percentiles.
+"""
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+from app import tracing
+
+# Stage names in pipeline order
+STAGES = ("queue", "tree_fetch", "file_fetch", "prompt_build", "llm", "store")
+
+# Numeric counters summarized alongside the stages
+COUNTERS = (
+    "tree_items",
+    "files_fetched",
+    "files_failed",
+    "file_bytes",
+    "prompt_chars",
+    "prompt_tokens",
+    "output_tokens",
+    "llm_attempts",
+    "llm_retries",
+    "llm_fallbacks",
+)
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class StageTimings:
+    """Timings and counters for one generation."""
+
+    def __init__(self):
+        self.stages_ms: Dict[str, float] = {}
+        self.counts: Dict[str, Any] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Add the duration of the block to stage ``name`` (also traced as a span)."""
+        start = time.perf_counter()
+        try:
+            with tracing.tracer.start_as_current_span(f"generation.{name}"):
+                yield
+        finally:
+            self.add_stage(name, (time.perf_counter() - start) * 1000)
+
+    def add_stage(self, name: str, elapsed_ms: float) -> None:
+        self.stages_ms[name] = round(self.stages_ms.get(name, 0.0) + elapsed_ms, 3)
+
+    def set(self, **values: Any) -> None:
+        self.counts.update(values)
+
+    def add(self, name: str, amount: float = 1) -> None:
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable record stored on ``Generation.timings``."""
+        return {
+            "stages_ms": dict(self.stages_ms),
+            "total_ms": round((time.perf_counter() - self._started) * 1000, 3),
+            **self.counts,
+        }
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of sorted ``samples``."""
+    rank = max(0, min(len(samples) - 1, int(round(pct / 100.0 * len(samples))) - 1))
+    return samples[rank]
+
+
+def _distribution(samples: List[float]) -> Dict[str, float]:
+    samples.sort()
+    summary = {"count": len(samples)}
+    for pct in PERCENTILES:
+        summary[f"p{pct}"] = round(percentile(samples, pct), 3)
+    summary["max"] = round(samples[-1], 3)
+    summary["mean"] = round(sum(samples) / len(samples), 3)
+    return summary
+
+
+def summarize(records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Percentiles per stage and counter, plus model usage, over timings records."""
+    stages: Dict[str, List[float]] = {}
+    counters: Dict[str, List[float]] = {}
+    models: Dict[str, int] = {}
+    total = 0
+    for record in records:
+        total += 1
+        for name, value in (record.get("stages_ms") or {}).items():
+            stages.setdefault(name, []).append(value)
+        if record.get("total_ms") is not None:
+            stages.setdefault("total", []).append(record["total_ms"])
+        for name in COUNTERS:
+            value = record.get(name)
+            if isinstance(value, (int, float)):
+                counters.setdefault(name, []).append(value)
+        model: Optional[str] = record.get("model")
+        if model:
+            models[model] = models.get(model, 0) + 1
+
+    ordered = [name for name in STAGES if name in stages]
+    ordered += sorted(name for name in stages if name not in STAGES)
+    return {
+        "generations": total,
+        "stages_ms": {name: _distribution(stages[name]) for name in ordered},
+        "counters": {name: _distribution(counters[name]) for name in COUNTERS if name in counters},
+        "models": models,
+    }
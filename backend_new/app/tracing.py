@@ -0,0 +1,170 @@
+"""
+Distributed tracing with the OpenTelemetry SDK.
+
+``setup()`` installs a tracer provider when ``TRACING_ENABLED`` is set;
+otherwise the OpenTelemetry API hands out non-recording spans and every
+call here is close to free. On top of the SDK this module only adds:
+
+* ``TracingMiddleware``: a server span per request, continuing the caller's
+  ``traceparent`` and ending with the response rather than after the
+  background tasks that follow it (a generation can run for minutes)
+* ``instrument_client()``: httpx instrumentation of one client, naming its
+  spans by route template so IDs stay out of span names
+* ``traceparent()`` / ``parse_traceparent()``: the hand-off from the
+  request that queues a generation to the background job
+
+Sampling is parent-based: new traces are kept with probability
+``TRACING_SAMPLE_RATE`` and children follow their parent. A batch span
+processor exports to ``TRACING_FILE`` (one JSON span per line) or to an
+OTLP/HTTP collector at ``TRACING_OTLP_ENDPOINT``.
+"""
+import os
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+from opentelemetry import context, propagate, trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+tracer = trace.get_tracer(__name__)
+
+_provider = None
+
+
+def setup() -> None:
+    """Install the SDK tracer provider and exporter (once; no-op while tracing is off)."""
+    global _provider
+    if not settings.tracing_enabled or _provider is not None:
+        return
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    if settings.tracing_exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        exporter = OTLPSpanExporter(endpoint=settings.tracing_otlp_endpoint)
+    else:
+        # Line-buffered append: each span is one write, so worker processes do not interleave
+        out = open(settings.tracing_file, "a", buffering=1, encoding="utf-8")
+        exporter = ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + os.linesep)
+    _provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.tracing_service_name}),
+        sampler=ParentBased(TraceIdRatioBased(settings.tracing_sample_rate)),
+    )
+    # The processor restarts its export thread in each forked worker
+    _provider.add_span_processor(BatchSpanProcessor(exporter, max_queue_size=settings.tracing_max_queue_size))
+    trace.set_tracer_provider(_provider)
+
+
+def shutdown() -> None:
+    """Flush queued spans (called on application shutdown)."""
+    if _provider is not None:
+        _provider.force_flush()
+
+
+def traceparent() -> Optional[str]:
+    """W3C ``traceparent`` of the current span, to hand to work that runs later."""
+    carrier: Dict[str, str] = {}
+    propagate.inject(carrier)
+    return carrier.get("traceparent")
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[context.Context]:
+    """Context continuing a W3C ``traceparent``; None when absent (a new trace starts)."""
+    if not value:
+        return None
+    return propagate.extract({"traceparent": value})
+
+
+def current_ids() -> Tuple[Optional[str], Optional[str]]:
+    """(trace_id, span_id) of the current span, or (None, None); used to tag log records."""
+    span_context = trace.get_current_span().get_span_context()
+    if not span_context.is_valid:
+        return None, None
+    return format(span_context.trace_id, "032x"), format(span_context.span_id, "016x")
+
+
+def set_error(span: trace.Span, description: str) -> None:
+    span.set_status(Status(StatusCode.ERROR, description))
+
+
+class TracingMiddleware:
+    """Open a server span per HTTP request, named after its route template."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        parent = propagate.extract(headers)
+        method = scope["method"]
+        attributes: Dict[str, Any] = {"http.request.method": method, "url.path": scope["path"]}
+        if headers.get("user-agent"):
+            attributes["user_agent.original"] = headers["user-agent"]
+        server_span = tracer.start_span(method, context=parent, kind=SpanKind.SERVER, attributes=attributes)
+        status = 500
+        ended = False
+
+        def finish() -> None:
+            nonlocal ended
+            if ended:
+                return
+            ended = True
+            route = scope.get("route")
+            if route is not None:
+                server_span.update_name(f"{method} {route.path}")
+                server_span.set_attribute("http.route", route.path)
+            server_span.set_attribute("http.response.status_code", status)
+            if status >= 500:
+                set_error(server_span, f"HTTP {status}")
+            server_span.end()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            # End with the response, not after background tasks that follow it
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        token = context.attach(trace.set_span_in_context(server_span, parent))
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            server_span.record_exception(e)
+            raise
+        finally:
+            context.detach(token)
+            finish()
+
+
+def instrument_client(
+    client: httpx.AsyncClient,
+    peer: str,
+    route: Optional[Callable[[httpx.URL], str]] = None
+) -> httpx.AsyncClient:
+    """Record a client span per request made with ``client`` (unchanged while tracing is off); returns it."""
+    if not settings.tracing_enabled:
+        return client
+    from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+
+    async def request_hook(span: trace.Span, request) -> None:
+        if not span.is_recording():
+            return
+        span.set_attribute("peer.service", peer)
+        if route is not None:
+            method = request.method.decode() if isinstance(request.method, bytes) else request.method
+            template = route(httpx.URL(request.url))
+            span.update_name(f"{method} {template}")
+            span.set_attribute("url.template", template)
+
+    HTTPXClientInstrumentor.instrument_client(client, request_hook=request_hook)
+    return client
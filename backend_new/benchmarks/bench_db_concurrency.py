@@ -0,0 +1,164 @@
+"""
+Concurrent read-load benchmark for the DB-backed API endpoints.
+
+Drives ``GET /api/repos/{id}`` and ``GET /api/generate/history`` through the
+real FastAPI app (in-process ASGI transport) at a fixed concurrency while an
+optional writer thread keeps inserting generations, then reports latency
+percentiles and the worst event-loop stall as JSON.
+
+Synchronous DB calls inside ``async def`` handlers show up as a large p99 and
+loop stall because every request waits behind the one doing I/O. Run it on
+two revisions to compare them:
+
+    python -m benchmarks.bench_db_concurrency --concurrency 50 --duration 10
+"""
+import argparse
+import asyncio
+import threading
+import time
+import uuid
+
+from benchmarks.common import emit, latency_summary, prepare_environment
+
+
+async def _probe_loop_lag(stop: asyncio.Event, interval: float, lags_ms: list) -> None:
+    """Measure how late the event loop wakes up from short sleeps."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags_ms.append((time.perf_counter() - start - interval) * 1000)
+
+
+def _writer(stop: threading.Event, repo_ids: list, counter: list) -> None:
+    """Simulate background generations committing results."""
+    from app.database import SessionLocal
+    from app.models.generation import Generation
+    from app.services.content_store import build_blob
+
+    db = SessionLocal()
+    try:
+        i = 0
+        while not stop.is_set():
+            db.add(Generation(
+                repo_id=repo_ids[i % len(repo_ids)],
+                status="completed",
+                blob=build_blob(f"# Benchmark {i}\n" * 200)
+            ))
+            db.commit()
+            i += 1
+        counter.append(i)
+    finally:
+        db.close()
+
+
+def _seed(repos: int, generations: int) -> list:
+    from app.database import SessionLocal, init_db
+    from app.models.generation import Generation
+    from app.models.repository import Repository
+    from app.models.user import User
+    from app.services.content_store import build_blob
+
+    init_db()
+    db = SessionLocal()
+    try:
+        user = User(clerk_user_id="bench_user", github_access_token="bench-token")
+        db.add(user)
+        db.flush()
+        repo_ids = []
+        for i in range(repos):
+            repo = Repository(id=str(uuid.uuid4()), user_id=user.id, github_repo_id=i, full_name=f"bench/repo-{i}")
+            db.add(repo)
+            repo_ids.append(repo.id)
+        db.flush()
+        for i in range(generations):
+            db.add(Generation(repo_id=repo_ids[i % repos], status="completed", blob=build_blob(f"# Seed {i}\n" * 200)))
+        db.commit()
+        return repo_ids
+    finally:
+        db.close()
+
+
+async def _run(args) -> dict:
+    import httpx
+    from app.main import app
+    from app.routers.auth import verify_clerk_token
+
+    async def _fake_auth():
+        return {"clerk_user_id": "bench_user", "github_token": "bench-token"}
+
+    app.dependency_overrides[verify_clerk_token] = _fake_auth
+    repo_ids = _seed(args.repos, args.generations)
+
+    latencies = {"repo": [], "history": []}
+    errors = 0
+    lags_ms: list = []
+    stop = asyncio.Event()
+    deadline = time.perf_counter() + args.duration
+
+    writer_stop = threading.Event()
+    writes: list = []
+    writer = None
+    if args.write_load:
+        writer = threading.Thread(target=_writer, args=(writer_stop, repo_ids, writes), daemon=True)
+        writer.start()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker(n: int) -> None:
+            nonlocal errors
+            i = n
+            while time.perf_counter() < deadline:
+                if i % 2:
+                    kind, url = "repo", f"/api/repos/{repo_ids[i % len(repo_ids)]}"
+                else:
+                    kind, url = "history", "/api/generate/history"
+                start = time.perf_counter()
+                response = await client.get(url)
+                latencies[kind].append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    errors += 1
+                i += 1
+
+        probe = asyncio.create_task(_probe_loop_lag(stop, 0.005, lags_ms))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await probe
+
+    writer_stop.set()
+    if writer is not None:
+        writer.join()
+
+    total = sum(len(v) for v in latencies.values())
+    return {
+        "database_url": args.database_url,
+        "concurrency": args.concurrency,
+        "duration_s": round(elapsed, 3),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 1),
+        "errors": errors,
+        "background_writes": writes[0] if writes else 0,
+        "latency": {kind: latency_summary(samples) for kind, samples in latencies.items()},
+        "latency_all": latency_summary(latencies["repo"] + latencies["history"]),
+        "event_loop_lag": latency_summary(lags_ms),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--repos", type=int, default=50)
+    parser.add_argument("--generations", type=int, default=500)
+    parser.add_argument("--no-write-load", dest="write_load", action="store_false")
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--output", default=None, help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    args.database_url = prepare_environment(args.database_url)
+    emit(asyncio.run(_run(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+End-to-end load test against local stand-ins for GitHub, Clerk and Gemini.
+
+Starts ``benchmarks.fake_services`` and the real app (``serve.py``) on free
+ports, with the app's GitHub, Clerk and Gemini endpoints pointed at the
+stand-ins, then runs ``--flows`` user flows at ``--concurrency``:
+
+    GET /api/repos/ -> POST /api/repos/import -> POST /api/generate/
+    -> GET /api/generate/{id} until finished -> POST /api/generate/commit
+
+Reports throughput, per-step latency percentiles, error rates and status
+codes, end-to-end generation latency, the app's own per-stage timing
+percentiles and the stand-ins' request counts as JSON for regression
+tracking.
+
+    python -m benchmarks.bench_load --concurrency 16 --flows 200 --llm-latency-ms 800
+    python -m benchmarks.bench_load --workers 2 --repo-files 20000 --llm-429-rate 0.05 --output load.json
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from benchmarks.common import BACKEND_DIR, emit, latency_summary, prepare_environment
+from benchmarks.fake_services import add_arguments, synthetic_repo
+
+STEPS = ("list", "import", "generate", "poll", "commit")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _token(sub: str) -> str:
+    import jwt
+
+    # Signature checks are disabled for benchmark servers (CLERK_VERIFY_JWT=false)
+    return jwt.encode({"sub": sub, "exp": int(time.time()) + 3600}, "bench", algorithm="HS256")
+
+
+def _start(command: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        command, cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+    )
+
+
+def _stop(process: subprocess.Popen) -> None:
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    except ProcessLookupError:
+        pass
+
+
+async def _wait_healthy(client, url: str, timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if (await client.get(url)).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not become healthy within {timeout}s")
+
+
+class LoadRun:
+    """Latencies and outcomes collected while the flows run."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {step: [] for step in STEPS}
+        self.errors: Counter = Counter()
+        self.status_codes: Counter = Counter()
+        self.generation_ms: List[float] = []
+        self.flow_ms: List[float] = []
+        self.outcomes: Counter = Counter()
+
+    async def call(self, client, step: str, method: str, url: str, **kwargs) -> Optional[dict]:
+        """One timed request; returns the JSON body of a 2xx response, else None."""
+        import httpx
+
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.latencies[step].append((time.perf_counter() - start) * 1000)
+            self.errors[step] += 1
+            self.status_codes[type(e).__name__] += 1
+            return None
+        self.latencies[step].append((time.perf_counter() - start) * 1000)
+        self.status_codes[str(response.status_code)] += 1
+        if response.status_code >= 400:
+            self.errors[step] += 1
+            return None
+        return response.json()
+
+    async def flow(self, client, args, n: int) -> None:
+        headers = {"Authorization": f"Bearer {_token(f'bench_user_{n % args.users}')}"}
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            if await self.call(client, "list", "GET", "/api/repos/", headers=headers, params={"per_page": 100}) is None:
+                return
+            repo = await self.call(
+                client, "import", "POST", "/api/repos/import", headers=headers, json=synthetic_repo(n % args.repos)
+            )
+            if repo is None:
+                return
+            queued = time.perf_counter()
+            generation = await self.call(
+                client, "generate", "POST", "/api/generate/", headers=headers, json={"repo_id": repo["id"]}
+            )
+            if generation is None:
+                return
+            generation_id = generation["generation_id"]
+
+            status = "pending"
+            deadline = queued + args.generation_timeout
+            while status in ("pending", "pending_retry") and time.perf_counter() < deadline:
+                await asyncio.sleep(args.poll_interval)
+                body = await self.call(client, "poll", "GET", f"/api/generate/{generation_id}", headers=headers)
+                if body is not None:
+                    status = body["status"]
+            if status != "completed":
+                outcome = "timeout" if status in ("pending", "pending_retry") else "generation_failed"
+                return
+            self.generation_ms.append((time.perf_counter() - queued) * 1000)
+
+            committed = await self.call(
+                client, "commit", "POST", "/api/generate/commit", headers=headers,
+                json={"generation_id": generation_id}
+            )
+            outcome = "completed" if committed is not None else "error"
+        finally:
+            self.outcomes[outcome] += 1
+            if outcome == "completed":
+                self.flow_ms.append((time.perf_counter() - started) * 1000)
+
+    def report(self, elapsed: float) -> dict:
+        requests = sum(len(samples) for samples in self.latencies.values())
+        errors = sum(self.errors.values())
+        return {
+            "duration_s": round(elapsed, 3),
+            "flows": {
+                **dict(self.outcomes),
+                "throughput_per_s": round(self.outcomes["completed"] / elapsed, 3),
+            },
+            "requests": {
+                "total": requests,
+                "throughput_rps": round(requests / elapsed, 1),
+                "errors": errors,
+                "error_rate": round(errors / requests, 4) if requests else 0.0,
+                "status_codes": dict(self.status_codes),
+            },
+            "steps": {
+                step: {
+                    **latency_summary(self.latencies[step]),
+                    "errors": self.errors[step],
+                    "error_rate": round(self.errors[step] / len(self.latencies[step]), 4) if self.latencies[step] else 0.0,
+                }
+                for step in STEPS
+            },
+            "generation_latency": latency_summary(self.generation_ms),
+            "flow_latency": latency_summary(self.flow_ms),
+        }
+
+
+async def _drive(args, app_url: str, fakes_url: str) -> dict:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=app_url, limits=limits, timeout=60.0) as client:
+        await _wait_healthy(client, f"{fakes_url}/_stats", args.startup_timeout)
+        await _wait_healthy(client, f"{app_url}/health", args.startup_timeout)
+
+        run = LoadRun()
+        next_flow = 0
+
+        async def worker() -> None:
+            nonlocal next_flow
+            while next_flow < args.flows:
+                n = next_flow
+                next_flow += 1
+                await run.flow(client, args, n)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        report = run.report(time.perf_counter() - started)
+
+        admin = {"Authorization": f"Bearer {_token('bench_user_0')}"}
+        timings = await client.get("/api/admin/generations/timings", headers=admin)
+        if timings.status_code == 200:
+            body = timings.json()
+            report["server_stages_ms"] = {name: dist for name, dist in body["stages_ms"].items()}
+            report["server_models"] = body["models"]
+        report["fake_services"] = (await client.get(f"{fakes_url}/_stats")).json()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, default=8, help="Flows in progress at once")
+    parser.add_argument("--flows", type=int, default=40, help="Total flows to run")
+    parser.add_argument("--users", type=int, default=None, help="Distinct users (default: --concurrency)")
+    parser.add_argument("--workers", type=int, default=1, help="App worker processes (serve.py --workers)")
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    parser.add_argument("--generation-timeout", type=float, default=120.0)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--output", default=None, help="Also write the JSON report here")
+    add_arguments(parser)
+    args = parser.parse_args()
+    args.users = args.users or args.concurrency
+
+    args.database_url = prepare_environment(args.database_url)
+    app_port, fakes_port = _free_port(), _free_port()
+    fakes_url = f"http://127.0.0.1:{fakes_port}"
+
+    fake_options = [
+        "--repos", args.repos, "--repo-files", args.repo_files, "--file-bytes", args.file_bytes,
+        "--github-latency-ms", args.github_latency_ms, "--llm-latency-ms", args.llm_latency_ms,
+        "--llm-jitter-ms", args.llm_jitter_ms, "--llm-stream-chunks", args.llm_stream_chunks,
+        "--llm-429-rate", args.llm_429_rate, "--seed", args.seed,
+    ]
+    fakes = _start(
+        [sys.executable, "-m", "benchmarks.fake_services", "--port", str(fakes_port), *map(str, fake_options)],
+        dict(os.environ)
+    )
+    env = dict(
+        os.environ,
+        GITHUB_API_BASE=f"{fakes_url}/github",
+        CLERK_API_BASE=f"{fakes_url}/clerk/v1",
+        CLERK_SECRET_KEY="bench",
+        GEMINI_API_KEY="bench",
+        GEMINI_API_ENDPOINT=fakes_url,
+        GITHUB_TOKEN="",
+        ADMIN_USER_IDS='["bench_user_0"]',
+        MAINTENANCE_INTERVAL_SECONDS="0",
+    )
+    server = _start(
+        [sys.executable, "serve.py", "--workers", str(args.workers), "--host", "127.0.0.1", "--port", str(app_port)],
+        env
+    )
+    try:
+        report = asyncio.run(_drive(args, f"http://127.0.0.1:{app_port}", fakes_url))
+    finally:
+        _stop(server)
+        _stop(fakes)
+
+    emit({
+        "database_url": args.database_url,
+        "cpu_count": os.cpu_count(),
+        "config": {
+            key: getattr(args, key) for key in (
+                "concurrency", "flows", "users", "workers", "repos", "repo_files", "file_bytes",
+                "github_latency_ms", "llm_latency_ms", "llm_jitter_ms", "llm_429_rate",
+            )
+        },
+        **report,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
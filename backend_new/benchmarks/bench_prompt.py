@@ -0,0 +1,225 @@
+"""
+Prompt and context construction on very large repository trees.
+
+Everything between the GitHub tree response and the Gemini call runs on the
+event loop with a cost linear in the tree size. For synthetic trees of each
+``--sizes`` entry this measures, per step:
+
+* ``tree_parse``: GitHub tree JSON entries -> ``FileTree`` (``get_repo_tree``)
+* ``key_files``: ``select_key_files`` (the key-file scan in ``generate_readme``);
+  ``selected`` counts the paths it returns, and ``--check`` fails if none are
+* ``build_context``: ``AIGeneratorService._build_context``
+* ``readme_prompt``: ``get_readme_prompt``
+* ``tree_items``: ``FileTree.to_items()`` (only ``GET /api/repos/{id}/tree``)
+
+the median and minimum wall time over ``--repeat`` runs, the time per tree
+entry, and the peak memory allocated while the step runs (``tracemalloc``,
+measured in a separate run).
+
+``tree_memory`` compares the memory a parsed tree keeps alive for the rest
+of a generation: the compact ``FileTree`` against one ``FileTreeItem`` per
+entry (what ``get_repo_tree`` returned before).
+
+``--check`` compares each step's time and peak memory per entry, and the
+``FileTree``'s retained memory per entry, at every size of at least
+``CHECK_MIN_ENTRIES``, against ``BUDGETS`` and ``RETAINED_BUDGET`` and exits 1
+on a regression, for CI. ``tests/test_prompt_budgets.py`` runs the same check
+at ``CHECK_MIN_ENTRIES`` entries, and ``tests/test_prompt_benchmarks.py``
+times each step with pytest-benchmark.
+
+    python -m benchmarks.bench_prompt --sizes 1000 10000 100000 500000
+    python -m benchmarks.bench_prompt --check --sizes 10000 100000
+"""
+import argparse
+import gc
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from benchmarks.common import emit, prepare_environment
+
+# Per tree entry: (max median ns, max peak bytes). About 3x what a single
+# shared vCPU measured when these were set (1400/1250/430/2100/3900 ns; 150
+# bytes to parse, 600 to build models, 50 or less otherwise), so only real
+# regressions trip them. key_files was measured with about 0.25% of entries
+# selected (synthetic key files under the size limit).
+BUDGETS = {
+    "tree_parse": (4500, 450),
+    "key_files": (4000, 64),
+    "build_context": (1500, 160),
+    "readme_prompt": (6000, 64),
+    "tree_items": (12000, 1800),
+}
+
+# Bytes per entry a parsed FileTree keeps alive (101 measured; one
+# FileTreeItem per entry kept 488)
+RETAINED_BUDGET = 300
+
+# Smaller trees are dominated by fixed costs and timer noise
+CHECK_MIN_ENTRIES = 10000
+
+_DIRECTORIES = ("src", "lib", "app", "tests", "docs", "packages", "internal", "cmd", "scripts", "assets")
+_EXTENSIONS = ("py", "ts", "tsx", "js", "go", "rs", "java", "md", "json", "yml", "css", "html")
+_KEY_FILES = ("package.json", "README.md", "Dockerfile", "requirements.txt", "Makefile", "LICENSE", "go.mod")
+
+
+def synthetic_tree(entries: int, seed: int = 1) -> List[dict]:
+    """GitHub recursive-tree entries: nested directories, blobs, and key files scattered through them."""
+    rng = random.Random(seed)
+    items: List[dict] = []
+    directories = set()
+    while len(items) + len(directories) < entries:
+        parts = [rng.choice(_DIRECTORIES)] + [f"module{rng.randint(0, 200)}" for _ in range(rng.randint(0, 5))]
+        for level in range(1, len(parts) + 1):
+            directories.add("/".join(parts[:level]))
+        if rng.random() < 0.01:
+            name = rng.choice(_KEY_FILES)
+        else:
+            name = f"file{len(items)}.{rng.choice(_EXTENSIONS)}"
+        items.append({"path": "/".join(parts + [name]), "type": "blob", "size": rng.randint(100, 80000)})
+    items.extend({"path": path, "type": "tree"} for path in directories)
+    items.sort(key=lambda item: item["path"])
+    return items[:entries]
+
+
+def _time(fn: Callable[[], object], repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _peak_bytes(fn: Callable[[], object]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak
+
+
+def _retained_bytes(fn: Callable[[], object]) -> int:
+    """Memory still allocated by ``fn``'s result once it returns."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = fn()
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return current
+
+
+def _steps(raw: List[dict]) -> Dict[str, Callable[[], object]]:
+    from app.prompts.readme_prompt import get_readme_prompt
+    from app.services.ai_generator import AIGeneratorService, select_key_files
+    from app.services.file_tree import FileTree
+
+    tree = FileTree.from_github(raw)
+    # _build_context needs no SDK state; skip __init__ (it requires GEMINI_API_KEY)
+    service = object.__new__(AIGeneratorService)
+    key_files = {item["path"]: "x" * 3000 for item in raw[:5]}
+    return {
+        "tree_parse": lambda: FileTree.from_github(raw),
+        "key_files": lambda: select_key_files(tree),
+        "build_context": lambda: service._build_context("bench", "repo", tree, key_files),
+        "readme_prompt": lambda: get_readme_prompt(tree, "professional"),
+        "tree_items": tree.to_items,
+    }
+
+
+def tree_memory(raw: List[dict]) -> dict:
+    from app.schemas.schemas import FileTreeItem
+    from app.services.file_tree import FileTree
+
+    entries = len(raw)
+    models = _retained_bytes(lambda: [
+        FileTreeItem(path=item["path"], type=item["type"], size=item.get("size")) for item in raw
+    ])
+    compact = _retained_bytes(lambda: FileTree.from_github(raw))
+    return {
+        "models_bytes_per_entry": round(models / entries, 1),
+        "compact_bytes_per_entry": round(compact / entries, 1),
+        "models_mib": round(models / 2 ** 20, 2),
+        "compact_mib": round(compact / 2 ** 20, 2),
+        "reduction": round(models / compact, 2) if compact else None,
+    }
+
+
+def measure(entries: int, repeat: int) -> Dict[str, dict]:
+    raw = synthetic_tree(entries)
+    report = {}
+    steps = _steps(raw)
+    for name, fn in steps.items():
+        samples = _time(fn, repeat)
+        median = statistics.median(samples)
+        peak = _peak_bytes(fn)
+        report[name] = {
+            "median_ms": round(median * 1000, 3),
+            "min_ms": round(min(samples) * 1000, 3),
+            "ns_per_entry": round(median * 1e9 / entries, 1),
+            "peak_kib": round(peak / 1024, 1),
+            "peak_bytes_per_entry": round(peak / entries, 1),
+        }
+    # Zero would mean the scan never reaches the per-match work it budgets
+    report["key_files"]["selected"] = len(steps["key_files"]())
+    report["tree_memory"] = tree_memory(raw)
+    return report
+
+
+def check(results: Dict[str, Dict[str, dict]]) -> List[str]:
+    failures = []
+    for size, steps in results.items():
+        if int(size) < CHECK_MIN_ENTRIES:
+            continue
+        retained = steps["tree_memory"]["compact_bytes_per_entry"]
+        if retained > RETAINED_BUDGET:
+            failures.append(f"FileTree at {size} entries: {retained} bytes/entry retained (budget {RETAINED_BUDGET})")
+        if not steps["key_files"]["selected"]:
+            failures.append(f"key_files at {size} entries: selected no files, so its budget measures nothing")
+        for name, result in steps.items():
+            if name == "tree_memory":
+                continue
+            max_ns, max_bytes = BUDGETS[name]
+            if result["ns_per_entry"] > max_ns:
+                failures.append(f"{name} at {size} entries: {result['ns_per_entry']} ns/entry (budget {max_ns})")
+            if result["peak_bytes_per_entry"] > max_bytes:
+                failures.append(
+                    f"{name} at {size} entries: {result['peak_bytes_per_entry']} bytes/entry peak (budget {max_bytes})"
+                )
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 500000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--check", action="store_true", help="Exit 1 when a step exceeds its budget")
+    parser.add_argument("--output", default=None, help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    prepare_environment()
+    results = {str(size): measure(size, args.repeat) for size in args.sizes}
+    report = {"sizes": results, "budgets": {name: {"ns_per_entry": ns, "peak_bytes_per_entry": peak}
+                                            for name, (ns, peak) in BUDGETS.items()}}
+    if args.check:
+        failures = check(results)
+        report["check"] = {"passed": not failures, "failures": failures}
+    emit(report, args.output)
+    if args.check and report["check"]["failures"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
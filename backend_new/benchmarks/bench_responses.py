@@ -0,0 +1,242 @@
+"""
+Serialization and compression benchmark for large API responses.
+
+Measures, for a big ``FileTreeResponse``, a full ``/history`` page and a
+single generation body:
+
+* render CPU per response for the stdlib ``JSONResponse`` vs orjson
+* bytes on the wire and CPU for identity, gzip and (if installed) brotli
+* end-to-end latency and downloaded bytes for ``GET /api/repos/{id}/tree``
+  and ``GET /api/generate/history`` through the real app, once with
+  ``JSON_RENDERER=json RESPONSE_COMPRESSION=[]`` ("before") and once with
+  the configured defaults ("after"); each runs in its own process
+
+    python -m benchmarks.bench_responses --tree-size 50000
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import zlib
+from datetime import datetime, timezone
+
+from benchmarks.common import BACKEND_DIR, emit, latency_summary, prepare_environment
+
+MODES = {
+    "before": {"JSON_RENDERER": "json", "RESPONSE_COMPRESSION": "[]"},
+    "after": {},
+}
+
+
+def _tree(size: int):
+    from app.schemas.schemas import FileTreeItem, FileTreeResponse
+
+    items = []
+    for i in range(size):
+        depth = i % 6
+        path = "/".join(f"pkg{(i >> (3 * d)) % 40}" for d in range(depth)) + f"/module_{i}.py"
+        items.append(FileTreeItem(path=path.lstrip("/"), type="blob", size=100 + i % 5000))
+    return FileTreeResponse(tree=items)
+
+
+def _history(count: int):
+    from app.schemas.schemas import GenerationHistoryPage, GenerationSummary
+
+    now = datetime.now(timezone.utc)
+    return GenerationHistoryPage(
+        items=[
+            GenerationSummary(
+                id=f"00000000-0000-0000-0000-{i:012d}",
+                repo_id="11111111-1111-1111-1111-111111111111",
+                status="completed",
+                created_at=now,
+                preview=("# Project\n\nA tool that does things. " * 8)[:200],
+                content_bytes=12000 + i
+            )
+            for i in range(count)
+        ],
+        next_cursor="eyJjIjogIjIwMjYtMDEtMDFUMDA6MDA6MDAiLCAiaSI6ICJ4In0"
+    )
+
+
+def _generation():
+    from app.schemas.schemas import GenerationResponse
+
+    body = "\n".join(f"## Section {i}\n\nSome generated prose about the project, item {i}." for i in range(600))
+    return GenerationResponse(
+        id="g", repo_id="r", status="completed",
+        created_at=datetime.now(timezone.utc), content=body
+    )
+
+
+def _cpu_ms(fn, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return round((time.process_time() - start) * 1000 / iterations, 3)
+
+
+def _micro(args) -> dict:
+    from fastapi.responses import JSONResponse
+    from app.config import settings
+
+    payloads = {
+        "tree": _tree(args.tree_size),
+        "history": _history(100),
+        "generation": _generation(),
+    }
+    renderers = {"json": JSONResponse.render}
+    try:
+        from fastapi.responses import ORJSONResponse
+        import orjson  # noqa: F401
+        renderers["orjson"] = ORJSONResponse.render
+    except ImportError:
+        pass
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    report = {}
+    for name, model in payloads.items():
+        # What FastAPI hands the response class after validating response_model
+        content = model.model_dump(mode="json")
+        entry = {"render_cpu_ms": {}, "wire": {}}
+        for renderer, render in renderers.items():
+            entry["render_cpu_ms"][renderer] = _cpu_ms(lambda: render(None, content), args.iterations)
+        body = JSONResponse.render(None, content)
+        entry["wire"]["identity"] = {"bytes": len(body), "cpu_ms": 0.0}
+        gzip = zlib.compressobj(settings.response_gzip_level, zlib.DEFLATED, 31)
+        compressed = gzip.compress(body) + gzip.flush()
+        entry["wire"]["gzip"] = {
+            "bytes": len(compressed),
+            "cpu_ms": _cpu_ms(
+                lambda: (lambda c: c.compress(body) + c.flush())(
+                    zlib.compressobj(settings.response_gzip_level, zlib.DEFLATED, 31)
+                ),
+                args.iterations
+            ),
+        }
+        if brotli is not None:
+            entry["wire"]["br"] = {
+                "bytes": len(brotli.compress(body, quality=settings.response_brotli_quality)),
+                "cpu_ms": _cpu_ms(
+                    lambda: brotli.compress(body, quality=settings.response_brotli_quality),
+                    args.iterations
+                ),
+            }
+        report[name] = entry
+    return report
+
+
+def _seed() -> str:
+    from app.database import SessionLocal, init_db
+    from app.models.generation import Generation
+    from app.models.repository import Repository
+    from app.models.user import User
+    from app.services.content_store import build_blob
+
+    init_db()
+    db = SessionLocal()
+    try:
+        user = User(clerk_user_id="bench_user", github_access_token="bench-token")
+        db.add(user)
+        db.flush()
+        repo = Repository(user_id=user.id, github_repo_id=1, full_name="bench/repo")
+        db.add(repo)
+        db.flush()
+        for i in range(100):
+            db.add(Generation(repo_id=repo.id, status="completed", blob=build_blob(f"# Bench {i}\n" * 400)))
+        db.commit()
+        return repo.id
+    finally:
+        db.close()
+
+
+async def _end_to_end(args) -> dict:
+    import httpx
+    from app.dependencies import verify_clerk_token
+    from app.main import app
+    from app.services.file_tree import FileTree
+    from app.services.github import GitHubService
+
+    tree = FileTree.from_github(item.model_dump() for item in _tree(args.tree_size).tree)
+
+    async def _fake_tree(self, owner, repo, branch="main", recursive=True):
+        return tree
+
+    async def _fake_auth():
+        return {"clerk_user_id": "bench_user", "github_token": "bench-token"}
+
+    GitHubService.get_repo_tree = _fake_tree
+    app.dependency_overrides[verify_clerk_token] = _fake_auth
+    repo_id = _seed()
+
+    endpoints = {
+        "tree": f"/api/repos/{repo_id}/tree",
+        "history": "/api/generate/history?limit=100",
+    }
+    report = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, url in endpoints.items():
+            latencies, downloaded, encoding = [], 0, None
+            cpu_start = time.process_time()
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                response = await client.get(url, headers={"Accept-Encoding": args.accept_encoding})
+                latencies.append((time.perf_counter() - start) * 1000)
+                response.raise_for_status()
+                downloaded = response.num_bytes_downloaded
+                encoding = response.headers.get("content-encoding", "identity")
+            report[name] = {
+                "bytes_on_wire": downloaded,
+                "content_encoding": encoding,
+                "cpu_ms_per_request": round((time.process_time() - cpu_start) * 1000 / args.requests, 3),
+                "latency": latency_summary(latencies),
+            }
+    return report
+
+
+def _run_mode(mode: str, args) -> dict:
+    env = dict(os.environ, **MODES[mode])
+    env.pop("DATABASE_URL", None)
+    command = [
+        sys.executable, "-m", "benchmarks.bench_responses", "--child",
+        "--tree-size", str(args.tree_size),
+        "--requests", str(args.requests),
+        "--accept-encoding", args.accept_encoding,
+    ]
+    output = subprocess.run(command, cwd=BACKEND_DIR, env=env, check=True, capture_output=True, text=True).stdout
+    # The app logs to stdout too; the report is the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tree-size", type=int, default=50000)
+    parser.add_argument("--iterations", type=int, default=20, help="Repetitions per render/compress timing")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per endpoint and mode")
+    parser.add_argument("--accept-encoding", default="br, gzip")
+    parser.add_argument("--output", default=None, help="Also write the JSON report here")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    prepare_environment()
+    if args.child:
+        print(json.dumps(asyncio.run(_end_to_end(args))))
+        return
+
+    emit({
+        "tree_size": args.tree_size,
+        "accept_encoding": args.accept_encoding,
+        "serialization": _micro(args),
+        "endpoints": {mode: _run_mode(mode, args) for mode in MODES},
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Cold-start benchmark and import-time regression check.
+
+Measures, each in a fresh interpreter:
+
+* ``python -X importtime -c "import app.main"``: total import time and the
+  most expensive top-level packages (cumulative) and modules (self time)
+* time from launching ``uvicorn app.main:app`` until ``/health`` answers,
+  against a fresh database (migrations included) and an up-to-date one
+
+``--check`` turns the import measurement into a gate (exit status 1) for CI:
+importing the app must not load modules that belong on first use
+(``LAZY_MODULES``), must not touch the database, and must stay under
+``--max-import-ms``.
+
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --check --max-import-ms 1500
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from benchmarks.common import BACKEND_DIR, emit, prepare_environment
+
+# Heavy modules that importing the app must not pull in
+LAZY_MODULES = (
+    "google.generativeai",  # Loaded by the first generation (or AI_SDK_WARMUP)
+    "alembic",  # Loaded by init_db() at startup, not on import
+)
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def _parse_importtime(stderr: str) -> List[Tuple[int, str, int, int]]:
+    """(depth, module, self_us, cumulative_us) per line of ``-X importtime`` output."""
+    rows = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            depth = len(match.group(3)) // 2
+            rows.append((depth, match.group(4), int(match.group(1)), int(match.group(2))))
+    return rows
+
+
+def _import_once(database_path: Path) -> Tuple[List[Tuple[int, str, int, int]], bool]:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database_path}")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return _parse_importtime(result.stderr), database_path.exists()
+
+
+def _imports(runs: int, top: int) -> dict:
+    database_path = Path(tempfile.mkdtemp(prefix="vibedocs-startup-")) / "untouched.db"
+    totals, rows, touched_db = [], [], False
+    for _ in range(runs):
+        rows, touched = _import_once(database_path)
+        touched_db = touched_db or touched
+        totals.append(next(cumulative for _, name, _, cumulative in rows if name == "app.main") / 1000)
+
+    # Breakdown from the last run; the median total smooths out noise
+    packages: Dict[str, int] = {}
+    for _, name, _, cumulative in rows:
+        root = name.split(".")[0]
+        packages[root] = max(packages.get(root, 0), cumulative)
+    loaded = {name for _, name, _, _ in rows}
+    return {
+        "runs": runs,
+        "import_ms": {
+            "median": round(statistics.median(totals), 1),
+            "min": round(min(totals), 1),
+            "max": round(max(totals), 1),
+        },
+        "top_packages_ms": {
+            name: round(us / 1000, 1)
+            for name, us in sorted(packages.items(), key=lambda item: -item[1])[:top]
+        },
+        "top_self_ms": {
+            name: round(us / 1000, 1)
+            for _, name, us, _ in sorted(rows, key=lambda row: -row[2])[:top]
+        },
+        "modules_loaded": len(loaded),
+        "lazy_modules_loaded": sorted(
+            lazy for lazy in LAZY_MODULES if any(m == lazy or m.startswith(lazy + ".") for m in loaded)
+        ),
+        "touched_database": touched_db,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _time_to_health(database_path: Path, timeout: float) -> float:
+    """Milliseconds from process launch to the first 200 from /health."""
+    port = _free_port()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database_path}", MAINTENANCE_INTERVAL_SECONDS="0")
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return round((time.perf_counter() - started) * 1000, 1)
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"/health not ready within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def _health(runs: int, timeout: float) -> dict:
+    report = {}
+    for label in ("fresh_database", "migrated_database"):
+        samples = []
+        for _ in range(runs):
+            database_path = Path(tempfile.mkdtemp(prefix="vibedocs-startup-")) / "startup.db"
+            if label == "migrated_database":
+                _time_to_health(database_path, timeout)
+            samples.append(_time_to_health(database_path, timeout))
+        report[label] = {"median_ms": statistics.median(samples), "min_ms": min(samples), "max_ms": max(samples)}
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Rows in the per-package/per-module breakdowns")
+    parser.add_argument("--health-timeout", type=float, default=30.0)
+    parser.add_argument("--skip-health", action="store_true", help="Only measure imports")
+    parser.add_argument("--check", action="store_true", help="Exit 1 on an import-time regression")
+    parser.add_argument("--max-import-ms", type=float, default=1500.0, help="Budget for --check")
+    parser.add_argument("--output", default=None, help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    prepare_environment()
+    report = {"imports": _imports(args.runs, args.top)}
+    if not args.skip_health and not args.check:
+        report["time_to_health"] = _health(args.runs, args.health_timeout)
+
+    if args.check:
+        imports = report["imports"]
+        failures = []
+        if imports["lazy_modules_loaded"]:
+            failures.append(f"import app.main loads {', '.join(imports['lazy_modules_loaded'])}")
+        if imports["touched_database"]:
+            failures.append("import app.main opened the database")
+        if imports["import_ms"]["median"] > args.max_import_ms:
+            failures.append(f"import app.main took {imports['import_ms']['median']} ms (budget {args.max_import_ms} ms)")
+        report["check"] = {"passed": not failures, "failures": failures}
+    emit(report, args.output)
+    if args.check and report["check"]["failures"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
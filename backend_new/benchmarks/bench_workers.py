@@ -0,0 +1,165 @@
+"""
+Throughput scaling of the production launcher (``serve.py``) over HTTP.
+
+Seeds a throwaway database, then for each worker count starts
+``serve.py --workers N`` on a free port, waits for ``/health`` and drives
+``GET /api/repos/{id}`` and ``GET /api/generate/history`` at a fixed
+concurrency over real sockets. Reports requests per second and latency
+percentiles per worker count; throughput should grow with workers up to
+the number of CPUs (``os.cpu_count()`` is included in the report).
+
+    python -m benchmarks.bench_workers --workers 1 2 4 --concurrency 64 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.common import BACKEND_DIR, emit, latency_summary, prepare_environment
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _token(sub: str) -> str:
+    import jwt
+
+    # Signature checks are disabled for benchmark servers (CLERK_VERIFY_JWT=false)
+    return jwt.encode({"sub": sub, "exp": int(time.time()) + 3600}, "bench", algorithm="HS256")
+
+
+def _seed(repos: int, generations: int) -> list:
+    from app.database import SessionLocal, init_db
+    from app.models.generation import Generation
+    from app.models.repository import Repository
+    from app.models.user import User
+    from app.services.content_store import build_blob
+
+    init_db()
+    db = SessionLocal()
+    try:
+        user = User(clerk_user_id="bench_user", github_access_token="bench-token")
+        db.add(user)
+        db.flush()
+        repo_ids = []
+        for i in range(repos):
+            repo = Repository(user_id=user.id, github_repo_id=i, full_name=f"bench/repo-{i}")
+            db.add(repo)
+            db.flush()
+            repo_ids.append(repo.id)
+        for i in range(generations):
+            db.add(Generation(repo_id=repo_ids[i % repos], status="completed", blob=build_blob(f"# Seed {i}\n" * 200)))
+        db.commit()
+        return repo_ids
+    finally:
+        db.close()
+
+
+async def _wait_healthy(client, base_url: str, timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if (await client.get(f"{base_url}/health")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"{base_url} did not become healthy within {timeout}s")
+
+
+async def _drive(args, base_url: str, repo_ids: list) -> dict:
+    import httpx
+
+    headers = {"Authorization": f"Bearer {_token('bench_user')}"}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=30.0) as client:
+        await _wait_healthy(client, base_url, args.startup_timeout)
+        # Warm every worker's pools and caches before measuring
+        await asyncio.gather(*(client.get("/api/generate/history") for _ in range(args.concurrency)))
+
+        latencies = {"repo": [], "history": []}
+        errors = 0
+        deadline = time.perf_counter() + args.duration
+
+        async def worker(n: int) -> None:
+            nonlocal errors
+            i = n
+            while time.perf_counter() < deadline:
+                if i % 2:
+                    kind, url = "repo", f"/api/repos/{repo_ids[i % len(repo_ids)]}"
+                else:
+                    kind, url = "history", "/api/generate/history"
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies[kind].append((time.perf_counter() - start) * 1000)
+                i += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    total = sum(len(v) for v in latencies.values())
+    return {
+        "requests": total,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1),
+        "errors": errors,
+        "latency": {kind: latency_summary(samples) for kind, samples in latencies.items()},
+    }
+
+
+def _run_workers(args, workers: int, repo_ids: list) -> dict:
+    port = _free_port()
+    env = dict(os.environ, CLERK_SECRET_KEY="", MAINTENANCE_INTERVAL_SECONDS="0")
+    command = [sys.executable, "serve.py", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port)]
+    server = subprocess.Popen(
+        command, cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+    )
+    try:
+        return asyncio.run(_drive(args, f"http://127.0.0.1:{port}", repo_ids))
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            os.killpg(server.pid, signal.SIGKILL)
+            server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--repos", type=int, default=50)
+    parser.add_argument("--generations", type=int, default=500)
+    parser.add_argument("--startup-timeout", type=float, default=30.0)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--output", default=None, help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    args.database_url = prepare_environment(args.database_url)
+    repo_ids = _seed(args.repos, args.generations)
+    emit({
+        "database_url": args.database_url,
+        "cpu_count": os.cpu_count(),
+        "concurrency": args.concurrency,
+        "runs": {str(n): _run_workers(args, n, repo_ids) for n in args.workers},
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Shared helpers for the benchmark scripts in this directory."""
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def prepare_environment(database_url: str = None) -> str:
+    """
+    Point the app at a throwaway database before ``app`` is imported.
+
+    Returns the DATABASE_URL in use. Clerk signature checks are disabled so
+    benchmarks can mint their own session tokens, and rate limiting is off
+    so a single benchmark user is not throttled.
+    """
+    if database_url is None:
+        db_dir = tempfile.mkdtemp(prefix="vibedocs-bench-")
+        database_url = f"sqlite:///{db_dir}/bench.db"
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("CLERK_VERIFY_JWT", "false")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+    return database_url
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples`` (0 for an empty list)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def latency_summary(samples_ms: List[float]) -> Dict[str, float]:
+    """Summarize latencies in milliseconds."""
+    return {
+        "count": len(samples_ms),
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+        "max_ms": round(max(samples_ms), 3) if samples_ms else 0.0,
+    }
+
+
+def emit(report: Dict, output: str = None) -> None:
+    """Print the JSON report and optionally write it to ``output``."""
+    text = json.dumps(report, indent=2, sort_keys=True)
+    print(text)
+    if output:
+        Path(output).write_text(text + "\n")
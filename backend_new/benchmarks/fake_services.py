@@ -0,0 +1,302 @@
+"""
+Local stand-ins for GitHub, Clerk and Gemini, served from one process.
+
+Point the app at it with::
+
+    GITHUB_API_BASE=http://127.0.0.1:9100/github
+    CLERK_API_BASE=http://127.0.0.1:9100/clerk/v1
+    GEMINI_API_ENDPOINT=http://127.0.0.1:9100
+
+* GitHub: ``--repos`` synthetic repositories ``bench/repo-{i}`` (listing,
+  metadata, branches, recursive trees of ``--repo-files`` entries, file
+  contents of about ``--file-bytes`` each, and commits), each call delayed by
+  ``--github-latency-ms``
+* Clerk: the GitHub OAuth token lookup
+* Gemini: ``generateContent`` and ``streamGenerateContent`` answering after
+  ``--llm-latency-ms`` (plus up to ``--llm-jitter-ms``); streamed replies
+  spread ``--llm-stream-chunks`` chunks over that time (a JSON array sent
+  element by element, or SSE with ``alt=sse``), and ``--llm-429-rate`` of
+  calls fail with RESOURCE_EXHAUSTED
+
+``GET /_stats`` returns request counts per route template, injected 429s
+and commits received.
+
+    python -m benchmarks.fake_services --port 9100 --repo-files 2000 --llm-latency-ms 800
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+# Files every synthetic repository has, so generations find key files
+KEY_FILES = ("README.md", "LICENSE", "package.json", "requirements.txt", "pyproject.toml", "Dockerfile", "Makefile")
+_EXTENSIONS = (".py", ".ts", ".go", ".md", ".json", ".yml")
+
+
+def synthetic_repo(index: int) -> dict:
+    """GitHub's repository JSON for ``bench/repo-{index}``."""
+    return {
+        "id": 1_000_000 + index,
+        "name": f"repo-{index}",
+        "full_name": f"bench/repo-{index}",
+        "description": f"Synthetic repository {index}",
+        "language": "Python",
+        "stargazers_count": index % 500,
+        "forks_count": index % 50,
+        "visibility": "public",
+        "default_branch": "main",
+        "updated_at": "2024-01-01T00:00:00Z",
+    }
+
+
+class FakeServices:
+    """Synthetic GitHub/Clerk/Gemini state and behaviour."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.stats: Counter = Counter()
+        self.commits: Dict[str, str] = {}  # "owner/repo/path" -> blob sha
+        self.random = random.Random(args.seed)
+
+    # GitHub
+
+    def repo_index(self, name: str) -> int:
+        prefix = "repo-"
+        if not name.startswith(prefix) or not name[len(prefix):].isdigit():
+            return -1
+        index = int(name[len(prefix):])
+        return index if index < self.args.repos else -1
+
+    @lru_cache(maxsize=256)
+    def tree_json(self, full_name: str) -> bytes:
+        """Recursive tree of ``--repo-files`` blobs (plus their directories), rendered once."""
+        rng = random.Random(full_name)
+        files = self.args.file_bytes
+        items: List[dict] = [{"path": name, "type": "blob", "size": files} for name in KEY_FILES]
+        directories = set()
+        for n in range(max(0, self.args.repo_files - len(KEY_FILES))):
+            depth = rng.randint(1, 4)
+            parts = [f"pkg{rng.randint(0, 20)}" for _ in range(depth)]
+            for level in range(1, depth + 1):
+                directories.add("/".join(parts[:level]))
+            path = "/".join(parts + [f"module_{n}{rng.choice(_EXTENSIONS)}"])
+            items.append({"path": path, "type": "blob", "size": rng.randint(files // 2, files * 2)})
+        items.extend({"path": directory, "type": "tree"} for directory in directories)
+        items.sort(key=lambda item: item["path"])
+        for item in items:
+            item["mode"] = "100644" if item["type"] == "blob" else "040000"
+            item["sha"] = hashlib.sha1(item["path"].encode()).hexdigest()
+        sha = hashlib.sha1(full_name.encode()).hexdigest()
+        return json.dumps({"sha": sha, "tree": items, "truncated": False}).encode()
+
+    def file_content(self, full_name: str, path: str) -> bytes:
+        if path == "package.json":
+            return json.dumps({"name": full_name.split("/")[1], "scripts": {"start": "node index.js"}}).encode()
+        line = f"# {path} in {full_name}\n".encode()
+        return (line * (self.args.file_bytes // len(line) + 1))[:self.args.file_bytes]
+
+    # Gemini
+
+    def reply_text(self, prompt_chars: int) -> str:
+        paragraph = "This project is a synthetic benchmark repository. " * 8
+        sections = ["# Synthetic Project", "## Installation", "## Usage", "## Configuration", "## License"]
+        return "\n\n".join(f"{title}\n\n{paragraph}" for title in sections) + f"\n\n<!-- prompt {prompt_chars} chars -->\n"
+
+    def llm_delay(self) -> float:
+        return (self.args.llm_latency_ms + self.random.uniform(0, self.args.llm_jitter_ms)) / 1000
+
+
+def _gemini_chunk(text: str, prompt_chars: int, final: bool) -> dict:
+    chunk = {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}]}
+    if final:
+        chunk["candidates"][0]["finishReason"] = "STOP"
+        prompt_tokens = prompt_chars // 4
+        output_tokens = len(text) // 4
+        chunk["usageMetadata"] = {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": prompt_tokens + output_tokens,
+        }
+    return chunk
+
+
+def build_app(args: argparse.Namespace) -> Starlette:
+    fakes = FakeServices(args)
+
+    async def github_delay(template: str) -> None:
+        fakes.stats[template] += 1
+        if args.github_latency_ms:
+            await asyncio.sleep(args.github_latency_ms / 1000)
+
+    async def user_repos(request: Request) -> Response:
+        await github_delay("GET /user/repos")
+        page = int(request.query_params.get("page", 1))
+        per_page = int(request.query_params.get("per_page", 30))
+        start = (page - 1) * per_page
+        repos = [synthetic_repo(i) for i in range(start, min(args.repos, start + per_page))]
+        headers = {"ETag": f'"repos-{page}-{per_page}"'}
+        if start + per_page < args.repos:
+            headers["Link"] = f'<{request.url.include_query_params(page=page + 1)}>; rel="next"'
+        return JSONResponse(repos, headers=headers)
+
+    async def user(request: Request) -> Response:
+        await github_delay("GET /user")
+        return JSONResponse({"login": "bench", "id": 1})
+
+    async def repo_by_name(request: Request) -> Response:
+        await github_delay("GET /repos/{owner}/{repo}")
+        index = fakes.repo_index(request.path_params["repo"])
+        if index < 0:
+            return JSONResponse({"message": "Not Found"}, status_code=404)
+        return JSONResponse(synthetic_repo(index))
+
+    async def repo_by_id(request: Request) -> Response:
+        await github_delay("GET /repositories/{id}")
+        index = request.path_params["id"] - 1_000_000
+        if not 0 <= index < args.repos:
+            return JSONResponse({"message": "Not Found"}, status_code=404)
+        return JSONResponse(synthetic_repo(index))
+
+    async def branch(request: Request) -> Response:
+        await github_delay("GET /repos/{owner}/{repo}/branches/{branch}")
+        full_name = f"{request.path_params['owner']}/{request.path_params['repo']}"
+        return JSONResponse({
+            "name": request.path_params["branch"],
+            "commit": {"sha": hashlib.sha1(full_name.encode()).hexdigest()},
+        })
+
+    async def tree(request: Request) -> Response:
+        await github_delay("GET /repos/{owner}/{repo}/git/trees/{sha}")
+        full_name = f"{request.path_params['owner']}/{request.path_params['repo']}"
+        return Response(fakes.tree_json(full_name), media_type="application/json")
+
+    async def contents(request: Request) -> Response:
+        owner, repo, path = (request.path_params[key] for key in ("owner", "repo", "path"))
+        full_name = f"{owner}/{repo}"
+        if request.method == "PUT":
+            await github_delay("PUT /repos/{owner}/{repo}/contents/{path}")
+            body = await request.json()
+            sha = hashlib.sha1(body.get("content", "").encode()).hexdigest()
+            created = f"{full_name}/{path}" not in fakes.commits
+            fakes.commits[f"{full_name}/{path}"] = sha
+            fakes.stats["commits"] += 1
+            return JSONResponse({"content": {"path": path, "sha": sha}, "commit": {"sha": sha}},
+                                status_code=201 if created else 200)
+        await github_delay("GET /repos/{owner}/{repo}/contents/{path}")
+        committed = fakes.commits.get(f"{full_name}/{path}")
+        if committed is None and (path not in KEY_FILES or path == "README.md"):
+            return JSONResponse({"message": "Not Found"}, status_code=404)
+        content = fakes.file_content(full_name, path)
+        return JSONResponse({
+            "path": path,
+            "sha": committed or hashlib.sha1(content).hexdigest(),
+            "encoding": "base64",
+            "content": base64.b64encode(content).decode(),
+        })
+
+    # Clerk
+
+    async def clerk_oauth_token(request: Request) -> Response:
+        fakes.stats["GET /users/{id}/oauth_access_tokens/{provider}"] += 1
+        return JSONResponse([{"token": f"gho_bench_{request.path_params['user_id']}", "provider": "oauth_github"}])
+
+    async def clerk_jwks(request: Request) -> Response:
+        fakes.stats["GET /jwks"] += 1
+        return JSONResponse({"keys": []})
+
+    # Gemini
+
+    async def gemini(request: Request) -> Response:
+        model, _, method = request.path_params["target"].partition(":")
+        fakes.stats[f"POST /models/{{model}}:{method}"] += 1
+        body = await request.json()
+        prompt_chars = sum(
+            len(part.get("text", "")) for content in body.get("contents", []) for part in content.get("parts", [])
+        )
+        delay = fakes.llm_delay()
+        if fakes.random.random() < args.llm_429_rate:
+            fakes.stats["llm_429_injected"] += 1
+            await asyncio.sleep(delay / 10)
+            return JSONResponse({"error": {
+                "code": 429, "status": "RESOURCE_EXHAUSTED",
+                "message": "Resource has been exhausted (e.g. check quota).",
+            }}, status_code=429)
+        text = fakes.reply_text(prompt_chars)
+
+        if method == "streamGenerateContent":
+            chunks = max(1, args.llm_stream_chunks)
+            size = -(-len(text) // chunks)
+
+            sse = request.query_params.get("alt") == "sse"
+
+            async def events():
+                # SSE events for alt=sse, otherwise one JSON array sent element by element
+                # (what the SDK's REST transport reads)
+                if not sse:
+                    yield "["
+                for n in range(chunks):
+                    await asyncio.sleep(delay / chunks)
+                    chunk = json.dumps(_gemini_chunk(text[n * size:(n + 1) * size], prompt_chars, n == chunks - 1))
+                    yield f"data: {chunk}\r\n\r\n" if sse else ("," if n else "") + chunk
+                if not sse:
+                    yield "]"
+
+            return StreamingResponse(events(), media_type="text/event-stream" if sse else "application/json")
+
+        await asyncio.sleep(delay)
+        return JSONResponse(_gemini_chunk(text, prompt_chars, True))
+
+    async def stats(request: Request) -> Response:
+        return JSONResponse(dict(fakes.stats))
+
+    return Starlette(routes=[
+        Route("/github/user/repos", user_repos),
+        Route("/github/user", user),
+        Route("/github/repositories/{id:int}", repo_by_id),
+        Route("/github/repos/{owner}/{repo}/branches/{branch:path}", branch),
+        Route("/github/repos/{owner}/{repo}/git/trees/{sha}", tree),
+        Route("/github/repos/{owner}/{repo}/contents/{path:path}", contents, methods=["GET", "PUT"]),
+        Route("/github/repos/{owner}/{repo}", repo_by_name),
+        Route("/clerk/v1/users/{user_id}/oauth_access_tokens/{provider}", clerk_oauth_token),
+        Route("/clerk/v1/jwks", clerk_jwks),
+        Route("/v1beta/models/{target}", gemini, methods=["POST"]),
+        Route("/_stats", stats),
+    ])
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options shared with ``bench_load`` (which passes them through)."""
+    parser.add_argument("--repos", type=int, default=50, help="Synthetic repositories bench/repo-0..N-1")
+    parser.add_argument("--repo-files", type=int, default=500, help="Blobs per repository tree")
+    parser.add_argument("--file-bytes", type=int, default=2000, help="Typical file size")
+    parser.add_argument("--github-latency-ms", type=float, default=20.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=500.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--llm-stream-chunks", type=int, default=8, help="SSE chunks per streamed reply")
+    parser.add_argument("--llm-429-rate", type=float, default=0.0, help="Share of Gemini calls answered with 429")
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(build_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
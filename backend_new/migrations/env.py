@@ -0,0 +1,55 @@
+"""Alembic environment: runs migrations against the app's configured database."""
+from alembic import context
+
+from app.database import Base, engine, migration_connection
+import app.models  # noqa: F401  (registers all tables on Base.metadata)
+
+config = context.config
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """
+    Emit SQL to stdout instead of executing it (``alembic upgrade --sql``).
+
+    The script is for creating a new, empty database: data steps that read
+    existing rows (merging duplicate imports, copying README bodies into
+    blobs) need a live connection and are left out. Server databases only:
+    SQLite's batch migrations reflect the live tables.
+    """
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=engine.dialect.name == "sqlite",
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Run migrations on a live connection (passed in by init_db, or opened here)."""
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+    with migration_connection() as connection:
+        _run(connection)
+
+
+def _run(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # SQLite cannot ALTER constraints in place; batch mode recreates tables
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
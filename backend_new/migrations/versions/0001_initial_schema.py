@@ -0,0 +1,61 @@
+"""Initial schema: users, repositories and readme_generations
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00
+
+Matches the tables that init_db() used to create with create_all(), so
+existing databases are stamped at this revision instead of re-created.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "users",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("clerk_user_id", sa.String(), nullable=False),
+        sa.Column("github_username", sa.String(), nullable=True),
+        sa.Column("github_access_token", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_users_clerk_user_id", "users", ["clerk_user_id"], unique=True)
+
+    op.create_table(
+        "repositories",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("github_repo_id", sa.Integer(), nullable=False),
+        sa.Column("full_name", sa.String(), nullable=False),
+        sa.Column("default_branch", sa.String()),
+        sa.Column("last_synced_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+    op.create_table(
+        "readme_generations",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("repo_id", sa.String(), sa.ForeignKey("repositories.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("template_type", sa.String()),
+        sa.Column("content", sa.Text(), nullable=True),
+        sa.Column("status", sa.String()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("readme_generations")
+    op.drop_table("repositories")
+    op.drop_index("ix_users_clerk_user_id", table_name="users")
+    op.drop_table("users")
@@ -0,0 +1,77 @@
+"""Composite indexes for hot queries; one repository row per user and GitHub repo
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00
+
+- repositories(user_id, github_repo_id) becomes unique. Existing duplicate
+  imports are merged into the oldest row first (their generations are moved
+  over), so the constraint can be created on live databases.
+- readme_generations(repo_id, created_at) serves the per-repo history
+  listing and the join from repositories without a full scan.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _merge_duplicate_repositories() -> None:
+    if context.is_offline_mode():
+        # No rows to merge in the new database an offline script creates
+        return
+    conn = op.get_bind()
+    duplicates = conn.execute(sa.text(
+        """
+        SELECT user_id, github_repo_id FROM repositories
+        GROUP BY user_id, github_repo_id HAVING COUNT(*) > 1
+        """
+    )).fetchall()
+
+    for user_id, github_repo_id in duplicates:
+        ids = [row[0] for row in conn.execute(
+            sa.text(
+                """
+                SELECT id FROM repositories
+                WHERE user_id = :user_id AND github_repo_id = :github_repo_id
+                ORDER BY last_synced_at, id
+                """
+            ),
+            {"user_id": user_id, "github_repo_id": github_repo_id}
+        )]
+        keep, drop = ids[0], ids[1:]
+        for repo_id in drop:
+            conn.execute(
+                sa.text("UPDATE readme_generations SET repo_id = :keep WHERE repo_id = :drop"),
+                {"keep": keep, "drop": repo_id}
+            )
+            conn.execute(sa.text("DELETE FROM repositories WHERE id = :drop"), {"drop": repo_id})
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _merge_duplicate_repositories()
+    op.create_index(
+        "uq_repositories_user_github_repo",
+        "repositories",
+        ["user_id", "github_repo_id"],
+        unique=True
+    )
+    op.create_index(
+        "ix_readme_generations_repo_id_created_at",
+        "readme_generations",
+        ["repo_id", "created_at"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_readme_generations_repo_id_created_at", table_name="readme_generations")
+    op.drop_index("uq_repositories_user_github_repo", table_name="repositories")
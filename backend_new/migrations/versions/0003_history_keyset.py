@@ -0,0 +1,48 @@
+"""Keyset pagination support for generation history
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00
+
+- Extends the history index with ``id`` so ``ORDER BY created_at DESC, id
+  DESC`` with a ``(created_at, id) < cursor`` predicate is index-only.
+- On SQLite, rewrites ``created_at`` values written by CURRENT_TIMESTAMP
+  ("YYYY-MM-DD HH:MM:SS") into SQLAlchemy's storage format with
+  microseconds. The column is compared as text there, so mixed formats
+  would make a bound cursor sort after rows with the same second.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute(
+            "UPDATE readme_generations SET created_at = created_at || '.000000' "
+            "WHERE length(created_at) = 19"
+        )
+    op.drop_index("ix_readme_generations_repo_id_created_at", table_name="readme_generations")
+    op.create_index(
+        "ix_readme_generations_repo_id_created_at_id",
+        "readme_generations",
+        ["repo_id", "created_at", "id"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_readme_generations_repo_id_created_at_id", table_name="readme_generations")
+    op.create_index(
+        "ix_readme_generations_repo_id_created_at",
+        "readme_generations",
+        ["repo_id", "created_at"]
+    )
@@ -0,0 +1,123 @@
+"""Move README bodies into compressed, content-addressed blobs
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00
+
+Creates content_blobs (sha256 -> zlib-compressed body), points each
+generation at its blob through readme_generations.content_hash, copies
+existing content over in batches (identical bodies collapse into one blob)
+and drops the old content column.
+"""
+import hashlib
+import zlib
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+PREVIEW_CHARS = 200
+
+content_blobs = sa.table(
+    "content_blobs",
+    sa.column("sha256", sa.String),
+    sa.column("encoding", sa.String),
+    sa.column("data", sa.LargeBinary),
+    sa.column("size", sa.Integer),
+    sa.column("preview", sa.Text),
+)
+
+
+def _copy_content_to_blobs() -> None:
+    if context.is_offline_mode():
+        # No content to copy in the new database an offline script creates
+        return
+    conn = op.get_bind()
+    known = set()
+    last_id = ""
+    while True:
+        rows = conn.execute(
+            sa.text(
+                "SELECT id, content FROM readme_generations "
+                "WHERE content IS NOT NULL AND id > :last_id ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": BATCH_SIZE}
+        ).fetchall()
+        if not rows:
+            break
+        new_blobs, updates = [], []
+        for generation_id, content in rows:
+            raw = content.encode("utf-8")
+            digest = hashlib.sha256(raw).hexdigest()
+            if digest not in known:
+                known.add(digest)
+                new_blobs.append({
+                    "sha256": digest,
+                    "encoding": "zlib",
+                    "data": zlib.compress(raw, 6),
+                    "size": len(raw),
+                    "preview": content[:PREVIEW_CHARS],
+                })
+            updates.append({"gid": generation_id, "digest": digest})
+        if new_blobs:
+            op.bulk_insert(content_blobs, new_blobs)
+        conn.execute(
+            sa.text("UPDATE readme_generations SET content_hash = :digest WHERE id = :gid"),
+            updates
+        )
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "content_blobs",
+        sa.Column("sha256", sa.String(64), primary_key=True),
+        sa.Column("encoding", sa.String(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("preview", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    with op.batch_alter_table("readme_generations") as batch_op:
+        batch_op.add_column(sa.Column("content_hash", sa.String(64), nullable=True))
+        batch_op.create_foreign_key(
+            "fk_readme_generations_content_hash", "content_blobs", ["content_hash"], ["sha256"]
+        )
+
+    _copy_content_to_blobs()
+
+    with op.batch_alter_table("readme_generations") as batch_op:
+        batch_op.drop_column("content")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("readme_generations") as batch_op:
+        batch_op.add_column(sa.Column("content", sa.Text(), nullable=True))
+
+    conn = op.get_bind()
+    blobs = conn.execute(sa.text("SELECT sha256, encoding, data FROM content_blobs")).fetchall()
+    for digest, encoding, data in blobs:
+        if encoding == "zlib":
+            data = zlib.decompress(data)
+        elif encoding == "zstd":
+            import zstandard
+            data = zstandard.ZstdDecompressor().decompress(data)
+        conn.execute(
+            sa.text("UPDATE readme_generations SET content = :content WHERE content_hash = :digest"),
+            {"content": data.decode("utf-8"), "digest": digest}
+        )
+
+    with op.batch_alter_table("readme_generations") as batch_op:
+        batch_op.drop_constraint("fk_readme_generations_content_hash", type_="foreignkey")
+        batch_op.drop_column("content_hash")
+    op.drop_table("content_blobs")
@@ -0,0 +1,70 @@
+"""Add the locally mirrored repository catalog
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00
+
+GET /api/repos/ is served from repository_catalog, which a background sync
+keeps up to date with GitHub; repository_catalog_sync holds each user's
+ETag and sync timestamps.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "repository_catalog",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("github_repo_id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("full_name", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("language", sa.String(), nullable=True),
+        sa.Column("stargazers_count", sa.Integer(), nullable=False),
+        sa.Column("forks_count", sa.Integer(), nullable=False),
+        sa.Column("visibility", sa.String(), nullable=False),
+        sa.Column("default_branch", sa.String(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("synced_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "uq_repository_catalog_user_github_repo",
+        "repository_catalog",
+        ["user_id", "github_repo_id"],
+        unique=True,
+    )
+    op.create_index(
+        "ix_repository_catalog_user_updated_at",
+        "repository_catalog",
+        ["user_id", "updated_at"],
+    )
+    op.create_table(
+        "repository_catalog_sync",
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("etag", sa.String(), nullable=True),
+        sa.Column("last_synced_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_full_sync_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("repository_catalog_sync")
+    op.drop_index("ix_repository_catalog_user_updated_at", table_name="repository_catalog")
+    op.drop_index("uq_repository_catalog_user_github_repo", table_name="repository_catalog")
+    op.drop_table("repository_catalog")
@@ -0,0 +1,30 @@
+"""Store per-stage timings on each generation
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:00
+
+readme_generations.timings holds the stage durations (queue wait, tree and
+file fetches, prompt build, Gemini call, storage) and counts recorded by the
+background job.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("readme_generations", sa.Column("timings", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("readme_generations") as batch_op:
+        batch_op.drop_column("timings")
@@ -0,0 +1,137 @@
+"""
+Production launcher.
+
+Runs the database migrations once, then serves the app with several worker
+processes. Under gunicorn (Linux/macOS) the app is imported once in the
+master and forked into ``UvicornWorker`` processes; without gunicorn it
+falls back to uvicorn's own multi-process mode. Use ``run.py`` for
+development (single process, auto-reload).
+
+    python serve.py                 # one worker per CPU on 0.0.0.0:8000
+    python serve.py --workers 4 --port 9000
+"""
+import argparse
+import os
+import tempfile
+
+
+def _default_workers(configured: int) -> int:
+    return configured if configured > 0 else max(1, os.cpu_count() or 1)
+
+
+def _post_fork(server, worker) -> None:
+    """Reset state a forked worker must not share with the master."""
+    from app.database import async_engine, engine
+    from app.logging_config import restart_logging
+
+    # Pooled connections opened in the master belong to the master
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    restart_logging()
+
+
+def _prepare_metrics_dir() -> None:
+    """Point PROMETHEUS_MULTIPROC_DIR at an empty directory (values from an earlier run would be summed in)."""
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not directory:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="vibedocs-metrics-")
+        return
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(".db"):
+            os.remove(os.path.join(directory, name))
+
+
+def _child_exit(server, worker) -> None:
+    """Drop an exited worker's live gauges (in-flight requests and jobs)."""
+    from app.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
+
+
+def _serve_gunicorn(args, settings) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    # Preload: import (and configure) the app once, before forking
+    from app.main import app
+
+    class _Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{args.host}:{args.port}")
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("worker_class", "uvicorn.workers.UvicornWorker")
+            self.cfg.set("preload_app", True)
+            self.cfg.set("post_fork", _post_fork)
+            self.cfg.set("child_exit", _child_exit)
+            self.cfg.set("graceful_timeout", settings.server_graceful_timeout_seconds)
+            # Generations run as background tasks; don't kill busy workers early
+            self.cfg.set("timeout", 0)
+
+        def load(self):
+            return app
+
+    _Server().run()
+
+
+def _serve_uvicorn(args, settings) -> None:
+    import uvicorn
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=settings.server_graceful_timeout_seconds,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the API with multiple worker processes.")
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="Default: SERVER_WORKERS, or one per CPU")
+    parser.add_argument("--no-gunicorn", action="store_true", help="Use uvicorn's process manager instead")
+    args = parser.parse_args()
+
+    from app.config import settings
+
+    args.host = args.host or settings.server_host
+    args.port = args.port or settings.server_port
+    args.workers = _default_workers(args.workers or settings.server_workers)
+
+    if args.workers > 1:
+        # Per-process buckets would multiply every budget by the worker count
+        os.environ.setdefault("RATE_LIMIT_STORE", "sqlite")
+        settings.rate_limit_store = os.environ["RATE_LIMIT_STORE"]
+        # A scrape reaches one worker; prometheus_client's multiprocess mode
+        # lets it report every worker. Must be set before the app is imported.
+        _prepare_metrics_dir()
+        # Not shared: the in-memory TTL caches. An eviction reaches only the
+        # worker that makes it, e.g. invalidate_github_token() on a GitHub 401,
+        # so every other worker keeps a revoked token until it hits its own
+        # 401 (one failed request per worker) or CLERK_TOKEN_CACHE_TTL_SECONDS
+        # (300) passes. User rows written by another worker show up after
+        # USER_CACHE_TTL_SECONDS (60). Verified session claims are kept until
+        # the token's exp, with one worker or many.
+
+    # Migrate exactly once, here; workers (preloaded or spawned) skip it
+    if settings.db_auto_migrate:
+        from app.database import upgrade_db
+        upgrade_db()
+    os.environ["DB_AUTO_MIGRATE"] = "false"
+    settings.db_auto_migrate = False
+
+    try:
+        import gunicorn  # noqa: F401
+        use_gunicorn = not args.no_gunicorn and os.name == "posix"
+    except ImportError:
+        use_gunicorn = False
+
+    if use_gunicorn:
+        _serve_gunicorn(args, settings)
+    else:
+        _serve_uvicorn(args, settings)
+
+
+if __name__ == "__main__":
+    main()
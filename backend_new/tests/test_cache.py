@@ -0,0 +1,90 @@
+"""TTLCache single-flight loads (run from backend_new: python -m pytest tests)."""
+import asyncio
+
+import pytest
+
+from app.cache import TTLCache
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_leader_cancellation_does_not_fail_waiters():
+    async def scenario():
+        cache = TTLCache()
+        release = asyncio.Event()
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "token"
+
+        leader = asyncio.create_task(cache.get_or_load("user", loader))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_load("user", loader))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await waiter == "token"
+        assert leader.cancelled()
+        assert calls == 1
+        assert cache.get("user") == "token"
+
+    _run(scenario())
+
+
+def test_waiter_cancellation_does_not_fail_leader():
+    async def scenario():
+        cache = TTLCache()
+        release = asyncio.Event()
+
+        async def loader():
+            await release.wait()
+            return 42
+
+        leader = asyncio.create_task(cache.get_or_load("key", loader))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_load("key", loader))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await leader == 42
+        assert waiter.cancelled()
+
+    _run(scenario())
+
+
+def test_loader_errors_reach_every_caller_and_are_not_cached():
+    async def scenario():
+        cache = TTLCache()
+        release = asyncio.Event()
+
+        async def failing():
+            await release.wait()
+            raise RuntimeError("clerk down")
+
+        first = asyncio.create_task(cache.get_or_load("key", failing))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(cache.get_or_load("key", failing))
+        await asyncio.sleep(0)
+        release.set()
+
+        for task in (first, second):
+            with pytest.raises(RuntimeError):
+                await task
+
+        async def loader():
+            return "recovered"
+
+        assert await cache.get_or_load("key", loader) == "recovered"
+
+    _run(scenario())
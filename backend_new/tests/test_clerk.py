@@ -0,0 +1,127 @@
+"""Clerk session JWT verification against local keys (run from backend_new: python -m pytest tests)."""
+import asyncio
+import hashlib
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.config import settings
+from app.services import clerk
+from app.services.clerk import jwks_cache, verify_session_token
+
+ORIGIN = "https://vibedocs.example"
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def _new_key(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    jwk.update(kid=kid, use="sig", alg="RS256")
+    return private_key, jwk
+
+
+SIGNING_KEY, SIGNING_JWK = _new_key("key-1")
+ROTATED_KEY, ROTATED_JWK = _new_key("key-2")
+
+
+def _token(private_key=SIGNING_KEY, kid="key-1", **claims):
+    now = int(time.time())
+    payload = {"sub": "user_1", "iat": now, "exp": now + 60, "azp": ORIGIN, **claims}
+    return jwt.encode(payload, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+def _cache_key(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+@pytest.fixture(autouse=True)
+def local_jwks(monkeypatch):
+    monkeypatch.setattr(settings, "clerk_verify_jwt", True)
+    monkeypatch.setattr(settings, "clerk_jwt_issuer", None)
+    monkeypatch.setattr(settings, "clerk_authorized_parties", [ORIGIN])
+    # Restored on teardown, so tests cannot leak keys or refresh times
+    monkeypatch.setattr(jwks_cache, "_keys", {})
+    monkeypatch.setattr(jwks_cache, "_last_refresh", 0.0)
+
+    async def no_fetch():
+        raise AssertionError("unexpected JWKS fetch")
+
+    monkeypatch.setattr(jwks_cache, "_fetch", no_fetch)
+    jwks_cache.load({"keys": [SIGNING_JWK]})
+    clerk._claims_cache.invalidate_where(lambda key, value: True)
+    yield
+    clerk._claims_cache.invalidate_where(lambda key, value: True)
+
+
+def test_valid_token_is_accepted():
+    claims = _run(verify_session_token(_token()))
+
+    assert claims["sub"] == "user_1"
+    assert claims["azp"] == ORIGIN
+
+
+def test_unknown_kid_triggers_one_rate_limited_refresh(monkeypatch):
+    fetches = 0
+
+    async def fetch():
+        nonlocal fetches
+        fetches += 1
+        return {"keys": [SIGNING_JWK, ROTATED_JWK]}
+
+    monkeypatch.setattr(jwks_cache, "_fetch", fetch)
+    monkeypatch.setattr(jwks_cache, "_last_refresh", time.monotonic() - jwks_cache.min_refresh_interval)
+
+    claims = _run(verify_session_token(_token(ROTATED_KEY, kid="key-2")))
+    assert claims["sub"] == "user_1"
+    assert fetches == 1
+
+    # The refresh just happened, so a forged kid is rejected without another fetch
+    with pytest.raises(jwt.InvalidTokenError, match="unknown key"):
+        _run(verify_session_token(_token(kid="forged")))
+    assert fetches == 1
+
+
+def test_expired_token_is_rejected():
+    now = int(time.time())
+    token = _token(iat=now - 120, exp=now - settings.clerk_jwt_leeway_seconds - 10)
+
+    with pytest.raises(jwt.ExpiredSignatureError):
+        _run(verify_session_token(token))
+    assert clerk._claims_cache.get(_cache_key(token)) is None
+
+
+def test_wrong_authorized_party_is_rejected():
+    token = _token(azp="https://attacker.example")
+
+    with pytest.raises(jwt.InvalidTokenError, match="unauthorized party"):
+        _run(verify_session_token(token))
+    assert clerk._claims_cache.get(_cache_key(token)) is None
+
+
+def test_repeat_call_is_served_from_claims_cache(monkeypatch):
+    token = _token()
+    first = _run(verify_session_token(token))
+
+    def no_decode(*args, **kwargs):
+        raise AssertionError("cached token was verified again")
+
+    monkeypatch.setattr(clerk.jwt, "decode", no_decode)
+    assert _run(verify_session_token(token)) is first
+
+
+def test_claims_cache_entry_expires_at_exp(monkeypatch):
+    token = _token()
+    claims = _run(verify_session_token(token))
+    remaining = claims["exp"] - time.time()
+    start = time.monotonic()
+
+    monkeypatch.setattr(time, "monotonic", lambda: start + remaining - 2)
+    assert clerk._claims_cache.get(_cache_key(token)) is claims
+
+    monkeypatch.setattr(time, "monotonic", lambda: start + remaining + 1)
+    assert clerk._claims_cache.get(_cache_key(token)) is None
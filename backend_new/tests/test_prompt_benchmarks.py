@@ -0,0 +1,22 @@
+"""bench_prompt steps as pytest-benchmark tests (run from backend_new: python -m pytest tests).
+
+Skipped unless pytest-benchmark is installed (requirements-dev.txt). Pass
+``--benchmark-skip`` to leave them out, or ``--benchmark-only`` to run just
+these.
+"""
+import pytest
+
+from benchmarks.bench_prompt import BUDGETS, CHECK_MIN_ENTRIES, _steps, synthetic_tree
+
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.fixture(scope="module")
+def steps():
+    return _steps(synthetic_tree(CHECK_MIN_ENTRIES))
+
+
+@pytest.mark.parametrize("name", BUDGETS)
+def test_step(benchmark, steps, name):
+    benchmark.group = f"bench_prompt ({CHECK_MIN_ENTRIES} entries)"
+    benchmark(steps[name])
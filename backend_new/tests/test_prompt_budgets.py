@@ -0,0 +1,9 @@
+"""Prompt-path budgets from benchmarks.bench_prompt (run from backend_new: python -m pytest tests)."""
+from benchmarks.bench_prompt import CHECK_MIN_ENTRIES, check, measure
+
+
+def test_prompt_steps_within_budgets():
+    results = {str(CHECK_MIN_ENTRIES): measure(CHECK_MIN_ENTRIES, repeat=5)}
+
+    # BUDGETS, RETAINED_BUDGET, and key_files selecting at least one file
+    assert check(results) == []
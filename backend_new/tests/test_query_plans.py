@@ -0,0 +1,61 @@
+"""Hot queries are served by indexes on a migrated SQLite database (run from backend_new: python -m pytest tests).
+
+The statements come from the routers' own builders, so a query that changes
+shape there is checked here as it is actually issued.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+import app.database
+from app.database import make_engine, upgrade_db
+from app.routers.generate import _history_query
+from app.routers.repos import _imported_repository
+
+CURSOR = (datetime(2026, 1, 1), "generation-id")
+
+HOT_QUERIES = {
+    # import_repository / fetch_repository_by_identifier duplicate check
+    "repo_by_user_and_github_id": (
+        _imported_repository("user", 1),
+        "uq_repositories_user_github_repo",
+    ),
+    # /history?repo_id=...
+    "history_for_repo": (
+        _history_query("user", "repo", None, 21),
+        "ix_readme_generations_repo_id_created_at_id",
+    ),
+    # /history?repo_id=... next page
+    "history_for_repo_after_cursor": (
+        _history_query("user", "repo", CURSOR, 21),
+        "ix_readme_generations_repo_id_created_at_id",
+    ),
+    # /history across all of the user's repositories
+    "history_for_user": (
+        _history_query("user", None, None, 21),
+        "ix_readme_generations_repo_id_created_at_id",
+    ),
+}
+
+
+@pytest.fixture(scope="module")
+def migrated_engine(tmp_path_factory):
+    engine = make_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    with pytest.MonkeyPatch.context() as patch:
+        # upgrade_db() and the migration environment use the module's engine
+        patch.setattr(app.database, "engine", engine)
+        upgrade_db()
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_query_uses_index(migrated_engine, name):
+    statement, expected_index = HOT_QUERIES[name]
+    compiled = statement.compile(migrated_engine, compile_kwargs={"literal_binds": True})
+    with migrated_engine.connect() as conn:
+        plan = [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))]
+
+    assert any(expected_index in step for step in plan), plan
+    assert not any(step.startswith("SCAN ") and "USING" not in step for step in plan), plan
@@ -0,0 +1,31 @@
+"""Importing the app stays cheap (run from backend_new: python -m pytest tests).
+
+The same gate as ``python -m benchmarks.bench_startup --check``, minus the
+import-time budget, which depends on the machine: in a fresh interpreter,
+``import app.main`` must leave ``LAZY_MODULES`` unloaded and must not open
+the database.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.bench_startup import LAZY_MODULES
+from benchmarks.common import BACKEND_DIR
+
+PROBE = (
+    "import json, sys; import app.main; "
+    f"print(json.dumps([m for m in {list(LAZY_MODULES)!r} if m in sys.modules]))"
+)
+
+
+def test_import_app_defers_heavy_modules_and_database(tmp_path):
+    database_path = tmp_path / "startup.db"
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database_path}", LOG_LEVEL="WARNING")
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=120
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
+    assert not database_path.exists()